@@ -2,3 +2,7 @@
 from .character import Character, Enemy, Friend, Player
 from .item import Item
 from .room import Room
+from .routing import Router
+from .session import GameSession
+from .targeting import TargetIndex
+from .turnorder import TurnOrder
@@ -0,0 +1,216 @@
+###########################################################################
+##  This is the mass battle arena for my text adventure prototype.       ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Large scale battles with every combatant's stats in NumPy arrays.
+
+    Unlike fight(), a round is resolved all at once: everyone alive at
+    the start of the round attacks, targets are picked from hit points
+    at the start of the round, then all ordinary damage is applied,
+    followed by critical hits (each one halves the target's hit points,
+    or kills at 6 or less).  The attack, defense, critical and weakness
+    rules are otherwise those of Character.attack/defend.
+
+    NumPy is only needed for this module: pip install numpy
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .character import Enemy
+
+
+# Weakness codes; anything else is the id of a weapon name.  Weapon ids
+# are never negative, so NO_WEAKNESS matches no weapon, not even none
+NO_WEAKNESS = -1
+ANY_WEAKNESS = -2
+
+# How attackers pick among the living members of other sides
+POLICIES = ("highest", "lowest", "random")
+
+
+class Arena():
+
+    def __init__(self, policy="random", rng=None):
+        """ Input: targeting policy (string, see POLICIES), rng
+            (numpy.random.Generator, seed or None)
+            Return: none
+            Add each side with add_side(), then call round() or run().
+            "highest" is what fight() does, but in a mass battle it
+            sends a whole side after a single opponent each round.
+        """
+        if np is None:
+            raise ImportError("rpgclasses.arena requires NumPy (pip install numpy)")
+        if policy not in POLICIES:
+            raise ValueError("Unknown targeting policy: {0}".format(policy))
+
+        self._policy = policy
+        self._rng = np.random.default_rng(rng)
+        self._characters = []
+        self._weapon_ids = {}
+        self._columns = {"constitution": [], "attack_mod": [], "max_damage": [], "side": [],
+                         "weapon": [], "weakness": []}
+        self._sides = 0
+        self._started = False
+        self.rounds = 0
+
+    def _weapon_id(self, name):
+        """ Returns a small int standing in for a weapon name """
+        return self._weapon_ids.setdefault(name, len(self._weapon_ids))
+
+    def add_side(self, characters):
+        """ Input: characters (list of character objects) fighting
+            together
+            Return: id of the new side (int)
+        """
+        if self._started:
+            raise RuntimeError("Sides cannot be added once the battle has started.")
+        side = self._sides
+        self._sides += 1
+        columns = self._columns
+        for character in characters:
+            self._characters.append(character)
+            columns["constitution"].append(character.constitution)
+            columns["attack_mod"].append(character.attack_mod)
+            columns["max_damage"].append(character.max_damage)
+            columns["side"].append(side)
+            weapon = None if character.weapon is None else character.weapon.name
+            columns["weapon"].append(self._weapon_id(weapon))
+            if not isinstance(character, Enemy) or character.weakness in (None, "none"):
+                columns["weakness"].append(NO_WEAKNESS)
+            elif character.weakness == "any":
+                columns["weakness"].append(ANY_WEAKNESS)
+            else:
+                columns["weakness"].append(self._weapon_id(character.weakness))
+        return side
+
+    def _start(self):
+        """ Freezes the columns into contiguous arrays """
+        if not self._started:
+            columns = self._columns
+            self.hp = np.array(columns["constitution"], dtype=np.int64)
+            self.attack_mod = np.array(columns["attack_mod"], dtype=np.float64)
+            self.max_damage = np.array(columns["max_damage"], dtype=np.int64)
+            self.side = np.array(columns["side"], dtype=np.int64)
+            self.weapon = np.array(columns["weapon"], dtype=np.int64)
+            self.weakness = np.array(columns["weakness"], dtype=np.int64)
+            self.damage_dealt = np.zeros(len(self.hp), dtype=np.int64)
+            self.died_in_round = np.zeros(len(self.hp), dtype=np.int64)
+            self._started = True
+
+    @property
+    def sides_standing(self):
+        """ Return: ids of sides with someone still alive (list) """
+        self._start()
+        return np.unique(self.side[self.hp > 0]).tolist()
+
+    @property
+    def over(self):
+        """ Return: True once at most one side is left standing """
+        return len(self.sides_standing) <= 1
+
+    def _targets(self, attackers):
+        """ Picks a target for every attacker (array of indexes) """
+        alive = np.flatnonzero(self.hp > 0)
+        targets = np.empty(len(attackers), dtype=np.int64)
+        for side in np.unique(self.side[attackers]):
+            mine = self.side[attackers] == side
+            opponents = alive[self.side[alive] != side]
+            if self._policy == "random":
+                choice = self._rng.integers(0, len(opponents), int(mine.sum()))
+                targets[mine] = opponents[choice]
+            elif self._policy == "highest":
+                targets[mine] = opponents[np.argmax(self.hp[opponents])]
+            else:
+                targets[mine] = opponents[np.argmin(self.hp[opponents])]
+        return targets
+
+    def round(self):
+        """ Input: none
+            Return: number of combatants killed this round (int)
+            Resolves one round for every combatant in a single batch.
+        """
+        self._start()
+        if self.over:
+            return 0
+        self.rounds += 1
+        rng = self._rng
+
+        attackers = np.flatnonzero(self.hp > 0)
+        targets = self._targets(attackers)
+        count = len(attackers)
+
+        attack = rng.integers(1, 21, count) * self.attack_mod[attackers]
+        defense = rng.integers(1, 21, count)
+        damage = (rng.random(count) * self.max_damage[attackers]).astype(np.int64) + 1
+
+        weakness = self.weakness[targets]
+        damage += (weakness == ANY_WEAKNESS) | (weakness == self.weapon[attackers])
+
+        hit = attack > defense
+        critical = hit & (attack == 20)
+        ordinary = hit & ~critical
+
+        # Ordinary damage first, summed per target
+        before = self.hp.copy()
+        np.add.at(self.hp, targets[ordinary], damage[ordinary] * -1)
+
+        # Then each critical hit halves, or kills at 6 or less
+        crits = np.bincount(targets[critical], minlength=len(self.hp))
+        for _ in range(int(crits.max()) if crits.size else 0):
+            halve = (crits > 0) & (self.hp > 0)
+            self.hp[halve] = np.where(self.hp[halve] > 6, self.hp[halve] // 2, 0)
+            crits[halve] -= 1
+            crits[~halve] = 0
+
+        # Keep a tally of ordinary damage dealt by each attacker
+        self.damage_dealt[attackers] += np.where(ordinary, damage, 0)
+
+        np.maximum(self.hp, 0, out=self.hp)
+        killed = (before > 0) & (self.hp == 0)
+        self.died_in_round[killed] = self.rounds
+        return int(killed.sum())
+
+    def run(self, max_rounds=100000):
+        """ Input: max_rounds (int)
+            Return: id of the winning side, or None if everyone died or
+            max_rounds ran out
+        """
+        while not self.over and self.rounds < max_rounds:
+            self.round()
+        standing = self.sides_standing
+        return standing[0] if len(standing) == 1 else None
+
+    def results(self):
+        """ Return: list of (character object, hit points left, damage
+            dealt, round they died in or 0) tuples, in the order added
+        """
+        self._start()
+        return list(zip(self._characters, self.hp.tolist(), self.damage_dealt.tolist(),
+                        self.died_in_round.tolist()))
+
+    def write_back(self):
+        """ Input: none
+            Return: none
+            Copies hit points back into the Character objects.
+        """
+        self._start()
+        for character, hp in zip(self._characters, self.hp.tolist()):
+            character.constitution = hp
@@ -18,7 +18,14 @@
 ###########################################################################
 
 
-from random import choice, randrange
+from random import randrange
+
+from .cursor import Cursor
+from .dirty import _trackers, mark, set_unwatched_state, unwatched_state
+from .inventory import Inventory
+from .item import name_id
+from .strings import text
+from .targeting import TargetIndex, select
 
 
 ###########################################################################
@@ -29,6 +36,12 @@ from random import choice, randrange
 
 class Character():
 
+    # No per-instance __dict__: worlds can hold millions of characters.
+    # __weakref__ so a WorldStore can tell when nothing uses a character
+    __slots__ = ("_name", "_description", "_constitution", "_conversation", "_weapon",
+                 "_attack_mod", "_max_damage", "_targeting", "_items", "_location",
+                 "_watchers", "__weakref__")
+
     def __init__(self, char_name, char_description, constitution, weapon=None, attack_mod=1.0,
                  max_damage=5, items=None):
         """ Input: char_name (string), char_description (string), 
@@ -39,6 +52,8 @@ class Character():
             Initializes instance of Character class w/ 8 attributes.  
             NOTE: self.conversation is set via set_conversation().
         """        
+        # Watchers of the world that built the character, see dirty.py
+        self._watchers = None
         self._name = char_name
         self._description = char_description
         self._constitution = constitution
@@ -46,11 +61,22 @@ class Character():
         self._weapon = weapon
         self._attack_mod = attack_mod
         self._max_damage = max_damage
+        self._targeting = "highest"
 
-        if items is None:
-            self._items = []
-        else:
-            self._items = items
+        # Empty inventories are only created once something asks for them
+        self._items = Inventory(items) if items else None
+
+        # Occupants of the room this character is in, kept by the room
+        self._location = None
+
+    def __getstate__(self):
+        """ Pickles the character on its own, without the world watching
+            it or the room it's in (a pickled room sets _location again)
+        """
+        return unwatched_state(self, ("_location",))
+
+    def __setstate__(self, state):
+        set_unwatched_state(self, state, ("_location",))
 
     @property
     def name(self):
@@ -65,13 +91,20 @@ class Character():
             Return: none
         """
         self._name = new_name
+        # What the character has yet to say is said under the new name
+        if self._conversation is not None and self._conversation._speaker is not None:
+            self._conversation._speaker = new_name
+        if self._location is not None:
+            self._location.redraw(self)
+        if _trackers:
+            mark(self)
 
     @property
     def description(self):
         """ Input: none
             Return: character description (string)
         """
-        return self._description
+        return text(self._description)
 
     @description.setter
     def description(self, new_description):
@@ -79,6 +112,10 @@ class Character():
             Return: none
         """ 
         self._description = new_description
+        if self._location is not None:
+            self._location.redraw(self)
+        if _trackers:
+            mark(self)
 
     @property
     def constitution(self):
@@ -93,11 +130,14 @@ class Character():
             Return: none
         """
         self._constitution = constitution
+        if _trackers:
+            mark(self)
 
     @property
     def conversation(self):
         """ Input: none
-            Return: character response to player salutation (string)
+            Return: Cursor object (call next() on it for the character's
+            response to player salutation) or None
         """
         return self._conversation
     
@@ -108,12 +148,16 @@ class Character():
             Set what this character will say when talking to player
         """
         self._conversation = self.talk(conversation)
+        if _trackers:
+            mark(self)
 
     @property
     def items(self):        
         """ Input: none
-            Return: character inventory (list of item objects)
+            Return: character inventory (Inventory object)
         """
+        if self._items is None:
+            self._items = Inventory()
         return self._items
 
     @items.setter
@@ -126,14 +170,18 @@ class Character():
             To remove multiple items: character.items = [item for 
             item in self.items if not in [itemsToRemove]]
         """
-        self._items = items
+        if items is not self._items:
+            self._items = Inventory(items)
+        if _trackers:
+            mark(self)
 
     @property
     def item_names(self):
         """ Input: none
-            Return: item names in character inventory (list of strings)
+            Return: item names in character inventory, one per item
+            (list of strings); see Inventory.names() for each name once
         """
-        return [item.name for item in self.items]
+        return [item.name for item in self._items] if self._items is not None else []
 
     @property
     def weapon(self):
@@ -177,30 +225,61 @@ class Character():
         """
         self._max_damage = max_damage
 
-    def talk(self, conversation=None):
-        """ Return/Yield: response to player's salutation (string) """
+    @property
+    def targeting(self):
+        """ Input: none
+            Return: name of targeting policy used in attack() (string)
+        """
+        return self._targeting
 
+    @targeting.setter
+    def targeting(self, policy):
+        """ Input: policy (string): "highest" (constitution, default),
+            "lowest", "threat", "random" or one added via
+            targeting.add_policy()
+            Return: none
+        """
+        self._targeting = policy
+
+    @property
+    def faction(self):
+        """ Return: which group of Room.characters this character is
+            listed under, None for plain characters
+        """
+        return None
+
+    def talk(self, conversation=None):
+        """ Input: conversation (list of strings) or None
+            Return: Cursor object; next() on it gives the response to
+            player's salutation (string), then "..." once every line
+            has been said
+        """
         if conversation is not None:
-            for statement in conversation:
-                yield "[{0}]: {1}".format(self.name, statement)
-            while True:
-                yield "[{0}]: ...".format(self.name)
+            return Cursor(tuple(conversation), "...", self.name)
         else:
-            return "{0} doesn't want to talk to you.".format(self.name)
+            return Cursor((), "{0} doesn't want to talk to you.".format(self.name))
 
     def attack(self, opponents):
-        """ Input: list of opponents (character objects)
+        """ Input: list of opponents (character objects) or a
+            TargetIndex of them
             Return: tuple containing (1) who is being attacked 
             (character object), (2) the attack roll (int), (3) damage
             roll (int), (4) weapon used (item)
         """
-        defender = opponents[0]
+        if isinstance(opponents, TargetIndex):
+            # Indexed opponents: O(log n) lookup for any policy
+            defender = opponents.select(self.targeting)
+        elif self.targeting != "highest":
+            # One scan; fights pass a TargetIndex built once instead
+            defender = select(opponents, self.targeting)
+        else:
+            defender = opponents[0]
 
-        # Choose to attack opponent with highest constitution
-        if len(opponents) > 1:
-            for opponent in opponents:
-                if opponent.constitution > defender.constitution:
-                    defender = opponent
+            # Choose to attack opponent with highest constitution
+            if len(opponents) > 1:
+                for opponent in opponents:
+                    if opponent.constitution > defender.constitution:
+                        defender = opponent
     
         # Roll attack and damage dice
         attack_roll = self.roll_dice() * self.attack_mod
@@ -208,8 +287,10 @@ class Character():
 
         return (defender, attack_roll, damage_roll, self.weapon)
 
-    def defend(self, attack, damage, weapon):
-        """ Input: attack roll (int), damage roll (int), weapon (item)
+    def defend(self, attack, damage, weapon, output=None):
+        """ Input: attack roll (int), damage roll (int), weapon (item),
+            output (file to announce critical hits on, or None for
+            stdout)
             Return: tuple containing (1) boolean (True if still alive,
             false otherwise) and (2) info re: outcome of attack (string)
         """
@@ -220,15 +301,16 @@ class Character():
 
             # If attack is 20, Critical Hit, different rules for damage
             if attack == 20:
-                print("Critical Hit! ", end=" ")
+                print("Critical Hit! ", end=" ", file=output)
                 if self.constitution > 6:
                     self.constitution //= 2
                 else:
                     self.constitution = 0
             else:
                 # Add extra damage if weapon is enemie's weakness
-                if isinstance(self, Enemy) and (self.weakness == weapon.name or 
-                                                self.weakness == "any"):
+                # (weapon names are compared by their interned ids)
+                if isinstance(self, Enemy) and (self.weakness == "any" or (weapon is not None
+                                                and weapon.name_id == self._weakness_id)):
                     damage += 1
                 
                 self.constitution -= damage
@@ -274,7 +356,9 @@ class Character():
         
 
 class Enemy(Character):
-    
+
+    __slots__ = ("_weakness", "_weakness_id", "_theft_victim", "_loot", "_picker")
+
     def __init__(self, char_name, char_description, constitution, weapon=None, attack_mod=1.0,
                  max_damage=5, items=None, weakness="any"):
         """ Input: char_name (string), char_description (string),
@@ -289,7 +373,16 @@ class Enemy(Character):
         super().__init__(char_name, char_description, constitution, weapon, attack_mod, max_damage,
                          items)
         self._weakness = weakness        
+        self._weakness_id = name_id(weakness)
         self._theft_victim = False
+        self._loot = None
+        # (inventory, its version, ItemPicker) for steal(), see _steal_picker()
+        self._picker = None
+
+    @property
+    def faction(self):
+        """ Return: "enemies" (string), see Room.characters """
+        return "enemies"
 
     @property
     def weakness(self):
@@ -305,6 +398,53 @@ class Enemy(Character):
             NOTE: weakness can be specific weapon, "any", "none"
         """
         self._weakness = weakness
+        self._weakness_id = name_id(weakness)
+
+    @property
+    def theft_victim(self):
+        """ Return: True once player has been caught or succeeded
+            stealing from this enemy (boolean)
+        """
+        return self._theft_victim
+
+    @theft_victim.setter
+    def theft_victim(self, true_or_false):
+        """ Input: boolean
+            Return: None
+        """
+        self._theft_victim = true_or_false
+        if _trackers:
+            mark(self)
+
+    @property
+    def loot(self):
+        """ Input: none
+            Return: loot table (LootTable object) or None
+        """
+        return self._loot
+
+    @loot.setter
+    def loot(self, loot_table):
+        """ Input: loot_table (LootTable object or None)
+            Return: None
+            NOTE: The table weights which of the enemy's items is
+            stolen, and is rolled once when the enemy is killed (see
+            loot.drop_loot)
+        """
+        self._loot = loot_table
+        self._picker = None
+        if _trackers:
+            mark(self)
+
+    def _steal_picker(self):
+        """ Returns the loot table's ItemPicker for the items carried,
+            set up again only once the items or the table change
+        """
+        items = self._items
+        cached = self._picker
+        if cached is None or cached[0] is not items or cached[1] != items._version:
+            cached = self._picker = (items, items._version, self._loot.picker(list(items)))
+        return cached[2]
 
     def steal(self, dice_roll):
         """ Input: dice_roll (int)
@@ -312,10 +452,10 @@ class Enemy(Character):
             or None (if unsuccessful), (2) is a related message (string) 
             If enemy has items and you haven't previously tried to steal, 
             allow player to attempt to steal and, if successful return 
-            randomly chosen item
+            randomly chosen item, weighted by the loot table if any
         """
         # Check to see if there is an item to steal
-        if self.items == []:
+        if not self._items:
             return (None, "{0} has nothing to steal.".format(self.name))
         
         # If you have already attempted to steal, prevent attempt
@@ -325,15 +465,18 @@ class Enemy(Character):
         
         # If you haven't attempted to steal, attempt to steal
         if dice_roll > 8:
-            item_stolen = choice(self.items)
+            self.theft_victim = True
+            if self._loot is not None:
+                item_stolen = self._steal_picker().pick()
+            else:
+                item_stolen = self.items.random_item()
             self.items.remove(item_stolen)
-            self._theft_victim = True
             return (item_stolen, "Item stolen: {0}".format(item_stolen))
 
         # Roll to see if enemy noticed your attempt to steal
         # if so prevent further attempts
         if self.roll_dice(1,8) > 5:
-            self._theft_victim = True 
+            self.theft_victim = True
             return (None, "You were unsuccessful, and {0} took notice.  Don't try it again."
                     .format(self.name))
         
@@ -348,6 +491,8 @@ class Enemy(Character):
 
 class Friend(Character):
 
+    __slots__ = ("_in_party",)
+
     def __init__(self, char_name, char_description, constitution, weapon=None, attack_mod=1.0,
                  max_damage=5, items=None, in_party=False):
         """ Input: char_name (string), char_description (string), 
@@ -374,16 +519,28 @@ class Friend(Character):
             Return: None        
         """
         self._in_party = true_or_false
+        if self._location is not None:
+            self._location.refile(self)
+        if _trackers:
+            mark(self)
+
+    @property
+    def faction(self):
+        """ Return: "party" or "neutral" (string), see Room.characters """
+        return "party" if self._in_party else "neutral"
 
-    def receive_gift(self, gift):
-        """ Input: gift (item object or None)
+    def receive_gift(self, gift, output=None):
+        """ Input: gift (item object or None), output (file to thank the
+            player on, or None for stdout)
             Return: none
             Append gift to inventory, thank player, unless gift is None
         """        
         if gift is not None:        
             self.items += [gift,]
-            print("\n{0}'s inventory: {1}".format(self.name, ", ".join(self.item_names)))
-            print("[{0}]: Thank you.  Your kindness will not be soon forgotten.".format(self.name))
+            print("\n{0}'s inventory: {1}".format(self.name, ", ".join(self.items.labels())),
+                  file=output)
+            print("[{0}]: Thank you.  Your kindness will not be soon forgotten.".format(self.name),
+                  file=output)
         return
 
 
@@ -394,6 +551,8 @@ class Friend(Character):
 
 class Player(Character):
 
+    __slots__ = ()
+
     def __init__(self, char_name, char_description, constitution, weapon=None, attack_mod=1.0,
                  max_damage=5, items=None):
         """ Input: char_name (string), char_description (string), 
@@ -443,36 +602,29 @@ class Player(Character):
             Gets user to pick item and returns item picked or "cancel"
         """
         # Print list of character's items and filter if applicable
-        if item_type is None:
-            items_list = [item.name for item in self.items]
-        else:
-            items_list = [item.name for item in self.items if item.type == item_type]
-
-        print("\n{0} {1}\n".format(header, ", ".join(items_list)))
+        print("\n{0} {1}\n".format(header, ", ".join(self.items.labels(item_type))))
 
-        # Link name to item so user input can be used to return item
-        items_dict = {item.name: item for item in self.items}
-
-        # Get input from player
+        # Get input from player; the inventory is indexed by name
         item = ""        
-        while item != "cancel" and item not in items_dict.keys(): 
+        while item != "cancel" and self.items.by_name(item) is None: 
             item = input("Enter the item you choose, or type cancel: ")
     
         if item == "cancel":
             return "cancel"
                 
-        return items_dict[item]
+        return self.items.by_name(item)
 
-    def attack(self, opponents):
-        """ Input: list of opponents (character objects)
+    def attack(self, opponents, defender=None):
+        """ Input: list of opponents (character objects), defender
+            (character object) if already chosen, else None
             Return: tuple containing (1) defender (character object),
             (2) attack roll (int), (3) damage roll (int), 
             (4) weapon (item)
         """
         # Pick character to attack, when more than one enemy present.
-        if len(opponents) == 1:
+        if defender is None and len(opponents) == 1:
             defender = opponents[0]
-        else:
+        elif defender is None:
             defender = self.pick_char(opponents, False)
 
         # Roll attack and damage dice
@@ -0,0 +1,90 @@
+###########################################################################
+##  This is the game clock for my text adventure prototype.              ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Clocks for the pauses that give the player time to read.
+
+    The game never calls time.sleep() itself; it asks its clock to wait.
+        RealClock()        waits as long as the game asks (the default)
+        ScaledClock(10)    waits a tenth as long
+        InstantClock()     doesn't wait at all (bots, tests)
+        AsyncClock()       lets other tasks run while it waits (servers)
+"""
+
+import asyncio
+import time
+
+
+class Clock():
+
+    def __init__(self, speed=1.0):
+        """ Input: speed (float): how many times faster than real time
+            Return: none
+        """
+        if speed <= 0:
+            raise ValueError("Clock speed must be more than 0.")
+        self._speed = speed
+        self._waited = 0.0
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @property
+    def waited(self):
+        """ Return: game time waited so far, in seconds (float) """
+        return self._waited
+
+    def sleep(self, seconds):
+        """ Input: game time to wait, in seconds (float)
+            Return: none
+        """
+        self._waited += seconds
+        time.sleep(seconds / self._speed)
+
+
+class RealClock(Clock):
+
+    def __init__(self):
+        super().__init__(1.0)
+
+
+class ScaledClock(Clock):
+
+    def __init__(self, speed=10.0):
+        super().__init__(speed)
+
+
+class InstantClock(Clock):
+
+    def __init__(self):
+        super().__init__(float("inf"))
+
+    def sleep(self, seconds):
+        self._waited += seconds
+
+
+class AsyncClock(Clock):
+
+    async def sleep(self, seconds):
+        """ Input: game time to wait, in seconds (float)
+            Return: none
+            Coroutine: await it, and other tasks run in the meantime.
+        """
+        self._waited += seconds
+        await asyncio.sleep(seconds / self._speed)
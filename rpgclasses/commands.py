@@ -0,0 +1,217 @@
+###########################################################################
+##  This is the command parser for my text adventure prototype.          ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Turns what the player types into a command and its arguments.
+
+    Commands and aliases are kept in a prefix trie, so any unambiguous
+    start of a command works ("insp" for inspect) and finding a command
+    takes time proportional to the length of the word typed, however
+    many commands are registered.
+"""
+
+
+# Marks a trie node shared by more than one command
+AMBIGUOUS = object()
+
+
+class Command():
+
+    __slots__ = ("name", "handler", "help")
+
+    def __init__(self, name, handler=None, help=""):
+        """ Input: name (string), handler (function taking the command's
+            arguments (string) or None), help (string)
+            Return: none
+        """
+        self.name = name
+        self.handler = handler
+        self.help = help
+
+
+class _Node():
+
+    __slots__ = ("children", "exact", "only")
+
+    def __init__(self):
+        self.children = {}
+        # Command spelled exactly by the path to this node, if any
+        self.exact = None
+        # The one command starting with this prefix, or AMBIGUOUS
+        self.only = None
+
+
+class CommandRegistry():
+
+    def __init__(self):
+        """ Input: none
+            Return: none
+            Register commands with add() and aliases with alias(), then
+            turn input into (Command, arguments) with parse().
+        """
+        self._commands = {}
+        self._words = {}
+        self._root = _Node()
+
+    def add(self, name, handler=None, aliases=(), help=""):
+        """ Input: name (string), handler (function or None), aliases
+            (list of strings), help (string)
+            Return: Command object
+        """
+        name = name.lower()
+        if name in self._words:
+            raise ValueError("Command already registered: {0}".format(name))
+        command = Command(name, handler, help)
+        self._commands[name] = command
+        self._insert(name, command)
+        for alias in aliases:
+            self.alias(alias, name)
+        return command
+
+    def alias(self, alias, name):
+        """ Input: alias (string), name of an existing command (string)
+            Return: none
+            e.g. alias("n", "north").  An alias wins over any command it
+            happens to be the start of.
+        """
+        alias = alias.lower()
+        if name.lower() not in self._commands:
+            raise KeyError("Unknown command: {0}".format(name))
+        if " " in alias or not alias:
+            raise ValueError("Aliases must be a single word.")
+        if alias in self._commands:
+            raise ValueError("Cannot alias over the command {0}".format(alias))
+        if alias in self._words:
+            self._remove(alias)
+        self._insert(alias, self._commands[name.lower()])
+
+    def _insert(self, word, command):
+        """ Adds word to the trie, marking which command every prefix of
+            it leads to
+        """
+        self._words[word] = command
+        node = self._root
+        for letter in word:
+            node = node.children.setdefault(letter, _Node())
+            if node.only is None or node.only is command:
+                node.only = command
+            else:
+                node.only = AMBIGUOUS
+        node.exact = command
+
+    def _remove(self, word):
+        """ Takes word out of the trie and rebuilds the prefixes it
+            shared (only the nodes along word are touched)
+        """
+        del self._words[word]
+        path = [self._root]
+        for letter in word:
+            path.append(path[-1].children[letter])
+        path[-1].exact = None
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if not node.children and node.exact is None:
+                del path[depth - 1].children[word[depth - 1]]
+            else:
+                node.only = self._only_below(node)
+
+    def _only_below(self, node):
+        """ Works out node.only from its children """
+        found = node.exact
+        for child in node.children.values():
+            if child.only is AMBIGUOUS or (found is not None and child.only is not found):
+                return AMBIGUOUS
+            found = child.only
+        return found
+
+    def resolve(self, word):
+        """ Input: word (string) typed by the player
+            Return: Command object, or None if unknown; raises
+            AmbiguousCommand if it's the start of several commands
+        """
+        node = self._root
+        for letter in word.lower():
+            node = node.children.get(letter)
+            if node is None:
+                return None
+        if node.exact is not None:
+            return node.exact
+        if node.only is AMBIGUOUS:
+            raise AmbiguousCommand(word, self.completions(word))
+        return node.only
+
+    def completions(self, prefix):
+        """ Input: prefix (string)
+            Return: names of the commands starting with prefix (sorted
+            list of strings)
+        """
+        return sorted(name for name in self._commands if name.startswith(prefix.lower()))
+
+    def parse(self, text):
+        """ Input: text (string) typed by the player, e.g. "talk jill"
+            Return: (Command object or None, arguments (string)); raises
+            AmbiguousCommand
+            A leading "with"/"to" is dropped from the arguments, so
+            "fight with hunter's bow" gives "hunter's bow".
+        """
+        word, _, arguments = text.strip().partition(" ")
+        arguments = arguments.strip()
+        for filler in ("with ", "to "):
+            if arguments.lower().startswith(filler):
+                arguments = arguments[len(filler):].strip()
+        return (self.resolve(word), arguments)
+
+    def dispatch(self, text):
+        """ Input: text (string) typed by the player
+            Return: whatever the command's handler returns
+            Calls the handler of the command typed with its arguments.
+        """
+        command, arguments = self.parse(text)
+        if command is None:
+            raise KeyError("Unknown command: {0}".format(text))
+        return command.handler(arguments)
+
+    @property
+    def names(self):
+        """ Return: command names in the order added (list of strings) """
+        return list(self._commands)
+
+    @property
+    def aliases(self):
+        """ Return: every alias, e.g. {"n": "north"} (dict of string ->
+            command name)
+        """
+        return {word: command.name for word, command in self._words.items()
+                if word != command.name}
+
+    def __contains__(self, name):
+        return name in self._commands
+
+    def __getitem__(self, name):
+        return self._commands[name]
+
+
+class AmbiguousCommand(ValueError):
+
+    def __init__(self, word, candidates):
+        """ Input: word typed (string), commands it could mean (list)
+            Return: none
+        """
+        super().__init__("\"{0}\" could mean: {1}".format(word, ", ".join(candidates)))
+        self.word = word
+        self.candidates = candidates
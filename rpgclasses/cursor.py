@@ -0,0 +1,87 @@
+###########################################################################
+##  This is the script cursor for my text adventure prototype.           ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+
+from .strings import text
+
+
+class Cursor():
+
+    __slots__ = ("_lines", "_position", "_after", "_speaker")
+
+    def __init__(self, lines, after=None, speaker=None, position=0):
+        """ Input: lines (tuple), after (what to give once every line
+            has been given, or None to stop), speaker (name (string)
+            put in front of each line, or None), position (int)
+            Return: none
+            Steps through a script with next(), like a generator, but
+            its state is just the script and a position: characters and
+            rooms with the same script share the tuple, and the cursor
+            can be copied, pickled or saved.
+        """
+        self._lines = lines
+        self._position = position
+        self._after = after
+        self._speaker = speaker
+
+    @property
+    def lines(self):
+        return self._lines
+
+    @property
+    def after(self):
+        return self._after
+
+    @property
+    def speaker(self):
+        return self._speaker
+
+    @property
+    def position(self):
+        """ Return: how many lines have been given so far (int) """
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        self._position = position
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        position = self._position
+        if position < len(self._lines):
+            self._position = position + 1
+            line = self._lines[position]
+        elif self._after is not None:
+            line = self._after
+        else:
+            raise StopIteration
+        # Lines from a string table are decoded as they're given; search
+        # responses are tuples with their text first
+        if isinstance(line, tuple):
+            line = (text(line[0]),) + line[1:]
+        else:
+            line = text(line)
+        if self._speaker is not None:
+            return "[{0}]: {1}".format(self._speaker, line)
+        return line
+
+    def __copy__(self):
+        return Cursor(self._lines, self._after, self._speaker, self._position)
@@ -0,0 +1,145 @@
+###########################################################################
+##  This is the change tracker for my text adventure prototype.          ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Keeps track of which rooms and characters have changed, so an
+    autosave only writes those (see save.Journal).
+
+    Every World has a Watchers object, and every Room and Character it
+    builds points to it.  The property setters of Character, Enemy,
+    Friend and Room call mark(self) when they change something worth
+    saving, which adds them to the change sets tracking their own world
+    only, so sessions playing different worlds in one process never see
+    each other's changes.  Nothing is kept unless something is tracking,
+    so the setters only pay for a check of an empty list:
+
+        if _trackers:
+            mark(self)
+"""
+
+
+from contextlib import contextmanager
+from threading import Lock
+
+
+# Every change set open, in any world, as (Watchers, set) tuples.
+# Sessions on other threads open and close theirs under _lock.
+_trackers = []
+_lock = Lock()
+
+
+class Watchers():
+
+    __slots__ = ("changed", "links")
+
+    def __init__(self):
+        """ Input: none
+            Return: none
+            What's watching one world: the change sets from track()
+            and the listeners told of new links (see
+            room.add_link_listener).
+        """
+        self.changed = []
+        self.links = []
+
+
+def track(watchers):
+    """ Input: watchers (Watchers object of the world to track)
+        Return: set that every Room and Character of that world marked
+        from now on is added to; empty it after reading it
+    """
+    changed = set()
+    with _lock:
+        watchers.changed.append(changed)
+        _trackers.append((watchers, changed))
+    return changed
+
+
+def untrack(changed):
+    """ Input: set from track()
+        Return: none
+    """
+    # Sets are compared by identity: two empty change sets are equal
+    with _lock:
+        for position, (watchers, tracked) in enumerate(_trackers):
+            if tracked is changed:
+                del _trackers[position]
+                watchers.changed[:] = [other for other in watchers.changed
+                                       if other is not changed]
+                return
+
+
+def mark(thing):
+    """ Input: Room or Character object that changed
+        Return: none
+    """
+    watchers = thing._watchers
+    if watchers is None:
+        # A character no world built is saved with the room it's in
+        location = getattr(thing, "_location", None)
+        if location is None or location._room is None:
+            return
+        watchers = location._room._watchers
+        if watchers is None:
+            return
+    for changed in watchers.changed:
+        changed.add(thing)
+
+
+def unwatched_state(thing, dropped=()):
+    """ Input: Room or Character object, names of other slots to leave
+        out (tuple of strings)
+        Return: its slots as a dict, for pickling, without the world's
+        watchers; see set_unwatched_state()
+    """
+    skip = ("_watchers", "__weakref__") + dropped
+    return {name: getattr(thing, name) for cls in type(thing).__mro__
+            for name in getattr(cls, "__slots__", ()) if name not in skip}
+
+
+def set_unwatched_state(thing, state, dropped=()):
+    """ Input: Room or Character object being unpickled, state from
+        unwatched_state(), the slots it left out
+        Return: none
+        A pickled room or character is loaded outside of any world, as
+        if it had been made directly; the slots left out are set to
+        None.
+    """
+    thing._watchers = None
+    for name in dropped:
+        setattr(thing, name, None)
+    for name, value in state.items():
+        setattr(thing, name, value)
+
+
+@contextmanager
+def paused(changed):
+    """ Input: set from track()
+        Return: context manager; nothing is added to changed inside its
+        with block, e.g. while rooms are rebuilt from what was saved
+    """
+    with _lock:
+        tracking = [watchers for watchers, tracked in _trackers if tracked is changed]
+    untrack(changed)
+    try:
+        yield changed
+    finally:
+        with _lock:
+            for watchers in tracking:
+                watchers.changed.append(changed)
+                _trackers.append((watchers, changed))
@@ -0,0 +1,145 @@
+###########################################################################
+##  This is the event registry for my text adventure prototype.          ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+
+# Use as the room to trigger in every room
+ANY_ROOM = None
+
+
+class Trigger():
+
+    __slots__ = ("number", "key", "action", "condition", "once")
+
+    def __init__(self, number, key, action, condition=None, once=True):
+        """ Input: number (int, order added), key ((room, command,
+            trigger id) tuple), action (function), condition (function
+            returning True/False, or None), once (boolean)
+            Return: none
+            Made by EventRegistry.add(); action and condition are called
+            with whatever was passed to EventRegistry.fire().
+        """
+        self.number = number
+        self.key = key
+        self.action = action
+        self.condition = condition
+        self.once = once
+
+
+class EventRegistry():
+
+    def __init__(self):
+        """ Input: none
+            Return: none
+            Scripted events, looked up by (room, command, trigger id).
+            Firing a command only looks at the triggers registered for
+            exactly that key (plus ANY_ROOM), so it costs the same with
+            ten events or ten thousand.
+        """
+        self._triggers = {}
+        self._added = 0
+        # Numbers of the once-only triggers that have gone off
+        self._spent = []
+
+    def add(self, room, command, action, trigger_id=None, condition=None, once=True):
+        """ Input: room (Room object or ANY_ROOM), command (string),
+            action (function), trigger_id (string, e.g. set off by a
+            search response, or None for any use of the command),
+            condition (function or None), once (boolean: False to
+            trigger every time)
+            Return: Trigger object (can be passed to remove())
+        """
+        key = (room, command, trigger_id)
+        trigger = Trigger(self._added, key, action, condition, once)
+        self._added += 1
+        self._triggers.setdefault(key, []).append(trigger)
+        return trigger
+
+    def on(self, room, command, trigger_id=None, condition=None, once=True):
+        """ Decorator version of add():
+
+                @events.on(kitchen, "search", "found_letter")
+                def read_letter(party, neutral, enemies, player): ...
+        """
+        def register(action):
+            self.add(room, command, action, trigger_id, condition, once)
+            return action
+        return register
+
+    def remove(self, trigger):
+        """ Input: Trigger object
+            Return: none
+        """
+        triggers = self._triggers.get(trigger.key)
+        if triggers is not None and trigger in triggers:
+            triggers.remove(trigger)
+            if not triggers:
+                del self._triggers[trigger.key]
+
+    def fire(self, room, command, trigger_id=None, *args):
+        """ Input: room (Room object) the command was given in, command
+            (string), trigger_id (string or None), and any arguments for
+            the actions
+            Return: number of actions run (int)
+            Runs the actions registered for this room and command.  A
+            trigger id also runs the actions registered for the command
+            with no trigger id.
+        """
+        if not self._triggers:
+            return 0
+        keys = [(room, command, None), (ANY_ROOM, command, None)]
+        if trigger_id is not None:
+            keys += [(room, command, trigger_id), (ANY_ROOM, command, trigger_id)]
+
+        fired = 0
+        for key in keys:
+            triggers = self._triggers.get(key)
+            if not triggers:
+                continue
+            for trigger in list(triggers):
+                if trigger.condition is not None and not trigger.condition(*args):
+                    continue
+                if trigger.once:
+                    self.remove(trigger)
+                    self._spent.append(trigger.number)
+                trigger.action(*args)
+                fired += 1
+        return fired
+
+    @property
+    def spent(self):
+        """ Return: numbers (order added, from 0) of the once-only
+            triggers that have gone off (list of ints), e.g. for saving
+        """
+        return list(self._spent)
+
+    def spend(self, numbers):
+        """ Input: trigger numbers (list of ints), from spent
+            Return: none
+            Removes those triggers without running them, e.g. when
+            loading a saved game after registering the same events.
+        """
+        numbers = set(numbers)
+        for triggers in list(self._triggers.values()):
+            for trigger in list(triggers):
+                if trigger.number in numbers:
+                    self.remove(trigger)
+                    self._spent.append(trigger.number)
+
+    def __len__(self):
+        return sum(len(triggers) for triggers in self._triggers.values())
@@ -0,0 +1,275 @@
+###########################################################################
+##  This is the procedural manor generator for my text adv prototype.    ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Generates manors of any size for load testing.
+
+    Usage: python -m rpgclasses.generator big.world --rooms 100000
+
+    Rooms sit on a grid and every room either opens north or east (a
+    "binary tree" maze), which always gives a connected manor.  Each
+    room's layout comes from a hash of (seed, room number), and its
+    contents from a generator seeded by (seed, chunk number), so chunks
+    of rooms can be built in any order, on any number of processes, and
+    the same seed always gives the same manor.  The output is a .world
+    file; open it with World() to get Room, Enemy, Friend and Item
+    objects.
+"""
+
+import argparse
+import json
+import os
+from math import ceil, sqrt
+from multiprocessing import Pool
+from random import Random
+
+from .world import World, write_records
+
+
+# Rooms per unit of work; fixed so results don't depend on core count
+CHUNK_SIZE = 10000
+
+# Most characters a generated room can hold
+MAX_CHARACTERS = 4
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(seed, number):
+    """ Input: seed (int), number (int)
+        Return: well scrambled 64 bit int (splitmix64)
+    """
+    value = (seed * 0x9E3779B97F4A7C15 + number + 1) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+###########################################################################
+####                Content Tables                                     ####
+###########################################################################
+
+ADJECTIVES = ("Dusty", "Gilded", "Damp", "Forgotten", "Cold", "Narrow", "Grand", "Crooked",
+              "Silent", "Smoky", "Faded", "Draughty")
+ROOM_TYPES = ("Parlor", "Study", "Gallery", "Pantry", "Bedchamber", "Chapel", "Cellar", "Library",
+              "Conservatory", "Scullery", "Armory", "Corridor")
+DETAILS = ("Cobwebs hang from every corner.", "A cracked mirror leans against the wall.",
+           "The floorboards creak underfoot.", "Portraits of stern ancestors line the walls.",
+           "Something scuttles behind the wainscoting.", "A cold draught blows from nowhere.",
+           "Candle stubs are scattered across the floor.", "The wallpaper peels in long strips.")
+SEARCHES = ("You find nothing but dust.", "Behind a loose panel there is only a mouse nest.",
+            "You rummage through a drawer of moth-eaten linens.",
+            "Under the rug you find a faint chalk circle.")
+
+# key: (name, type, description)
+ITEMS = {
+    "fists": ("fists", "weapon", "bare knuckles"),
+    "simple club": ("simple club", "weapon", "It's not much more than a broken tree branch."),
+    "rusty sword": ("rusty sword", "weapon", "It has seen better centuries."),
+    "hunter's bow": ("hunter's bow", "weapon", "a standard hunting bow"),
+    "wine flask": ("wine flask", "food", "It smells a bit soured, but it will get the job done."),
+    "stale bread": ("stale bread", "food", "Hard enough to be a weapon."),
+    "sack of gold": ("sack of gold", "currency", "It's money."),
+    "silver spoon": ("silver spoon", "currency", "Engraved with the family crest."),
+}
+WEAPONS = ("simple club", "rusty sword", "hunter's bow")
+LOOT = tuple(ITEMS)[1:]
+
+# name, description, constitution range, attack_mod, max_damage
+ENEMIES = (("Zombie", "smelly zombie", (6, 10), .75, 3), ("Rat", "giant rat", (3, 5), .75, 2),
+           ("Ghost", "restless spirit", (8, 14), 1.0, 4), ("Butler", "undead butler", (10, 16),
+           1.0, 5))
+FRIENDS = (("Maid", "a nervous maid"), ("Explorer", "a lost explorer"),
+           ("Gardener", "an old gardener"))
+
+
+###########################################################################
+####                Room Generation                                    ####
+###########################################################################
+
+
+class Layout():
+
+    def __init__(self, rooms, seed, loop_density=0.1):
+        """ Input: number of rooms (int), seed (int), loop_density
+            (float, chance a room opens both north and east)
+            Return: none
+            The grid and which way each room opens.  Any room's links
+            can be worked out from the room and its neighbors alone.
+        """
+        self.rooms = rooms
+        self.seed = seed
+        self.width = max(1, ceil(sqrt(rooms)))
+        self._loop_threshold = int(loop_density * 1024)
+
+    def _opens(self, number):
+        """ Returns (opens north, opens east) for room number """
+        row, column = divmod(number, self.width)
+        has_north = row > 0
+        has_east = column < self.width - 1 and number + 1 < self.rooms
+        if not has_north:
+            return (False, has_east)
+        if not has_east:
+            return (True, False)
+        bits = _mix(self.seed, number)
+        north = bool(bits & 1)
+        loop = (bits >> 1) & 1023 < self._loop_threshold
+        return (north or loop, not north or loop)
+
+    def links(self, number):
+        """ Input: room number (int)
+            Return: dict of direction -> room number
+        """
+        width = self.width
+        north, east = self._opens(number)
+        links = {}
+        if north:
+            links["north"] = number - width
+        if east:
+            links["east"] = number + 1
+        if number + width < self.rooms and self._opens(number + width)[0]:
+            links["south"] = number + width
+        if number % width and self._opens(number - 1)[1]:
+            links["west"] = number - 1
+        return links
+
+
+def room_key(number):
+    """ Returns the world key of room number """
+    return "r{0}".format(number)
+
+
+def _generate_chunk(job):
+    """ Input: tuple of (chunk number, layout, npc_density,
+        item_density)
+        Return: the chunk's records as .world lines (string)
+    """
+    chunk, layout, npc_density, item_density = job
+    rng = Random(_mix(layout.seed, chunk + (1 << 40)))
+    lines = []
+    start = chunk * CHUNK_SIZE
+    for number in range(start, min(start + CHUNK_SIZE, layout.rooms)):
+        adjective = ADJECTIVES[rng.randrange(len(ADJECTIVES))]
+        kind = ROOM_TYPES[rng.randrange(len(ROOM_TYPES))]
+        record = {"name": "{0} {1} {2}".format(adjective, kind, number),
+                  "description": "A {0} {1}.  {2}".format(adjective.lower(), kind.lower(),
+                                                        DETAILS[rng.randrange(len(DETAILS))]),
+                  "links": {direction: room_key(other) for direction, other in
+                            layout.links(number).items()}}
+
+        if rng.random() < item_density:
+            record["item"] = LOOT[rng.randrange(len(LOOT))]
+            record["search"] = [[SEARCHES[rng.randrange(len(SEARCHES))], False],
+                                ["You find something tucked away.", True]]
+
+        # Each place is filled with chance npc_density / MAX_CHARACTERS,
+        # so a room has npc_density characters on average
+        count = sum(rng.random() * MAX_CHARACTERS < npc_density
+                    for _ in range(MAX_CHARACTERS))
+        characters = []
+        for place in range(count):
+            key = "c{0}_{1}".format(number, place)
+            characters.append(key)
+            if rng.random() < .8:
+                name, description, hit_points, attack_mod, max_damage = ENEMIES[
+                    rng.randrange(len(ENEMIES))]
+                character = {"class": "Enemy", "name": "{0} {1}".format(name, key[1:]),
+                             "description": description,
+                             "constitution": rng.randint(*hit_points), "weapon": "fists",
+                             "attack_mod": attack_mod, "max_damage": max_damage,
+                             "weakness": WEAPONS[rng.randrange(len(WEAPONS))] if rng.random() <
+                             .3 else "any", "items": [LOOT[rng.randrange(len(LOOT))]] if
+                             rng.random() < item_density else []}
+            else:
+                name, description = FRIENDS[rng.randrange(len(FRIENDS))]
+                character = {"class": "Friend", "name": "{0} {1}".format(name, key[1:]),
+                             "description": description, "constitution": rng.randint(8, 15),
+                             "weapon": "fists", "conversation": ["Please, help me get out of "
+                                                                 "this place."]}
+            lines.append("character\t{0}\t{1}\n".format(key, json.dumps(character)))
+        if characters:
+            record["characters"] = characters
+
+        lines.append("room\t{0}\t{1}\n".format(room_key(number), json.dumps(record)))
+    return "".join(lines)
+
+
+def generate(path, rooms, seed=0, npc_density=.2, item_density=.1, loop_density=.1,
+             workers=None):
+    """ Input: output path (string), number of rooms (int), seed (int),
+        npc_density (float, characters per room on average, up to
+        MAX_CHARACTERS), item_density (float, chance a room has an item
+        to find), loop_density (float), worker processes (int, None for
+        one per core, 1 to stay in this process)
+        Return: World object for the new file
+        Writes a connected manor to a .world file.
+    """
+    if rooms < 1:
+        raise ValueError("A manor needs at least one room.")
+    if not 0 <= npc_density <= MAX_CHARACTERS:
+        raise ValueError("npc_density must be between 0 and {0}.".format(MAX_CHARACTERS))
+    layout = Layout(rooms, seed, loop_density)
+    jobs = [(chunk, layout, npc_density, item_density)
+            for chunk in range(ceil(rooms / CHUNK_SIZE))]
+
+    with open(path, "w", encoding="utf-8") as world_file:
+        write_records(world_file, "world", [("meta", {
+            "start": room_key(0), "seed": seed,
+            "player": {"constitution": 50, "weapon": "rusty sword", "attack_mod": 1.25,
+                       "max_damage": 6, "items": ["rusty sword", "wine flask"]}})])
+        write_records(world_file, "item", ((key, {"name": name, "type": item_type,
+                                                  "description": description})
+                                           for key, (name, item_type, description) in
+                                           ITEMS.items()))
+        if workers == 1 or len(jobs) == 1:
+            for text in map(_generate_chunk, jobs):
+                world_file.write(text)
+        else:
+            with Pool(workers) as pool:
+                # imap keeps chunks in order, so the file is the same
+                for text in pool.imap(_generate_chunk, jobs):
+                    world_file.write(text)
+
+    return World(path)
+
+
+def main(argv=None):
+    """ Input: command line arguments (list of strings or None)
+        Return: none
+    """
+    parser = argparse.ArgumentParser(description="Generate a connected manor as a .world file.")
+    parser.add_argument("path")
+    parser.add_argument("-n", "--rooms", type=int, default=1000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--npc-density", type=float, default=.2,
+                        help="characters per room on average (at most {0})".format(
+                            MAX_CHARACTERS))
+    parser.add_argument("--item-density", type=float, default=.1,
+                        help="chance a room has an item to find")
+    parser.add_argument("--loop-density", type=float, default=.1)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    world = generate(args.path, args.rooms, args.seed, args.npc_density, args.item_density,
+                     args.loop_density, args.workers)
+    print("Wrote {0} rooms to {1} ({2:.1f} MB)".format(len(world), args.path,
+                                                      os.path.getsize(args.path) / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+###########################################################################
+##  This is the inventory class for my text adventure prototype.         ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+
+from random import randrange
+
+
+def _stack_key(item):
+    """ Items with the same key are identical and share a stack """
+    overrides = item._overrides
+    if overrides is None:
+        return item._prototype._id
+    return (item._prototype._id, tuple(sorted(overrides.items())))
+
+
+class Inventory():
+
+    __slots__ = ("_where", "_stacks", "_by_name", "_by_type", "_all", "_positions", "_version")
+
+    def __init__(self, items=()):
+        """ Input: items (list of item objects)
+            Return: none
+            A character's items.  Identical items (same prototype and
+            overrides) are kept together in one stack, and stacks are
+            indexed by name and by type, so adding, removing, finding
+            an item by name and picking one at random are all O(1).
+            NOTE: Each Item object can only be in an inventory once;
+            adding one that's already here does nothing (add an equal
+            Item to hold two).  If an item is renamed while in an
+            inventory, call reindex().
+        """
+        # item -> stack key, in the order items were added
+        self._where = {}
+        # stack key -> [name, type, {item: None}]
+        self._stacks = {}
+        # name/type -> {stack key: None}
+        self._by_name = {}
+        self._by_type = {}
+        # Every item in an array, for picking one at random
+        self._all = []
+        self._positions = {}
+        # Bumped whenever an item is added or removed
+        self._version = 0
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """ Input: item object
+            Return: none
+            Does nothing if item is already here.
+        """
+        if item in self._where:
+            return
+        key = _stack_key(item)
+        stack = self._stacks.get(key)
+        if stack is None:
+            stack = self._stacks[key] = [item.name, item.type, {}]
+            self._by_name.setdefault(stack[0], {})[key] = None
+            self._by_type.setdefault(stack[1], {})[key] = None
+        stack[2][item] = None
+        self._where[item] = key
+        self._positions[item] = len(self._all)
+        self._all.append(item)
+        self._version += 1
+
+    def discard(self, item):
+        """ Input: item object
+            Return: none
+            Removes item if it's here.
+        """
+        key = self._where.pop(item, None)
+        if key is None:
+            return
+        name, item_type, members = self._stacks[key]
+        del members[item]
+        if not members:
+            del self._stacks[key]
+            for index, field in ((self._by_name, name), (self._by_type, item_type)):
+                del index[field][key]
+                if not index[field]:
+                    del index[field]
+
+        # Swap the last item into the hole
+        position = self._positions.pop(item)
+        last = self._all.pop()
+        if last is not item:
+            self._all[position] = last
+            self._positions[last] = position
+        self._version += 1
+
+    def remove(self, item):
+        """ Input: item object
+            Return: none
+            Like discard(), but raises ValueError if it isn't here.
+        """
+        if item not in self._where:
+            raise ValueError("{0} is not in this inventory".format(item.name))
+        self.discard(item)
+
+    def reindex(self, item):
+        """ Input: item object changed since it was added
+            Return: none
+        """
+        if item in self._where:
+            self.discard(item)
+            self.add(item)
+
+    def by_name(self, item_name):
+        """ Input: item_name (string)
+            Return: an item with that name, or None
+        """
+        keys = self._by_name.get(item_name)
+        if not keys:
+            return None
+        return next(iter(self._stacks[next(iter(keys))][2]))
+
+    def of_type(self, item_type):
+        """ Input: item_type (string)
+            Return: items of that type (list)
+        """
+        return [item for key in self._by_type.get(item_type, ())
+                for item in self._stacks[key][2]]
+
+    def count(self, item_name):
+        """ Input: item_name (string)
+            Return: number of items with that name (int)
+        """
+        return sum(len(self._stacks[key][2]) for key in self._by_name.get(item_name, ()))
+
+    def names(self, item_type=None):
+        """ Input: item_type (string) to filter by, or None
+            Return: names of the items (list of strings), each once
+        """
+        if item_type is None:
+            return list(self._by_name)
+        return list(dict.fromkeys(self._stacks[key][0] for key in
+                                  self._by_type.get(item_type, ())))
+
+    def stacks(self, item_type=None):
+        """ Input: item_type (string) to filter by, or None
+            Return: list of (item object, how many) tuples, one per
+            stack of identical items
+        """
+        keys = self._stacks if item_type is None else self._by_type.get(item_type, ())
+        return [(next(iter(self._stacks[key][2])), len(self._stacks[key][2])) for key in keys]
+
+    def labels(self, item_type=None):
+        """ Input: item_type (string) to filter by, or None
+            Return: "name" or "name (x3)" for each stack (list of
+            strings)
+        """
+        return [item.name if count == 1 else "{0} (x{1})".format(item.name, count)
+                for item, count in self.stacks(item_type)]
+
+    def random_item(self):
+        """ Input: none
+            Return: an item chosen uniformly at random, or None if empty
+        """
+        if not self._all:
+            return None
+        return self._all[randrange(len(self._all))]
+
+    def __iadd__(self, items):
+        """ character.items += [item(s)] adds them """
+        for item in items:
+            self.add(item)
+        return self
+
+    def __contains__(self, item):
+        return item in self._where
+
+    def __len__(self):
+        return len(self._where)
+
+    def __iter__(self):
+        """ Yields items in the order they were added """
+        return iter(list(self._where))
+
+    def __getitem__(self, position):
+        """ Positional access, for code written against lists """
+        return list(self._where)[position]
@@ -18,68 +18,296 @@
 ###########################################################################
 
 
+from collections import deque
+from itertools import count, repeat
+from sys import intern
+from weakref import WeakValueDictionary
+
+from .strings import text
+
+
+###########################################################################
+####                Item Prototype Registry                            ####
+###########################################################################
+
+# The registries only hold prototypes and name ids while something uses
+# them, so a long game or a huge world doesn't keep every kind of item
+# it ever made.  Prototypes given a key with define_prototype() are kept.
+
+# Prototypes by prototype id; ids are never reused
+_prototypes = WeakValueDictionary()
+_prototype_ids = count()
+
+# Prototype lookup by key (string) and by (name, type, description)
+_by_key = {}
+_by_fields = WeakValueDictionary()
+
+# One id for every item name in use, so names compare by identity
+_name_ids = WeakValueDictionary()
+
+
+class _NameId():
+
+    __slots__ = ("_name", "__weakref__")
+
+    def __init__(self, name):
+        """ Stands in for an item name; see name_id() """
+        self._name = name
+
+    def __reduce__(self):
+        # Unpickled ids are looked up again, so they still match
+        return (name_id, (self._name,))
+
+    def __repr__(self):
+        return "name_id({0!r})".format(self._name)
+
+
+def name_id(name):
+    """ Input: item name (string) or None
+        Return: id shared by every item with this name, or None for None
+        (e.g. an Enemy with no weakness).  Ids compare by identity, so
+        they're as quick to compare as ints, and are dropped once
+        nothing uses them.
+    """
+    if name is None:
+        return None
+    found = _name_ids.get(name)
+    if found is None:
+        found = _name_ids[name] = _NameId(intern(name))
+    return found
+
+
+def define_prototype(key, item_name, item_type, item_description=None):
+    """ Input: key (string) used to look the prototype up later,
+        item_name (string), item_type (string), item_description
+        (string)
+        Return: ItemPrototype
+        Defines a kind of item (e.g. "club") once; items made from it
+        share its strings instead of holding their own copies.
+    """
+    if key in _by_key:
+        raise ValueError("Item prototype already defined: {0}".format(key))
+    prototype = _prototype_for(item_name, item_type, item_description)
+    _by_key[key] = prototype
+    return prototype
+
+
+def prototype(key):
+    """ Input: key (string) given to define_prototype()
+        Return: ItemPrototype
+    """
+    return _by_key[key]
+
+
+def prototype_by_id(prototype_id):
+    """ Input: prototype id (int)
+        Return: ItemPrototype; raises KeyError once no item (or key)
+        uses it
+    """
+    return _prototypes[prototype_id]
+
+
+def _prototype_for(item_name, item_type, item_description):
+    """ Returns the prototype with exactly these fields, making one if
+        it doesn't exist yet
+    """
+    fields = (item_name, item_type, item_description)
+    prototype = _by_fields.get(fields)
+    if prototype is None:
+        prototype = ItemPrototype(next(_prototype_ids), *fields)
+        _by_fields[fields] = prototype
+        _prototypes[prototype.id] = prototype
+    return prototype
+
+
+class ItemPrototype():
+
+    # __weakref__ so the registries can let go of unused prototypes
+    __slots__ = ("_id", "_name", "_name_id", "_item_type", "_description", "__weakref__")
+
+    def __init__(self, prototype_id, item_name, item_type, item_description=None):
+        """ Input: prototype_id (int), item_name (string), item_type
+            (string), item_description (string)
+            Return: none
+            Shared, read-only data for every item of one kind.  Use
+            define_prototype() rather than creating these directly.
+        """
+        self._id = prototype_id
+        self._name = intern(item_name)
+        self._name_id = name_id(item_name)
+        self._item_type = intern(item_type)
+        self._description = item_description
+
+    def __reduce__(self):
+        # Loaded items share the prototype with these fields, as Item() does
+        return (_prototype_for, (self._name, self._item_type, self._description))
+
+    @property
+    def id(self):
+        """ Return: prototype id (int) """
+        return self._id
+
+    @property
+    def name(self):
+        """ Return: name of items made from this prototype (string) """
+        return self._name
+
+    @property
+    def type(self):
+        """ Return: type of items made from this prototype (string) """
+        return self._item_type
+
+    @property
+    def description(self):
+        """ Return: description of items made from this prototype
+            (string)
+        """
+        return text(self._description)
+
+    def create(self, **overrides):
+        """ Input: optional name, type or description overrides
+            Return: new Item object of this kind
+        """
+        item = Item.__new__(Item)
+        item._prototype = self
+        item._overrides = None
+        for field, value in overrides.items():
+            setattr(item, field, value)
+        return item
+
+    def create_many(self, number):
+        """ Input: number of items (int)
+            Return: list of that many new Item objects of this kind
+            The items are made and filled in by map(), with no Python
+            loop, so this is a few times quicker than calling create().
+        """
+        items = list(map(Item.__new__, repeat(Item, number)))
+        deque(map(setattr, items, repeat("_prototype"), repeat(self)), maxlen=0)
+        deque(map(setattr, items, repeat("_overrides"), repeat(None)), maxlen=0)
+        return items
+
+
+###########################################################################
+####                Item Class                                         ####
+###########################################################################
+
+
 class Item():
-    
+
+    # An item is its prototype plus any fields changed on this one item
+    __slots__ = ("_prototype", "_overrides")
+
     def __init__(self, item_name, item_type, item_description = None):
-        """ Input: item_name (string), item_type (string), 
+        """ Input: item_name (string), item_type (string),
             item_description (string)
             Return: none
             Initializes an instance of the Item class w/ 3 attributes.
-            item_description is the only optional attribute.  All 
+            item_description is the only optional attribute.  All
             attributes can also be changed via setter methods.
+            NOTE: Items with the same name, type and description share
+            one ItemPrototype; see also define_prototype().
         """
-        self._name = item_name
-        self._description = item_description
-        self._item_type = item_type                
-    
+        self._prototype = _prototype_for(item_name, item_type, item_description)
+        self._overrides = None
+
+    def _get(self, field):
+        """ Returns this item's own value for field, else the prototype's """
+        if self._overrides is not None and field in self._overrides:
+            return self._overrides[field]
+        return getattr(self._prototype, field)
+
+    def _set(self, field, value):
+        """ Stores value for this item only, unless it matches the
+            prototype, in which case any override is dropped
+        """
+        if value == getattr(self._prototype, field):
+            if self._overrides is not None:
+                self._overrides.pop(field, None)
+                if not self._overrides:
+                    self._overrides = None
+        else:
+            if self._overrides is None:
+                self._overrides = {}
+            self._overrides[field] = value
+
+    @property
+    def prototype(self):
+        """ Input: nothing
+            Return: item's prototype (ItemPrototype object)
+        """
+        return self._prototype
+
+    @property
+    def prototype_id(self):
+        """ Input: nothing
+            Return: id of item's prototype (int)
+        """
+        return self._prototype.id
+
+    @property
+    def overrides(self):
+        """ Input: nothing
+            Return: fields changed on this item only (dict)
+        """
+        return dict(self._overrides or {})
+
     @property
     def name(self):
         """ Input: nothing
             Return: item's name (string)
         """
-        return self._name  
+        return self._get("name")
 
     @name.setter
-    def name(self, item_name):  
+    def name(self, item_name):
         """ Input: item_name (string)
             Return: none
         """
-        self._name = item_name  
+        self._set("name", item_name)
+
+    @property
+    def name_id(self):
+        """ Input: nothing
+            Return: id of item's name, see name_id()
+        """
+        if self._overrides is None or "name" not in self._overrides:
+            return self._prototype._name_id
+        return name_id(self._overrides["name"])
 
     @property
     def description(self):
         """ Input: nothing
             Return: item's description (string)
         """
-        return self._description    
+        return self._get("description")
 
     @description.setter
     def description(self, item_description):
         """ Input: item_description (string)
             Return: none
         """
-        self._description = item_description
+        self._set("description", item_description)
 
     @property
     def type(self):
         """ Input: nothing
             Return: item's type (string)
         """
-        return self._item_type
+        return self._get("type")
 
     @type.setter
     def type(self, item_type):
         """ Input: item_type (string)
             Return: none
         """
-        self._item_type = item_type
+        self._set("type", item_type)
 
 
     def __str__(self):
         """ Input: none
             Return: item name (type of item) and description (string)
-        """        
-        if self.type == "story":   
+        """
+        if self.type == "story":
             return "{0} ({1})\n\n{2}".format(self.name, self.type, self.description)
 
         return "{0} ({1}): {2}".format(self.name, self.type, self.description)
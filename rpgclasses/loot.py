@@ -0,0 +1,214 @@
+###########################################################################
+##  This is the loot table for my text adventure prototype.              ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Weighted loot tables for enemies.
+
+    Draws use the alias method: after an O(n) setup, each draw is one
+    random column plus one biased coin flip, whatever the number of
+    entries.  Stealing from an enemy uses the same method over the items
+    it carries (see LootTable.picker()).  Many draws can be rolled at once with counts(), which uses
+    NumPy when it's installed (pip install numpy) and plain Python
+    otherwise.
+"""
+
+from random import Random, random, randrange
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LootTable():
+
+    def __init__(self, entries):
+        """ Input: entries (list of (loot, weight) tuples), where loot is
+            an ItemPrototype, an example Item, or None for nothing
+            Return: none
+            A new Item object is made for every drop.
+        """
+        if not entries:
+            raise ValueError("A loot table needs at least one entry.")
+        self._prototypes = []
+        weights = []
+        for loot, weight in entries:
+            if weight < 0:
+                raise ValueError("Loot weights cannot be negative.")
+            self._prototypes.append(getattr(loot, "prototype", loot))
+            weights.append(float(weight))
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("Loot weights must add up to more than 0.")
+        self._weights = weights
+        # Total weight of each kind of item, for pick()
+        self._kind_weights = {}
+        for prototype, weight in zip(self._prototypes, weights):
+            if prototype is not None:
+                self._kind_weights[prototype] = self._kind_weights.get(prototype, 0.0) + weight
+        self._prob, self._alias = _alias_table([weight / total for weight in weights])
+        self._arrays = None
+
+    @property
+    def entries(self):
+        """ Return: list of (ItemPrototype or None, weight) tuples """
+        return list(zip(self._prototypes, self._weights))
+
+    def _draw(self):
+        """ Returns the index of one weighted draw, O(1) """
+        return _draw(self._prob, self._alias)
+
+    def _create(self, index):
+        """ Returns a new Item for entry index, or None """
+        prototype = self._prototypes[index]
+        return None if prototype is None else prototype.create()
+
+    def roll(self):
+        """ Input: none
+            Return: new Item object, or None if nothing dropped
+        """
+        return self._create(self._draw())
+
+    def picker(self, items):
+        """ Input: items (list of Item objects), e.g. what an enemy
+            carries
+            Return: ItemPicker object whose pick() gives one of items,
+            each as likely as the table's weight for its kind (all
+            equally likely if the table gives none of them any weight)
+            Setting up is O(n); keep the picker while items don't change
+            (as Enemy.steal() does) and each pick is O(1).
+        """
+        return ItemPicker(items, [self._kind_weights.get(item.prototype, 0.0)
+                                  for item in items])
+
+    def pick(self, items):
+        """ Input: items (list of Item objects)
+            Return: one of items, see picker()
+        """
+        return self.picker(items).pick()
+
+    def counts(self, draws, rng=None):
+        """ Input: number of draws (int), rng (seed, random.Random or
+            numpy.random.Generator, or None)
+            Return: how many times each entry came up (list of ints, in
+            the order of entries)
+            Rolls every draw at once, e.g. for a million simulated kills.
+        """
+        size = len(self._prob)
+        if np is not None and not isinstance(rng, Random):
+            if self._arrays is None:
+                self._arrays = (np.array(self._prob), np.array(self._alias, dtype=np.int64))
+            prob, alias = self._arrays
+            rng = np.random.default_rng(rng)
+            columns = rng.integers(0, size, draws)
+            picks = np.where(rng.random(draws) < prob[columns], columns, alias[columns])
+            return np.bincount(picks, minlength=size).tolist()
+
+        if not isinstance(rng, Random):
+            rng = Random(rng)
+        prob, alias = self._prob, self._alias
+        counts = [0] * size
+        for _ in range(draws):
+            column = int(rng.random() * size)
+            counts[column if rng.random() < prob[column] else alias[column]] += 1
+        return counts
+
+    def roll_many(self, draws, rng=None):
+        """ Input: number of draws (int), rng (see counts())
+            Return: list of new Item objects (draws that dropped
+            nothing are left out)
+        """
+        drops = []
+        for prototype, count in zip(self._prototypes, self.counts(draws, rng)):
+            if prototype is not None and count:
+                drops += prototype.create_many(count)
+        return drops
+
+
+class ItemPicker():
+
+    __slots__ = ("_items", "_prob", "_alias")
+
+    def __init__(self, items, weights):
+        """ Input: items (list of Item objects), weights (list of
+            floats, one per item)
+            Return: none
+            Use LootTable.picker() rather than creating these directly.
+        """
+        if not items:
+            raise ValueError("There is nothing to pick from.")
+        self._items = items
+        total = sum(weights)
+        if total > 0:
+            self._prob, self._alias = _alias_table([weight / total for weight in weights])
+        else:
+            self._prob, self._alias = [1.0] * len(items), list(range(len(items)))
+
+    def pick(self):
+        """ Input: none
+            Return: one of the items, O(1)
+        """
+        return self._items[_draw(self._prob, self._alias)]
+
+
+def _draw(prob, alias):
+    """ Returns the index of one draw from an alias table, O(1) """
+    column = randrange(len(prob))
+    return column if random() < prob[column] else alias[column]
+
+
+def _alias_table(probabilities):
+    """ Input: probabilities (list of floats adding up to 1)
+        Return: (prob, alias) lists for the alias method (Vose)
+    """
+    size = len(probabilities)
+    scaled = [p * size for p in probabilities]
+    prob = [1.0] * size
+    alias = list(range(size))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Whatever is left is 1 up to rounding error
+    return (prob, alias)
+
+
+def drop_loot(enemies, rng=None, carried=False):
+    """ Input: enemies (list of Enemy objects) that were killed, rng
+        (see LootTable.counts()), carried (bool: also drop what they
+        carried)
+        Return: list of Item objects dropped
+        Each enemy with a loot table rolls it once.  Enemies sharing a
+        table are rolled together in one batch.
+    """
+    drops = []
+    tables = {}
+    for enemy in enemies:
+        if carried and enemy._items:
+            drops += list(enemy.items)
+            enemy.items = []
+        if enemy.loot is not None:
+            table, count = tables.get(id(enemy.loot), (enemy.loot, 0))
+            tables[id(table)] = (table, count + 1)
+    for table, count in tables.values():
+        drops += table.roll_many(count, rng)
+    return drops
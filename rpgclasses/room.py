@@ -18,8 +18,411 @@
 ###########################################################################
 
 
+import os
+from itertools import count
+from weakref import WeakValueDictionary
+
+from .cursor import Cursor
+from .dirty import _trackers, mark, set_unwatched_state, unwatched_state
+from .strings import TextRef, text
+
+
+# What searching a room gives once every search response has been given
+NOTHING_NEW = ("You find nothing new.", False)
+
+# Functions called as listener(room, direction, old, new) whenever
+# link_room() changes the link of a room no world built; old is the Room
+# (or room key) that was linked in that direction before, or None.  A
+# world's rooms tell the listeners in its Watchers instead.
+_link_listeners = []
+
+
+def add_link_listener(listener, watchers=None):
+    """ Input: listener (function, see _link_listeners), watchers (a
+        world's Watchers object, to hear of that world's rooms, or None
+        for rooms no world built)
+        Return: none
+    """
+    (_link_listeners if watchers is None else watchers.links).append(listener)
+
+
+def remove_link_listener(listener, watchers=None):
+    """ Input: listener (function) and watchers given to
+        add_link_listener()
+        Return: none
+    """
+    (_link_listeners if watchers is None else watchers.links).remove(listener)
+
+
+# Open worlds by token, so a LinkMap loaded from a pickle in the same
+# process links to the world that built its rooms again
+_worlds = WeakValueDictionary()
+_world_tokens = count()
+
+
+def register_world(world):
+    """ Input: World object, whose room() builds rooms from their keys
+        Return: the world's token (tuple), for unregister_world()
+    """
+    token = (os.getpid(), next(_world_tokens))
+    _worlds[token] = world
+    return token
+
+
+def unregister_world(token):
+    """ Input: token from register_world()
+        Return: none
+    """
+    _worlds.pop(token, None)
+
+
+def _load_links(links, token, keep):
+    """ Rebuilds a pickled LinkMap, see LinkMap.__reduce__ """
+    world = _worlds.get(token)
+    return LinkMap(links, None if world is None else world.room, keep)
+
+
+def _keep(pieces):
+    """ Input: pieces of text (strings and TextRefs)
+        Return: the pieces joined into one string, or, if any of them is
+        a TextRef, a tuple of them with the strings next to each other
+        joined.  Text from a string table isn't kept decoded (see
+        strings.py); _shown() decodes it as it's shown.
+    """
+    kept = []
+    for piece in pieces:
+        if not isinstance(piece, TextRef):
+            piece = str(piece)
+        if isinstance(piece, TextRef) or not kept or isinstance(kept[-1], TextRef):
+            kept.append(piece)
+        else:
+            kept[-1] += piece
+    if len(kept) == 1 and not isinstance(kept[0], TextRef):
+        return kept[0]
+    return tuple(kept) if kept else ""
+
+
+def _shown(kept):
+    """ Input: what _keep() returned
+        Return: the text (string)
+    """
+    return kept if isinstance(kept, str) else "".join(text(piece) for piece in kept)
+
+
+class LinkMap(dict):
+
+    __slots__ = ("_resolve", "_keep", "_version")
+
+    def __init__(self, links=(), resolve=None, keep=True):
+        """ Input: links (dict of direction -> Room object or room key),
+            resolve (function turning a room key into a Room object),
+            keep (bool: hold on to rooms once resolved)
+            Return: none
+            The linked_rooms dict of a Room.  Links can be stored as
+            room keys and are only turned into Room objects (via
+            resolve) the first time they are read, so loading one room
+            doesn't build the whole world.  With keep=False the key is
+            resolved on every read instead, so the rooms a room links to
+            can be dropped from memory (see store.py).
+            NOTE: A pickled LinkMap keeps the rooms already built and the
+            keys of the others, but not resolve, which holds the world's
+            open files.  Loaded while that world is open in the same
+            process, resolve is set to its room() again; otherwise set
+            resolve (e.g. to world.room) to follow those links.
+        """
+        super().__init__(links)
+        self._resolve = resolve
+        self._keep = keep
+        # Bumped on every change, so rooms know when to redraw
+        self._version = 0
+
+    def __setitem__(self, direction, room):
+        dict.__setitem__(self, direction, room)
+        self._version += 1
+
+    def __delitem__(self, direction):
+        dict.__delitem__(self, direction)
+        self._version += 1
+
+    def pop(self, *args):
+        self._version += 1
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._version += 1
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self._version += 1
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._version += 1
+
+    def setdefault(self, direction, default=None):
+        self._version += 1
+        return dict.setdefault(self, direction, default)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        world = getattr(self._resolve, "__self__", None)
+        return (_load_links, ({direction: self.key(direction) for direction in self},
+                              getattr(world, "_token", None), self._keep))
+
+    @property
+    def resolve(self):
+        """ Return: function turning a room key into a Room object, or
+            None
+        """
+        return self._resolve
+
+    @resolve.setter
+    def resolve(self, resolve):
+        self._resolve = resolve
+
+    def __getitem__(self, direction):
+        room = dict.__getitem__(self, direction)
+        if not isinstance(room, Room):
+            if self._resolve is None:
+                raise KeyError("{0}: room {1!r} was never built here".format(direction, room))
+            room = self._resolve(room)
+            if self._keep:
+                dict.__setitem__(self, direction, room)
+        return room
+
+    def get(self, direction, default=None):
+        return self[direction] if direction in self else default
+
+    def values(self):
+        return [self[direction] for direction in self]
+
+    def items(self):
+        return [(direction, self[direction]) for direction in self]
+
+    def key(self, direction):
+        """ Input: direction (string)
+            Return: linked Room object, or its key if not yet built
+        """
+        return dict.__getitem__(self, direction)
+
+
+class Occupants():
+
+    __slots__ = ("_members", "_factions", "_text", "_room")
+
+    def __init__(self, characters=(), room=None):
+        """ Input: characters (list of character objects), room (Room
+            object they're in, marked as changed when they come and go;
+            see dirty.py)
+            Return: none
+            The characters of a Room, in the order they arrived, and
+            also filed by faction (see Character.faction) so a room's
+            party, neutral characters and enemies can be read without
+            checking everyone in it.  Adding, removing and refiling a
+            character are O(1).
+        """
+        # character -> faction, in order of arrival
+        self._members = {}
+        self._factions = {"party": {}, "neutral": {}, "enemies": {}, None: {}}
+        # Rendered text of each faction (see _keep()), see describe()
+        self._text = {}
+        self._room = room
+        for character in characters:
+            self.add(character)
+
+    def __setstate__(self, state):
+        # Characters aren't pickled with the room they're in, see
+        # Character.__getstate__
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        for character in self._members:
+            character._location = self
+
+    def add(self, character):
+        """ Input: character object
+            Return: none
+        """
+        if character in self._members:
+            return
+        faction = character.faction
+        self._members[character] = faction
+        self._factions[faction][character] = None
+        self._text.pop(faction, None)
+        character._location = self
+        if _trackers and self._room is not None:
+            mark(self._room)
+
+    def discard(self, character):
+        """ Input: character object
+            Return: none
+            Removes character if it's here.
+        """
+        if character not in self._members:
+            return
+        faction = self._members.pop(character)
+        del self._factions[faction][character]
+        self._text.pop(faction, None)
+        if character._location is self:
+            character._location = None
+        if _trackers and self._room is not None:
+            mark(self._room)
+
+    def remove(self, character):
+        """ Input: character object
+            Return: none
+            Like discard(), but raises ValueError if it isn't here.
+        """
+        if character not in self._members:
+            raise ValueError("{0} is not in this room".format(character.name))
+        self.discard(character)
+
+    def discard_all(self, characters):
+        """ Input: characters (list of character objects)
+            Return: none
+        """
+        for character in characters:
+            self.discard(character)
+
+    def transfer(self, characters, destination):
+        """ Input: characters (list of character objects), destination
+            (Occupants object)
+            Return: none
+            Moves a group from here to destination in time proportional
+            to the group.  Raises ValueError, moving no one, if any of
+            them isn't here.
+        """
+        Occupants.transfer_many([(self, characters, destination)])
+
+    @staticmethod
+    def transfer_many(moves):
+        """ Input: moves (iterable of (source Occupants, list of
+            character objects, destination Occupants) tuples)
+            Return: none
+            Makes every move, in order, so a group can pass through
+            several rooms in one batch.  Everyone is checked before
+            anyone moves: if a character isn't in the room it's moved
+            from at that point, ValueError is raised and nothing
+            changes.  A room's text is cleared, and the room marked as
+            changed, once however many groups come and go.
+        """
+        moves = [(source, list(characters), destination)
+                 for source, characters, destination in moves]
+
+        # Where each character checked so far ends up
+        moved = {}
+        for source, characters, destination in moves:
+            for character in characters:
+                if character in moved:
+                    here = moved[character] is source
+                else:
+                    here = character in source._members
+                if not here:
+                    raise ValueError("{0} is not in this room".format(character.name))
+                moved[character] = destination
+
+        changed = {}
+        for source, characters, destination in moves:
+            members, factions = source._members, source._factions
+            to_members, to_factions = destination._members, destination._factions
+            for character in characters:
+                faction = members.pop(character)
+                del factions[faction][character]
+                to_members[character] = faction
+                to_factions[faction][character] = None
+                character._location = destination
+            if characters:
+                changed[source] = None
+                changed[destination] = None
+        for occupants in changed:
+            occupants._text.clear()
+            if _trackers and occupants._room is not None:
+                mark(occupants._room)
+
+    def refile(self, character):
+        """ Input: character object whose faction changed
+            Return: none
+            Called by the character (e.g. Friend.in_party) when needed.
+        """
+        old = self._members.get(character, False)
+        new = character.faction
+        if old is not False and old != new:
+            del self._factions[old][character]
+            self._factions[new][character] = None
+            self._members[character] = new
+            self._text.pop(old, None)
+            self._text.pop(new, None)
+
+    def redraw(self, character):
+        """ Input: character object whose name or description changed
+            Return: none
+            Called by the character when needed.
+        """
+        self._text.pop(self._members.get(character), None)
+
+    def describe(self, faction):
+        """ Input: faction (string): "party", "neutral" or "enemies"
+            Return: names and descriptions of that faction's characters
+            (string), "" if there are none
+            The text is kept until someone in the faction changes.
+        """
+        kept = self._text.get(faction)
+        if kept is None:
+            # As Character.__str__, keeping descriptions from a string
+            # table as they are
+            pieces = []
+            for character in self._factions[faction]:
+                if pieces:
+                    pieces.append(", ")
+                pieces += [character.name, " (", character._description, ")"]
+            kept = self._text[faction] = _keep(pieces)
+        return _shown(kept)
+
+    @property
+    def party(self):
+        """ Return: Friends in the player's party (list) """
+        return list(self._factions["party"])
+
+    @property
+    def neutral(self):
+        """ Return: Friends not in the player's party (list) """
+        return list(self._factions["neutral"])
+
+    @property
+    def enemies(self):
+        """ Return: Enemies (list) """
+        return list(self._factions["enemies"])
+
+    def __iadd__(self, characters):
+        """ room.characters += [character(s)] adds them """
+        for character in characters:
+            self.add(character)
+        return self
+
+    def __contains__(self, character):
+        return character in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        """ Yields characters in the order they arrived """
+        return iter(list(self._members))
+
+    def __getitem__(self, position):
+        """ Positional access, for code written against lists """
+        return list(self._members)[position]
+
+
 class Room():
 
+    # __weakref__ so a WorldStore can tell when nothing uses a room
+    __slots__ = ("_name", "_description", "_characters", "_item", "_search_gen",
+                 "_linked_rooms", "_text", "_text_key", "_watchers", "__weakref__")
+
     def __init__(self, room_name, description):
         """ Input: room_name (string), description (string)
             Return: none
@@ -29,13 +432,26 @@ class Room():
             setter methods.  In order to access room in game, link it 
             to at least one other room via the link_room method.
         """
+        # Watchers of the world that built the room, see dirty.py
+        self._watchers = None
         self._name = room_name
         self._description = description
-        self._characters = []
+        self._characters = None
         self._item = None 
         self._search_gen = None       
-        self.linked_rooms = {}
+        self._text = None
+        self._text_key = None
+        self.linked_rooms = LinkMap()
         
+    def __getstate__(self):
+        """ Pickles the room without the world watching it.  Its text is
+            drawn again once loaded.
+        """
+        return unwatched_state(self, ("_text", "_text_key"))
+
+    def __setstate__(self, state):
+        set_unwatched_state(self, state, ("_text", "_text_key"))
+
     @property
     def name(self):
         """ Input: nothing
@@ -49,13 +465,18 @@ class Room():
             Return: none
         """
         self._name = new_name
+        # Rooms linked to this one see the new name when next shown
+        self._text = None
+        if _trackers:
+            mark(self)
 
     @property
     def description(self):
         """ Input: nothing
             Return: room's description (string)
         """
-        return self._description
+        # Text from a string table is decoded each time it's shown
+        return text(self._description)
     
     @description.setter
     def description(self, room_description):
@@ -63,28 +484,59 @@ class Room():
             Return: none
         """
         self._description = room_description
+        self._text = None
+        if _trackers:
+            mark(self)
+
+    @property
+    def linked_rooms(self):
+        """ Input: nothing
+            Return: rooms linked to this one (LinkMap, a dict of
+                    direction -> Room object)
+        """
+        return self._linked_rooms
+
+    @linked_rooms.setter
+    def linked_rooms(self, links):
+        """ Input: dict of direction -> Room object (or LinkMap)
+            Return: none
+        """
+        self._linked_rooms = links if isinstance(links, LinkMap) else LinkMap(links)
+        self._text = None
+        if _trackers:
+            mark(self)
 
     @property
     def characters(self):
         """ Input: nothing
-            Return: character in the room (Character object) or
-                    None if no character in room
+            Return: characters in the room (Occupants object); see its
+                    party, neutral and enemies properties
         """
+        # Empty rooms don't allocate anything until someone is placed
+        if self._characters is None:
+            self._characters = Occupants(room=self)
         return self._characters
     
     @characters.setter
     def characters(self, characters):
         """ Input: list of characters objects
             Return: none
-            Places a character in the room
+            Replaces the characters in the room
 
             NOTE: The add_characters and remove_characters methods were removed.
             To add (a) character(s): room.characters += [character(s)]
             To remove one character: room.characters.remove(character)
-            To remove multiple characters: room.characters = [character for 
-            character in room.characters if not in [charactersToRemove]]
+            To remove multiple characters: 
+            room.characters.discard_all([charactersToRemove])
         """
-        self._characters = characters
+        if characters is self._characters:
+            # room.characters += [...] has already updated it in place
+            return
+        if self._characters is not None:
+            self._characters.discard_all(list(self._characters))
+        self._characters = Occupants(characters, self)
+        if _trackers:
+            mark(self)
 
     @property
     def item(self):
@@ -100,11 +552,14 @@ class Room():
             Places an item in the room
         """
         self._item = item
+        if _trackers:
+            mark(self)
 
     @property
     def search_gen(self):
         """ Input: none
-            Return: generator or None
+            Return: Cursor object (call next() on it for the next search
+            response) or None
         """
         return self._search_gen
 
@@ -112,10 +567,14 @@ class Room():
     def search_gen(self, search_responses):
         """ Input: A tuple of tuples containing (1) search response 
             (string) (2) whether item found/event triggered (boolean)
+            and optionally (3) id of the scripted event it triggers
+            (string), see events.EventRegistry
             Return: none
-            Assigns self._search_gen to the search method (generator)
+            Assigns self._search_gen to the search method (Cursor)
         """
         self._search_gen = self.search(search_responses)
+        if _trackers:
+            mark(self)
 
     def link_room(self, room_to_link, direction):
         """ Input: room_to_link (Room object), direction (string)
@@ -124,49 +583,82 @@ class Room():
             NOTE: The default paradigm is to only link rooms that are
             directly adjacent, but could implement fast travel/secret
             passages by linking rooms not directly adjacent.
+            Links are one way; link the other room back for a two way
+            door.  Listeners (see add_link_listener) are told of the
+            change.
         """
+        old = self.linked_rooms.key(direction) if direction in self.linked_rooms else None
         self.linked_rooms[direction] = room_to_link
+        if _trackers:
+            mark(self)
+        listeners = _link_listeners if self._watchers is None else self._watchers.links
+        for listener in list(listeners):
+            listener(self, direction, old, room_to_link)
 
-    def move(self, direction, party):
-        """ Input: direction (string), party (list of Friend objects)
+    def move(self, direction, party, output=None):
+        """ Input: direction (string), party (list of Friend objects),
+            output (file to tell the player on, or None for stdout)
             Return: room object
             If possible, moves player in direction input, otherwise  
             returns self to keep player in current room, informs player.
         """
         if direction in self.linked_rooms:
             # Move party to next room and remove from this room
-            self.linked_rooms[direction].characters += party
-            self.characters = [character for character in self.characters if character 
-                               not in party]
+            destination = self.linked_rooms[direction]
+            self.transfer(party, destination)
             # Move player to new room
-            return self.linked_rooms[direction]
+            return destination
         else:
-            print("\nYou can't go that way.")
+            print("\nYou can't go that way.", file=output)
             return self
 
-    def search(self, search_responses):
-        """ Input: information gained by searching (list of strings)
-            Yield: Tuple containing (1) search response (string), 
-            (2) whether to find item/trigger event (boolean)
+    def transfer(self, group, destination):
+        """ Input: group (list of character objects), destination (Room
+            object)
+            Return: none
+            Moves a whole group (a party, an army, a caravan) to
+            destination, whether or not the rooms are linked.  Takes
+            time proportional to the group, not to how full the rooms
+            are.  Raises ValueError, moving no one, if any of the group
+            isn't in this room.
         """
-        for response in search_responses:
-            yield response
+        self.characters.transfer(group, destination.characters)
 
-        while True:
-            yield ("You find nothing new.", False)
+    @staticmethod
+    def transfer_many(moves):
+        """ Input: moves (iterable of (source Room, group, destination
+            Room) tuples)
+            Return: none
+            Moves several groups in one batch, in order, e.g. every
+            caravan travelling this tick; see Occupants.transfer_many()
+        """
+        Occupants.transfer_many((source.characters, group, destination.characters)
+                                for source, group, destination in moves)
+
+    def search(self, search_responses):
+        """ Input: information gained by searching (list of tuples)
+            Return: Cursor object; next() on it gives a tuple containing
+            (1) search response (string), (2) whether to find
+            item/trigger event (boolean)
+        """
+        return Cursor(tuple(search_responses), NOTHING_NEW)
 
     def __str__(self):
         """ Input: nothing
             Return: roomStr (string)
             String representation includes room name, description, and 
             the names and relative directions of all rooms linked to it.
+            The text is kept until the room, its links, or the name of
+            a room it links to, changes.
         """
-    
-        roomStr = "The {0}\n".format(self.name)         
-        roomStr += "-------------------------\n"
-        roomStr += "{0}\n\n".format(self.description)
-        for direction in self.linked_rooms:
-            room = self.linked_rooms[direction]            
-            roomStr += "The {0} is {1}.\n".format(room.name, direction)
-
-        return roomStr    
+        linked = self._linked_rooms.items()
+        key = (self._linked_rooms._version, tuple(room._name for _, room in linked))
+        if self._text is None or self._text_key != key:
+            pieces = ["The {0}\n".format(self.name), "-------------------------\n",
+                      self._description, "\n\n"]
+            for direction, room in linked:
+                pieces.append("The {0} is {1}.\n".format(room.name, direction))
+            self._text = _keep(pieces)
+            self._text_key = key
+
+        return _shown(self._text)
@@ -0,0 +1,312 @@
+###########################################################################
+##  This is the room routing for my text adventure prototype.            ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Shortest routes between the rooms the player knows, following
+    linked_rooms.
+
+    Only rooms that have been visited (see Router.visit()) are routed
+    through or to, so routes never give away rooms the player hasn't
+    found.  Visiting a room just notes it; its links are read the next
+    time a route is asked for, and only as keys, so the rooms it leads
+    to aren't built (or kept) by the router.  The router's memory grows
+    with the rooms visited, not with the world.
+
+    Links are one way (a secret passage needn't lead back), so routes
+    are found with a breadth first search run backwards from the
+    destination over incoming links.  That search gives the next step
+    towards the destination from every room at once, so it is kept and
+    later routes to the same room, from anywhere, just follow it.
+    When link_room() changes a link, or a room visited is read, only the
+    destinations whose routes it could change are searched again.
+
+    Given a world, a router knows rooms by key, reading their links with
+    World.outline(), so a room needn't be in memory to be routed through,
+    e.g. in a WorldStore.
+"""
+
+from collections import OrderedDict
+
+from .room import add_link_listener, remove_link_listener
+
+
+_UNREACHABLE = float("inf")
+
+
+class Router():
+
+    def __init__(self, rooms=(), max_destinations=64, world=None):
+        """ Input: rooms (Room objects, or keys with a world) the player
+            already knows, max number of destinations to keep routes to
+            (int), world (World object the rooms came from, to know them
+            by key, or None to know the Room objects themselves)
+            Return: none
+            Call visit() as the player finds more rooms, and close() when
+            done with the router.
+        """
+        self._world = world
+        # Known rooms (or keys) by id, their names when read, and the
+        # ids of the rooms by lower case name
+        self._ids = {}
+        self._rooms = []
+        self._names = []
+        self._by_name = {}
+        # Links between known rooms: room id -> {direction: room id}
+        self._links = []
+        # Incoming links: room id -> {(room id, direction): None}, a dict
+        # rather than a set so ties are broken the same way every run
+        self._incoming = []
+        # Links from known rooms into rooms not visited yet: room (or
+        # key) -> {(room id, direction): None}
+        self._waiting = {}
+        # Rooms visited whose links haven't been read yet
+        self._unread = OrderedDict()
+        # Destination id -> (steps from each room id, direction to take)
+        self._trees = OrderedDict()
+        self._max_destinations = max_destinations
+        for room in rooms:
+            self.visit(room)
+        # Only this world's rooms are heard of
+        self._watchers = None if world is None else world.watchers
+        add_link_listener(self._linked, self._watchers)
+
+    def _node(self, room):
+        """ Returns what room is known by: its key if there's a world
+            that knows it, else the room itself
+        """
+        if self._world is None or room is None or isinstance(room, str):
+            return room
+        key = self._world.key_of(room)
+        return room if key is None else key
+
+    def _room(self, node):
+        """ Returns the Room object for a known room """
+        return self._world.room(node) if isinstance(node, str) else node
+
+    def _outline(self, node):
+        """ Returns (name, [(direction, node), ...]) for a known room,
+            without building the rooms it links to
+        """
+        if isinstance(node, str):
+            name, links = self._world.outline(node)
+        else:
+            links = node.linked_rooms
+            name, links = node.name, {direction: links.key(direction) for direction in links}
+        return (name, [(direction, self._node(linked)) for direction, linked in links.items()])
+
+    def visit(self, room):
+        """ Input: room (Room object, or key with a world) the player
+            has found
+            Return: none
+            Cheap: the room's links are only read when next needed.
+        """
+        node = self._node(room)
+        if node in self._ids:
+            # Keep up with a room renamed since it was read
+            if not isinstance(room, str) and room.name != self._names[self._ids[node]]:
+                self._rename(self._ids[node], room.name)
+        else:
+            self._unread[node] = None
+
+    def _rename(self, room_id, name):
+        """ Files room_id under its new name """
+        old = self._names[room_id].lower()
+        if self._by_name.get(old) == room_id:
+            del self._by_name[old]
+        self._names[room_id] = name
+        self._by_name.setdefault(name.lower(), room_id)
+
+    def _connect(self, source, direction, target):
+        """ Records a link between two known rooms """
+        self._links[source][direction] = target
+        self._incoming[target][(source, direction)] = None
+
+    def _read(self):
+        """ Reads the links of every room visited since the last route """
+        if not self._unread:
+            return
+        ids, links, incoming, waiting = self._ids, self._links, self._incoming, self._waiting
+        while self._unread:
+            node = self._unread.popitem(last=False)[0]
+            if node in ids:
+                continue
+            room_id = ids[node] = len(self._rooms)
+            name, room_links = self._outline(node)
+            self._rooms.append(node)
+            self._names.append(name)
+            self._by_name.setdefault(name.lower(), room_id)
+            links.append({})
+            incoming.append({})
+            for source, direction in waiting.pop(node, ()):
+                self._connect(source, direction, room_id)
+            for direction, linked in room_links:
+                if linked in ids:
+                    self._connect(room_id, direction, ids[linked])
+                else:
+                    waiting.setdefault(linked, {})[(room_id, direction)] = None
+            self._add_to_trees(room_id)
+
+    def _add_to_trees(self, room_id):
+        """ Brings the kept routes up to date with a room just read.  A
+            route the room can shorten is forgotten; otherwise the room
+            is added to it, if it leads there at all.
+        """
+        links, incoming = self._links[room_id], self._incoming[room_id]
+        for destination, (steps, hops) in list(self._trees.items()):
+            # The room's own way there, if it has one
+            best = None
+            for direction, target in links.items():
+                if target in steps and (best is None or steps[target] < steps[links[best]]):
+                    best = direction
+            if best is None:
+                # It doesn't lead there, so nothing through it does
+                continue
+            distance = steps[links[best]] + 1
+            if any(steps.get(source, _UNREACHABLE) > distance + 1
+                   for source, _ in incoming if source != room_id):
+                del self._trees[destination]
+            else:
+                steps[room_id] = distance
+                hops[room_id] = best
+
+    def _linked(self, room, direction, old, new):
+        """ Link listener: keeps the known links and kept routes up to
+            date
+        """
+        room = self._node(room)
+        if room not in self._ids:
+            # Not read yet; it'll be read with its new link when it is
+            return
+        source = self._ids[room]
+        if direction in self._links[source]:
+            target = self._links[source].pop(direction)
+            del self._incoming[target][(source, direction)]
+        else:
+            links_in = self._waiting.get(self._node(old))
+            if links_in is not None:
+                links_in.pop((source, direction), None)
+                if not links_in:
+                    del self._waiting[self._node(old)]
+        new = self._node(new)
+        if new not in self._ids:
+            # Leads somewhere not visited (or not read) yet
+            self._waiting.setdefault(new, {})[(source, direction)] = None
+            target = None
+        else:
+            target = self._ids[new]
+            self._connect(source, direction, target)
+
+        for destination, (steps, hops) in list(self._trees.items()):
+            # Forget routes that used the old link or that the new one
+            # makes shorter
+            if (hops.get(source) == direction or
+                    (target in steps and steps[target] + 1 < steps.get(source, _UNREACHABLE))):
+                del self._trees[destination]
+
+    def _tree(self, destination):
+        """ Returns (steps, hops) dicts for routes to destination id """
+        tree = self._trees.get(destination)
+        if tree is not None:
+            self._trees.move_to_end(destination)
+            return tree
+
+        incoming = self._incoming
+        steps = {destination: 0}
+        hops = {}
+        frontier = [destination]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for room in frontier:
+                for source, direction in incoming[room]:
+                    if source not in steps:
+                        steps[source] = distance
+                        hops[source] = direction
+                        next_frontier.append(source)
+            frontier = next_frontier
+
+        self._trees[destination] = (steps, hops)
+        if len(self._trees) > self._max_destinations:
+            self._trees.popitem(last=False)
+        return (steps, hops)
+
+    def _ends(self, start, destination):
+        """ Returns the ids of start and destination, visiting them """
+        self.visit(start)
+        self.visit(destination)
+        self._read()
+        return (self._ids[self._node(start)], self._ids[self._node(destination)])
+
+    def distance(self, start, destination):
+        """ Input: start and destination (Room objects)
+            Return: number of moves needed through known rooms (int), or
+            None if there is no known way there
+        """
+        start_id, destination_id = self._ends(start, destination)
+        return self._tree(destination_id)[0].get(start_id)
+
+    def route(self, start, destination):
+        """ Input: start and destination (Room objects)
+            Return: list of directions (strings) of a shortest route
+            through known rooms, or None if there is no known way there
+        """
+        start_id, destination_id = self._ends(start, destination)
+        steps, hops = self._tree(destination_id)
+        if start_id not in steps:
+            return None
+
+        links = self._links
+        directions = []
+        room = start_id
+        while room != destination_id:
+            direction = hops[room]
+            directions.append(direction)
+            room = links[room][direction]
+        return directions
+
+    def find(self, room_name):
+        """ Input: room_name (string), not case sensitive
+            Return: visited Room object with that name, or None
+            Rooms go by the names they had when last visited.
+        """
+        self._read()
+        room_id = self._by_name.get(room_name.lower())
+        return None if room_id is None else self._room(self._rooms[room_id])
+
+    @property
+    def visited(self):
+        """ Return: keys of the visited rooms that have one, in the order
+            they were visited (list of strings), e.g. to save
+        """
+        return [node for node in list(self._rooms) + list(self._unread)
+                if isinstance(node, str)]
+
+    def __contains__(self, room):
+        node = self._node(room)
+        return node in self._ids or node in self._unread
+
+    def __len__(self):
+        return len(self._rooms) + len(self._unread)
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Stops listening for link changes.
+        """
+        remove_link_listener(self._linked, self._watchers)
@@ -0,0 +1,559 @@
+###########################################################################
+##  This is the saved game format for my text adventure prototype.       ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Saves and loads games.
+
+    A save file is a header, one record per room and per character,
+    then an index saying where each record is:
+
+        header   b"RPGSAVE1", index offset, index length ("<8sQQ")
+        records  marshal'd tuples, one after another
+        index    marshal'd (meta, item kinds, scripts, room offsets,
+                 character offsets)
+
+    Records are written as they are made, so saving never holds the
+    whole file in memory.  Loading only reads the index: SavedWorld
+    works like World, building a room from its record the first time
+    it's asked for, and rooms the player never saw come straight from
+    the original .world file.
+
+    Autosaves (Journal) append just the rooms and characters that
+    changed (see dirty.py) to a .journal file beside the save, which
+    SavedWorld plays back over the save when loading.  Every so often
+    the journal is compacted: a fresh save is written and the journal
+    emptied.
+
+    NOTE: marshal's format can change between Python versions, so a
+    save is only guaranteed to load in the version that wrote it.
+"""
+
+import marshal
+import mmap
+import os
+import struct
+
+from .character import Character, Enemy, Friend, Player
+from .dirty import track, untrack
+from .item import Item
+from .loot import LootTable
+from .room import Room
+from .strings import pack
+from .world import World
+
+
+_MAGIC = b"RPGSAVE1"
+_HEADER = struct.Struct("<8sQQ")
+
+# A journal starts with its magic and the id of the save it belongs to,
+# then each entry is its length followed by its marshal'd data
+_JOURNAL_MAGIC = b"RPGJRNL1"
+_ENTRY = struct.Struct("<I")
+
+_CLASSES = {"Character": Character, "Enemy": Enemy, "Friend": Friend, "Player": Player}
+
+
+###########################################################################
+####                Saving                                             ####
+###########################################################################
+
+
+class _Encoder():
+
+    def __init__(self, world, prototypes=(), scripts=()):
+        """ Turns rooms and characters into plain tuples.  Item kinds and
+            scripts go in tables, stored once in the index.  Rooms and
+            characters the world built are referred to by key.
+        """
+        self._world = world
+        self.prototypes = list(prototypes)
+        self._prototype_ids = {fields: number for number, fields in enumerate(self.prototypes)}
+        self.scripts = list(scripts)
+        self._script_ids = {script: number for number, script in enumerate(self.scripts)}
+
+    def prototype(self, prototype):
+        # Text from a string table is kept as a reference, see strings.py
+        fields = (prototype.name, prototype.type, prototype._description)
+        if fields not in self._prototype_ids:
+            self._prototype_ids[fields] = len(self.prototypes)
+            self.prototypes.append(fields)
+        return self._prototype_ids[fields]
+
+    def script(self, cursor):
+        lines = cursor.lines
+        if lines not in self._script_ids:
+            self._script_ids[lines] = len(self.scripts)
+            self.scripts.append(lines)
+        return (self._script_ids[lines], cursor.position)
+
+    def item(self, item):
+        return (self.prototype(item.prototype), item._overrides)
+
+    def character(self, character):
+        items = list(character._items) if character._items else []
+        weapon = character.weapon
+        if weapon is not None:
+            # A weapon the character carries is saved as its place in items
+            weapon = next((number for number, item in enumerate(items) if item is weapon),
+                          None)
+            weapon = self.item(character.weapon) if weapon is None else weapon
+        # A conversation is saved as (script number, position), with no
+        # script number for talk(None)
+        conversation = character._conversation
+        if conversation is not None:
+            conversation = (None if conversation.speaker is None
+                            else self.script(conversation))
+        record = [type(character).__name__, character.name, pack(character._description),
+                  character.constitution, character.attack_mod, character.max_damage,
+                  character.targeting, [self.item(item) for item in items], weapon,
+                  conversation]
+        if isinstance(character, Enemy):
+            loot = character.loot
+            record += [character.weakness, character.theft_victim,
+                       None if loot is None else tuple(
+                           (None if prototype is None else self.prototype(prototype), weight)
+                           for prototype, weight in loot.entries)]
+        elif isinstance(character, Friend):
+            record.append(character.in_party)
+        return tuple(record)
+
+    def room_key(self, room):
+        if isinstance(room, str):
+            return room
+        key = self._world.key_of(room)
+        if key is None:
+            raise ValueError("Cannot save a link to a room the world doesn't know: {0}"
+                             .format(room.name))
+        return key
+
+    def room(self, room):
+        links = room._linked_rooms
+        characters = []
+        for character in (room._characters or ()):
+            key = self._world.key_of(character)
+            characters.append(self.character(character) if key is None else key)
+        return (room.name, pack(room._description),
+                None if room.item is None else self.item(room.item),
+                None if room.search_gen is None else self.script(room.search_gen),
+                {direction: self.room_key(links.key(direction)) for direction in links},
+                characters)
+
+
+def save_game(path, world, player, current_room, state=None):
+    """ Input: path (string), world (World or SavedWorld object), player
+        (Player object), current_room (Room object), state (dict of
+        anything else to keep, e.g. scripted event progress; strings,
+        numbers, lists and dicts only)
+        Return: none
+        Saves every room and character the world has built.  The file
+        is written beside path first, so a failed save leaves any old
+        one in place.  Any journal beside path no longer applies and is
+        removed.
+    """
+    _write_save(path, world, player, current_room, state)
+    if os.path.exists(path + ".journal"):
+        os.remove(path + ".journal")
+
+
+def _write_save(path, world, player, current_room, state):
+    """ save_game() without touching the journal.  Returns (encoder,
+        save id)
+    """
+    rooms, characters = world.built()
+    old = world if isinstance(world, SavedWorld) else None
+    encoder = _Encoder(world, old._saved_prototypes if old is not None else (),
+                       old._saved_scripts if old is not None else ())
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as save_file:
+        save_file.write(_HEADER.pack(_MAGIC, 0, 0))
+        offset = _HEADER.size
+        index = ({}, {})
+        records = (((key, encoder.room(room)) for key, room in rooms.items()),
+                   ((key, encoder.character(character))
+                    for key, character in characters.items()))
+        for offsets, kind_records in zip(index, records):
+            for key, record in kind_records:
+                data = marshal.dumps(record)
+                save_file.write(data)
+                offsets[key] = (offset, len(data))
+                offset += len(data)
+
+        # Records in the save we loaded from, never built since, are
+        # copied over as they are (the tables only ever grow)
+        if old is not None:
+            for offsets, old_offsets in zip(index, (old._saved_rooms, old._saved_characters)):
+                for key in old_offsets:
+                    if key not in offsets:
+                        data = old._raw(old_offsets.get(key))
+                        save_file.write(data)
+                        offsets[key] = (offset, len(data))
+                        offset += len(data)
+
+        # A new id for every save, so an old journal is never played
+        # back over it
+        save_id = os.urandom(8).hex()
+        meta = {"world": os.path.abspath(world.path), "id": save_id,
+                "start": encoder.room_key(current_room), "player": encoder.character(player),
+                "state": state or {}}
+        data = marshal.dumps((meta, [pack(fields) for fields in encoder.prototypes],
+                              [pack(script) for script in encoder.scripts]) + index)
+        save_file.write(data)
+        save_file.seek(0)
+        save_file.write(_HEADER.pack(_MAGIC, offset, len(data)))
+    os.replace(temporary, path)
+    return (encoder, save_id)
+
+
+###########################################################################
+####                Loading                                            ####
+###########################################################################
+
+
+class SavedWorld(World):
+
+    def __init__(self, path):
+        """ Input: path to a save file (string)
+            Return: none
+            Reads the save's index and opens the .world file it was
+            saved from.  Rooms and characters are built as they're asked
+            for, from the save if it has them, else from the .world.
+        """
+        self._save_file = open(path, "rb")
+        self._save = mmap.mmap(self._save_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, offset, length = _HEADER.unpack_from(self._save)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError("Not a saved game: {0}".format(path))
+        (meta, self._saved_prototypes, self._saved_scripts, self._saved_rooms,
+         self._saved_characters) = marshal.loads(self._save[offset:offset + length])
+        super().__init__(meta["world"])
+        self._saved_prototypes = [self._text(fields) for fields in self._saved_prototypes]
+        self._saved_scripts = [self._text(script) for script in self._saved_scripts]
+        self._save_path = os.path.abspath(path)
+        self._saved_meta = meta
+        self._journal_entries, self._journal_size = self._replay(path + ".journal")
+        self._item_kinds = [None] * len(self._saved_prototypes)
+        self._saved_loot = {}
+        self._saved_player = None
+
+    def _replay(self, path):
+        """ Plays a journal back over the save; returns (entries, bytes
+            up to the end of the last whole entry).  An entry cut short
+            (e.g. by a crash) is ignored.
+        """
+        try:
+            with open(path, "rb") as journal_file:
+                data = journal_file.read()
+        except FileNotFoundError:
+            return (0, 0)
+        header = _JOURNAL_MAGIC + self._saved_meta["id"].encode()
+        if not data.startswith(header):
+            return (0, 0)
+        position = len(header)
+        entries = 0
+        while position + _ENTRY.size <= len(data):
+            (length,) = _ENTRY.unpack_from(data, position)
+            start = position + _ENTRY.size
+            if start + length > len(data):
+                break
+            (meta, (prototypes_from, prototypes), (scripts_from, scripts), rooms,
+             characters) = marshal.loads(data[start:start + length])
+            position = start + length
+            if (prototypes_from != len(self._saved_prototypes) or
+                    scripts_from != len(self._saved_scripts)):
+                raise ValueError("Journal does not match its save: {0}".format(path))
+            self._saved_prototypes += [self._text(fields) for fields in prototypes]
+            self._saved_scripts += [self._text(script) for script in scripts]
+            self._saved_rooms.update(rooms)
+            self._saved_characters.update(characters)
+            self._saved_meta.update(meta)
+            entries += 1
+        return (entries, position)
+
+    @property
+    def save_path(self):
+        """ Return: absolute path of the save file (string) """
+        return self._save_path
+
+    @property
+    def start(self):
+        """ Return: room the player was in when the game was saved """
+        return self.room(self._saved_meta["start"])
+
+    @property
+    def state(self):
+        """ Return: the state dict given to save_game() """
+        return self._saved_meta["state"]
+
+    @property
+    def saved_player(self):
+        """ Return: the saved Player object (the same one every time) """
+        if self._saved_player is None:
+            self._saved_player = self._character(self._saved_meta["player"])
+        return self._saved_player
+
+    def _raw(self, location):
+        """ Returns a record's marshal'd bytes, given where it is: its
+            (offset, length) in the save, or the bytes themselves (from
+            the journal or a WorldStore)
+        """
+        if isinstance(location, bytes):
+            return location
+        start, length = location
+        return self._save[start:start + length]
+
+    def _read(self, location):
+        return marshal.loads(self._raw(location))
+
+    def _kind(self, number):
+        """ Returns the ItemPrototype for an item kind in the save """
+        if self._item_kinds[number] is None:
+            self._item_kinds[number] = Item(*self._saved_prototypes[number]).prototype
+        return self._item_kinds[number]
+
+    def _item(self, record):
+        number, overrides = record
+        return self._kind(number).create(**(overrides or {}))
+
+    def _loot(self, spec):
+        if spec not in self._saved_loot:
+            self._saved_loot[spec] = LootTable([(None if number is None else self._kind(number),
+                                                 weight) for number, weight in spec])
+        return self._saved_loot[spec]
+
+    def _cursor(self, target, attribute, record):
+        number, position = record
+        setattr(target, attribute, None if number is None else self._saved_scripts[number])
+        getattr(target, attribute).position = position
+
+    def _character(self, record):
+        (class_name, name, description, constitution, attack_mod, max_damage, targeting,
+         items, weapon, conversation) = record[:10]
+        cls = _CLASSES[class_name]
+        items = [self._item(item) for item in items]
+        if isinstance(weapon, int):
+            weapon = items[weapon]
+        elif weapon is not None:
+            weapon = self._item(weapon)
+        arguments = [name, self._text(description), constitution, weapon, attack_mod, max_damage,
+                     items]
+        if cls is Enemy or cls is Friend:
+            arguments.append(record[10])
+        character = cls(*arguments)
+        character._watchers = self._watchers
+        character.targeting = targeting
+        if conversation is not None:
+            self._cursor(character, "conversation", conversation)
+        if cls is Enemy:
+            character.theft_victim = record[11]
+            if record[12] is not None:
+                character.loot = self._loot(record[12])
+        return character
+
+    def character(self, key):
+        """ Input: character key (string)
+            Return: Character object, as saved; the same one every time
+        """
+        # One lookup: a WorldStore's cache may drop it between two
+        character = self._characters.get(key)
+        if character is not None:
+            return character
+        location = self._saved_characters.get(key)
+        if location is None:
+            return super().character(key)
+        character = self._character(self._read(location))
+        self._characters[key] = character
+        self._keys[id(character)] = key
+        return character
+
+    def room(self, key):
+        """ Input: room key (string)
+            Return: Room object, as saved; the same one every time
+        """
+        room = self._rooms.get(key)
+        if room is not None:
+            return room
+        location = self._saved_rooms.get(key)
+        if location is None:
+            return super().room(key)
+        name, description, item, search, links, characters = self._read(location)
+        room = Room(name, self._text(description))
+        room._watchers = self._watchers
+        # Registered before building anything else, in case of cycles
+        self._rooms[key] = room
+        self._keys[id(room)] = key
+
+        if item is not None:
+            room.item = self._item(item)
+        if search is not None:
+            self._cursor(room, "search_gen", search)
+        if characters:
+            room.characters += [self.character(character) if isinstance(character, str)
+                                else self._character(character) for character in characters]
+        room.linked_rooms = self._link_map(links)
+        return room
+
+    def outline(self, key):
+        """ Input: room key (string)
+            Return: (name, links) of the room, as World.outline()
+        """
+        room = self._rooms.get(key)
+        if room is not None:
+            links = room.linked_rooms
+            return (room.name, {direction: links.key(direction) for direction in links})
+        location = self._saved_rooms.get(key)
+        if location is not None:
+            record = self._read(location)
+            return (record[0], record[4])
+        return super().outline(key)
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Closes the save and the .world file.
+        """
+        if not self._save.closed:
+            self._save.close()
+        self._save_file.close()
+        if hasattr(self, "_file"):
+            super().close()
+
+
+###########################################################################
+####                Autosaving                                         ####
+###########################################################################
+
+
+def _changed_records(world, changed):
+    """ Input: world (World object), changed (set from dirty.track())
+        Return: (rooms, characters) to write again, as dicts of key ->
+        Room/Character object.  Characters without a key are saved
+        with their room.
+    """
+    rooms = {}
+    characters = {}
+    for thing in changed:
+        key = world.key_of(thing)
+        if isinstance(thing, Room):
+            if key is not None:
+                rooms[key] = thing
+        elif key is not None:
+            characters[key] = thing
+        elif thing._location is not None and thing._location._room is not None:
+            room = thing._location._room
+            if world.key_of(room) is not None:
+                rooms[world.key_of(room)] = room
+    return (rooms, characters)
+
+
+class Journal():
+
+    def __init__(self, path, world, compact_every=100):
+        """ Input: path of the save file (string), world (World or
+            SavedWorld object), compact_every (int: entries between
+            compactions)
+            Return: none
+            Autosaves to path.  If world was loaded from path, its
+            journal is carried on; otherwise the first autosave writes
+            a full save.
+        """
+        self._path = path
+        self._world = world
+        self._compact_every = compact_every
+        self._changed = track(world.watchers)
+        self._file = None
+        self._encoder = None
+        self._entries = 0
+        if isinstance(world, SavedWorld) and world.save_path == os.path.abspath(path):
+            self._encoder = _Encoder(world, world._saved_prototypes, world._saved_scripts)
+            self._entries = world._journal_entries
+            self._open(world._saved_meta["id"], world._journal_size)
+
+    def _open(self, save_id, size=0):
+        """ Opens the journal for appending.  If size is given the
+            journal is carried on from there, dropping any entry cut
+            short after it; otherwise a new one is started.
+        """
+        if self._file is not None:
+            self._file.close()
+        if size:
+            self._file = open(self._path + ".journal", "r+b")
+            self._file.truncate(size)
+            self._file.seek(size)
+        else:
+            self._file = open(self._path + ".journal", "wb")
+            self._file.write(_JOURNAL_MAGIC + save_id.encode())
+            self._file.flush()
+
+    def autosave(self, player, current_room, state=None):
+        """ Input: as save_game()
+            Return: none
+            Appends the rooms and characters changed since the last
+            autosave (plus the player, always) to the journal, or
+            compacts it if it's long enough.
+        """
+        if self._encoder is None or self._entries >= self._compact_every:
+            self.compact(player, current_room, state)
+            return
+
+        rooms, characters = _changed_records(self._world, self._changed)
+        self._changed.clear()
+
+        encoder = self._encoder
+        prototypes_from = len(encoder.prototypes)
+        scripts_from = len(encoder.scripts)
+        rooms = {key: marshal.dumps(encoder.room(room)) for key, room in rooms.items()}
+        characters = {key: marshal.dumps(encoder.character(character))
+                      for key, character in characters.items()}
+        meta = {"start": encoder.room_key(current_room), "player": encoder.character(player),
+                "state": state or {}}
+        data = marshal.dumps((meta, (prototypes_from, [pack(fields) for fields
+                                                       in encoder.prototypes[prototypes_from:]]),
+                              (scripts_from, [pack(script) for script
+                                              in encoder.scripts[scripts_from:]]),
+                              rooms, characters))
+        self._file.write(_ENTRY.pack(len(data)) + data)
+        self._file.flush()
+        self._entries += 1
+
+    def compact(self, player, current_room, state=None):
+        """ Input: as save_game()
+            Return: none
+            Writes a full save and starts an empty journal.
+        """
+        self._changed.clear()
+        self._encoder, save_id = _write_save(self._path, self._world, player, current_room,
+                                             state)
+        self._entries = 0
+        self._open(save_id)
+
+    @property
+    def entries(self):
+        """ Return: autosaves in the journal since the last compaction """
+        return self._entries
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Stops tracking changes and closes the journal.
+        """
+        untrack(self._changed)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
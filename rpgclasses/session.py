@@ -0,0 +1,988 @@
+###########################################################################
+##  This is the game session for my text adventure prototype.            ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" One playthrough of the game, driven one line of input at a time.
+
+        session = GameSession(clock=InstantClock())
+        print(session.start(), end="")
+        while not session.over:
+            print(session.step(input(session.prompt)), end="")
+
+    Everything the game would print is collected and handed back by
+    step(), and whenever the game needs an answer from the player (a
+    command, a choice, "Press Enter to continue.") it stops and waits
+    for the next step().  Nothing reads stdin, writes to stdout or exits
+    the process, so bots, tests and servers can run as many sessions as
+    they like, on as many threads as they like.
+
+    Pauses are waited out on the session's clock (see clock.py).
+    stream() hands back the output a piece at a time as the pauses go
+    by, and astep()/astream() do the same for asyncio, with an
+    AsyncClock.
+"""
+
+import asyncio
+from io import StringIO
+from random import choice
+
+from .character import Enemy
+from .clock import AsyncClock, InstantClock, RealClock
+from .commands import AmbiguousCommand, CommandRegistry
+from .dirty import _trackers, mark
+from .events import EventRegistry
+from .loot import drop_loot
+from .routing import Router
+from .save import Journal, SavedWorld, save_game
+from .store import WorldStore
+from .targeting import TargetIndex
+from .turnorder import TurnOrder
+from .world import World
+
+
+class _GameOver(Exception):
+    """ Unwinds the game from wherever it ended """
+
+
+class GameSession():
+
+    def __init__(self, world="manor", player_name=None, player_description=None, clock=None,
+                 autosave=None):
+        """ Input: world (World object, or name of a world that ships
+            with the game), player_name and player_description (strings,
+            or None to ask the player), clock (Clock object, or None for
+            a RealClock), autosave (path to save to after every turn, or
+            None)
+            Return: none
+            Call start() to begin the game.
+        """
+        self._own_world = isinstance(world, str)
+        self.world = World.named(world) if self._own_world else world
+        self.player = None
+        self.current_room = self.world.start
+        self.previous_command = ""
+        self.result = None
+        self.clock = RealClock() if clock is None else clock
+        # Autosaves only write what changed each turn, see save.Journal
+        self._journal = None if autosave is None else Journal(autosave, self.world)
+
+        # The room's party, neutral and enemies lists, read each turn
+        self.party = []
+        self.neutral = []
+        self.enemies = []
+
+        # Finds routes for the goto command through the rooms visited;
+        # learns of new links by itself
+        self.router = Router([self.current_room], world=self.world)
+
+        # Scripted events, by room, command and trigger id
+        self.events = EventRegistry()
+        self._trigger_id = None
+        self._pending = []
+        if all(key in self.world for key in ("ballroom", "old_library")):
+            self._add_manor_story()
+
+        self.commands = CommandRegistry()
+        self._add_commands()
+
+        self._screen = StringIO()
+        self._prompt = None
+        self._flow = self._play(player_name, player_description)
+
+    @classmethod
+    def load(cls, path, clock=None, autosave=False):
+        """ Input: path to a game saved with save() (string) or a
+            WorldStore, clock (Clock object or None), autosave (bool:
+            autosave back to path after every turn)
+            Return: GameSession, picking up at the turn it was saved on
+            (or last autosaved on); call start() to carry on.  A new
+            WorldStore starts a new game.
+        """
+        world = path if isinstance(path, WorldStore) else SavedWorld(path)
+        session = cls(world, clock=clock, autosave=path if autosave else None)
+        session._own_world = world is not path
+        session.player = world.saved_player
+        state = world.state
+        session.previous_command = state.get("previous_command", "")
+        session.events.spend(state.get("spent", []))
+        for key in state.get("visited", []):
+            session.router.visit(key)
+        for alias, name in state.get("aliases", {}).items():
+            if name in session.commands and session.commands.aliases.get(alias) != name:
+                session.commands.alias(alias, name)
+        return session
+
+    def save(self, path):
+        """ Input: path (string)
+            Return: none
+            Saves the player, every room built so far (with its
+            characters, items and links), scripted event progress and
+            the player's aliases.  See save.py.
+        """
+        save_game(path, self.world, self.player, self.current_room, self._state())
+
+    def _state(self):
+        """ What a save keeps besides the world and the player """
+        return {"previous_command": self.previous_command, "spent": self.events.spent,
+                "aliases": self.commands.aliases, "visited": self.router.visited}
+
+    ###########################################################################
+    ####                    Driving the Session                            ####
+    ###########################################################################
+
+    @property
+    def prompt(self):
+        """ Return: what the game is asking the player (string, e.g.
+            "> "), or None once the game is over
+        """
+        return self._prompt
+
+    @property
+    def over(self):
+        """ Return: True once the game has ended (boolean) """
+        return self._flow is None
+
+    def start(self):
+        """ Input: none
+            Return: everything printed up to the first prompt (string)
+        """
+        return self.step(None)
+
+    def step(self, text):
+        """ Input: text (string) the player typed, without the newline
+            Return: everything printed since the last step (string)
+            Answers the current prompt and runs the game up to the next
+            one, waiting out any pauses on the clock.  Does nothing once
+            the game is over.
+        """
+        return "".join(self.stream(text))
+
+    def stream(self, text):
+        """ Input: text (string) the player typed
+            Return: generator of output (strings), one piece per pause
+            Like step(), but hands each piece of output over before
+            waiting out the pause after it.
+        """
+        if isinstance(self.clock, AsyncClock):
+            raise TypeError("Use astep() or astream() with an AsyncClock.")
+        for seconds in self._run(text):
+            yield self.read()
+            self.clock.sleep(seconds)
+        yield self.read()
+
+    async def astep(self, text):
+        """ Coroutine version of step(), for asyncio """
+        return "".join([output async for output in self.astream(text)])
+
+    async def astream(self, text):
+        """ Async generator version of stream(), for asyncio.  Pauses
+            are awaited, so other sessions run in the meantime.  A clock
+            that isn't an AsyncClock sleeps in a worker thread, so it
+            doesn't hold up the event loop.
+        """
+        for seconds in self._run(text):
+            yield self.read()
+            if isinstance(self.clock, AsyncClock):
+                await self.clock.sleep(seconds)
+            elif isinstance(self.clock, InstantClock):
+                self.clock.sleep(seconds)
+            else:
+                await asyncio.to_thread(self.clock.sleep, seconds)
+        yield self.read()
+
+    def read(self):
+        """ Input: none
+            Return: everything printed since the last read (string)
+        """
+        output = self._screen.getvalue()
+        self._screen.seek(0)
+        self._screen.truncate()
+        return output
+
+    def _run(self, text):
+        """ Sends text to the game and runs it to the next prompt,
+            yielding each pause (seconds) on the way
+        """
+        if self._flow is None:
+            return
+        # Nothing is sent in to start the game
+        if self._prompt is None:
+            text = None
+        try:
+            value = self._flow.send(text)
+            while not isinstance(value, str):
+                yield value
+                value = self._flow.send(None)
+            self._prompt = value
+        except StopIteration:
+            self._prompt = None
+            self._flow = None
+            self.close()
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Stops the router listening for new links, closes the
+            autosave journal and closes the world, if the session opened
+            it.  Called for you when the game ends.
+        """
+        if self.router is not None:
+            self.router.close()
+            self.router = None
+            if self._journal is not None:
+                self._journal.close()
+            if self._own_world:
+                self.world.close()
+
+    def say(self, *args, end="\n"):
+        """ Like print(), to this session's output """
+        print(*args, end=end, file=self._screen)
+
+    def _play(self, player_name, player_description):
+        """ The whole game, from creating the player (unless loaded) to
+            the game over
+        """
+        try:
+            if self.player is None:
+                yield from self._introduction(player_name, player_description)
+            yield from self._turns()
+        except _GameOver:
+            pass
+
+    ###########################################################################
+    ####                    Helper Functions                               ####
+    ###########################################################################
+
+    # NOTE: Every flow that asks the player something or pauses is a
+    # generator: it yields the prompt and is sent back what the player
+    # typed, so "answer = yield from self._ask(...)" takes the place of
+    # input(), and "yield from self._pause(2)" of sleep(2).
+
+    def _ask(self, prompt):
+        return (yield prompt)
+
+    def _pause(self, seconds):
+        # Prompts are strings, pauses are numbers of seconds
+        yield seconds
+
+    def _choose(self, prompt, min_length=0, max_length=0, choices=()):
+        """ Input: prompt (string) re: user input, min_length (int),
+            max_length (int), choices (list)
+            Return: player input (string) or player's choice (type varies)
+            NOTE: should either use (min_length and max_length) or choices
+        """
+        # Player enters input with given length constraints
+        if min_length > 0 and max_length >= min_length:
+            player_input = ""
+            while len(player_input) < min_length or len(player_input) > max_length:
+                player_input = yield from self._ask("{0} ({1} < length <= {2}): ".format(
+                                                    prompt, min_length, max_length))
+            return player_input
+
+        # Player chooses from a predetermined list
+        #(e.g., conversation replies, character creation)
+        if choices:
+            self.say("{0}\n".format(prompt))
+            self.say("".join([choice + "\n" for choice in choices]))
+
+            # Can input either the number of choice or choice itself
+            valid = {choice[0] for choice in choices} | {choice[3:] for choice in choices}
+            player_choice = ""
+            while player_choice not in valid:
+                player_choice = yield from self._ask("Make a selection from the list: ")
+            return player_choice
+
+    def _pick_char(self, characters, can_cancel=True):
+        """ Input: characters (list), whether can cancel (boolean)
+            Return: character object, or None if player cancels
+            Session version of Player.pick_char()
+        """
+        self.say("Characters: {0}".format(", ".join([character.name
+                                                     for character in characters])))
+        character_dict = {character.name: character for character in characters}
+
+        chosen_character = ""
+        while chosen_character not in character_dict:
+            if can_cancel:
+                chosen_character = yield from self._ask("Choose a character, or type cancel: ")
+                if chosen_character == "cancel":
+                    return None
+            else:
+                chosen_character = yield from self._ask("Choose a character: ")
+        return character_dict[chosen_character]
+
+    def _pick_item(self, header, item_type=None):
+        """ Input: header (string) is message that precedes items list,
+            item_type (string) denoting item type to filter
+            Return: item object, or None if player cancels
+            Session version of Player.pick_item()
+        """
+        items = self.player.items
+        self.say("\n{0} {1}\n".format(header, ", ".join(items.labels(item_type))))
+
+        item = ""
+        while items.by_name(item) is None:
+            item = yield from self._ask("Enter the item you choose, or type cancel: ")
+            if item == "cancel":
+                return None
+        return items.by_name(item)
+
+    def _flee_check(self):
+        """ Return: True if player wants to flee, False otherwise """
+        response = ""
+        while response not in ("yes", "y", "no", "n"):
+            response = yield from self._ask("You have {0} hit points left.  Attempt to flee? "
+                                            .format(self.player.constitution))
+            response = response.lower()
+        return response in ("yes", "y")
+
+    def _fight(self, party, enemies, can_flee=True):
+        """ Input: player's party (list), enemies (list), whether player
+            can flee (boolean)
+            Return: tuple: (1) list of party members killed (2) list of
+            enemies killed (3) boolean re: whether player fled
+            Provides a flow for the fight, keeps track of whose turn it
+            is to attack and calls characters' attack and defend methods.
+        """
+        player = self.player
+
+        # Index each side (adding player to party) so that membership
+        # tests, removal and choosing who to attack stay cheap.
+        party = TargetIndex(list(party) + [player])
+        enemies = TargetIndex(enemies)
+
+        # Keep track of character deaths.  Will be returned after fight.
+        party_killed = []
+        enemies_killed = []
+
+        # Keep track of whether player fled (this is returned)
+        fled = False
+
+        # Roll initiative and order combatants from highest to lowest roll
+        combatants = TurnOrder.from_initiative(list(party) + list(enemies))
+
+        # Provides the structure for a single turn in combat.
+        # Loop exits if enemies defeated, player dies or flees
+        while True:
+            attacker = combatants.current
+
+            # If player's turn to attack, allow chance to flee.
+            if can_flee and attacker == player and player.constitution < 5:
+
+                # If fleeing, random enemy gets free hit.
+                if (yield from self._flee_check()):
+                    fled = True
+                    last_attacker = choice(list(enemies))
+                    flee_penalty = last_attacker.roll_dice(1,3)
+                    player.constitution -= flee_penalty
+
+                    # Message re: outcome of flight, exit loop, end fight.
+                    if player.constitution < 1:
+                        self.say("You were killed by {0} while trying to escape.".format(
+                                 last_attacker.name))
+                        yield from self._game_over("lost")
+                    else:
+                        self.say("{0} attacked you for {1} damage whilst fleeing.".format(
+                                 last_attacker.name, flee_penalty))
+                    break
+
+            # Figure out who attacker's opponents are and call attack
+            # method; the player picks whom to hit, when there's a choice
+            if attacker == player:
+                defender = None
+                if len(enemies) > 1:
+                    defender = yield from self._pick_char(list(enemies), False)
+                attack = player.attack(enemies, defender)
+            elif attacker in enemies:
+                attack = attacker.attack(party)
+            else:
+                attack = attacker.attack(enemies)
+
+            # Defender is determined by attack() method.
+            defender = attack[0]
+            hit_points = defender.constitution
+            outcome = defender.defend(attack[1], attack[2], attack[3], self._screen)
+
+            # Display's outcome of attack
+            self.say(attacker.name + outcome[1])
+
+            # Keep defender's side up to date with their new hit points
+            if outcome[0] and defender.constitution != hit_points:
+                (party if defender in party else enemies).update(defender)
+
+            # Handle death of a character
+            if not outcome[0]:
+
+                # The turn order skips dead combatants from here on
+                combatants.remove(defender)
+
+                if defender == player:
+                    yield from self._game_over("lost")
+                elif defender in party:
+                    party_killed.append(defender)
+                    party.remove(defender)
+                else:
+                    enemies_killed.append(defender)
+                    enemies.remove(defender)
+
+            # All enemies have been killed, fight is over.
+            if len(enemies) == 0:
+                break
+
+            # Move on so next character can attack.
+            if combatants.advance():
+                self.say()
+
+            # Pause so player has time to read.
+            yield from self._pause(1)
+
+        return (party_killed, enemies_killed, fled)
+
+    def _new_screen(self):
+        """ Clears screen by moving cursor to top left
+            and clearing everything after cursor
+        """
+        #NOTE: This only works on ANSI compatible terminals. YMMV.
+        self.say("\033[H\033[J")
+
+    def _press_to_continue(self, message="Press Enter to continue."):
+        """ Input: optional prompt to the user (string)
+            Return: None
+            Effectively pauses game until player presses a key
+        """
+        self.say("\n")
+        yield from self._ask(message)
+
+    def _game_over(self, result):
+        """ Input: result (string): "won", "quit" or "lost"
+            Return: does not return (generator)
+            Prints game over message, clears screen and ends the game
+        """
+        self.result = result
+        if result != "lost":
+            self.say("\nThanks for playing!")
+        else:
+            self.say("You lost")
+            yield from self._pause(1)
+            self.say("\t.")
+            yield from self._pause(1)
+            self.say("\t .")
+            yield from self._pause(1)
+            self.say("\t  .")
+            yield from self._pause(1)
+            self.say("\t   your life.")
+            yield from self._pause(1)
+            self.say("Game Over.")
+
+        yield from self._pause(2)
+        self._new_screen()
+        raise _GameOver()
+
+    ###########################################################################
+    ####              Scripted Story Events (SPOILER ALERT!)               ####
+    ###########################################################################
+
+    # NOTE: Scripted events are registered in the events registry by room,
+    # command and trigger id, and looked up after every command.  Search
+    # responses name the trigger they set off as their third element in
+    # the .world file.
+
+    def add_event(self, room, command, action, trigger_id=None, condition=None, once=True):
+        """ Input: as EventRegistry.add(); action may be a generator
+            (e.g. one asking the player to choose), which is played to
+            the end before the next turn
+            Return: Trigger object
+        """
+        def run(*args):
+            flow = action(*args)
+            if flow is not None:
+                self._pending.append(flow)
+        return self.events.add(room, command, run, trigger_id, condition, once)
+
+    def _add_manor_story(self):
+        """ Registers the manor's scripted events """
+        self._ballroom = self.world.room("ballroom")
+        self._old_library = self.world.room("old_library")
+        self._jill = self.world.character("jill")
+        self.add_event(self._ballroom, "search", self._find_library, "found_library")
+        self.add_event(self._old_library, "search", self._meet_old_man, "found_book")
+
+    def _find_library(self, party, neutral, enemies, player):
+        """ Input: party (list), neutral (list), enemies (list), and player
+            (Player object)
+            Return: None
+            You find the old library and Jill joins your party.
+            Triggered by searching the ballroom ("found_library").
+        """
+        jill = self._jill
+
+        # In case you didn't previously talk w/ Jill, prevent her
+        # from asking you to search for the library
+        jill.conversation = ["..."]
+
+        # Jill joins players party
+        self.say("\n[Jill]: You found it!  I'll be joining you, if you don't mind.  Let's go!")
+        jill.in_party = True
+
+        # Link ballrom and library, inform player
+        self._ballroom.link_room(self._old_library, "west")
+        self._old_library.link_room(self._ballroom, "east")
+        self.say("\nNew room found: Old Library")
+
+    def _meet_old_man(self, party, neutral, enemies, player):
+        """ Input: party (list), neutral (list), enemies (list), and player
+            (Player object)
+            Return: None
+            This is the end game scene.
+            Triggered by searching the old library ("found_book").
+        """
+        jill = self._jill
+
+        # A bit of story to read.
+        self.say("\n[{0}]: This was easy enough.  I'm pretty good at this adventuring thing."
+                 .format(player.name))
+        yield from self._pause(2)
+        self.say("\nFrom behind a stack of books across the room, you hear an old man humming",
+                 "to himself.  He stands and looks you in the eye.  He appears to be a spirit.")
+        yield from self._pause(5)
+
+        # The choice made here determines which ending you get
+        choice = yield from self._choose("\n[Old Man]: Why do you seek that book?",
+                                         choices=["1. knowledge", "2. create new order",
+                                                  "3. world domination"])
+        self._new_screen()
+
+        # This is the non-combat ending.
+        if choice in "1. personal knowledge":
+            self.say("\n[Old Man]: Fine, just be quiet, and close the door on your way out.")
+            yield from self._pause(4)
+            self._new_screen()
+            self.say("In the book, you find the answers to your questions.",
+                     " Your quest is complete, and it's time to return home.")
+            yield from self._pause(5)
+            yield from self._game_over("won")
+
+        # The other two choices lead to combat.
+        # Create old_man as enemy w/ henchman and add them to room
+        self.say("The Old Man now appears to be corporeal.  From the brick walls,",
+                 "he summons a golem.")
+        yield from self._pause(3)
+        old_man = Enemy("Protector", "cleric of the old religion", 25, None,
+                        1.0, 6, None, "none")
+        golem = Enemy("Golem", "golem", 5, self.world.item("fists"), .75, 3, [], "any")
+
+        self._old_library.characters += [old_man, golem]
+        enemies += [old_man, golem]
+
+        # Battle ensues and Jill fights for your cause
+        if choice in ["2", "heal the world"]:
+
+            self.say("\n[Old Man]: I cannot allow you to share this knowledge.  Only someone",
+                     "who has made their way to this library is worthy of its knowledge.",
+                     "Now young adventurer...you will die.")
+            yield from self._pause(5)
+            self.say("\n[Jill]: I've got your back.  I believe in you.")
+            yield from self._press_to_continue("Press ENTER to begin the battle.")
+            self._new_screen()
+            outcome = yield from self._fight(party, enemies, False)
+
+            self._new_screen()
+
+            if outcome[0] == []:
+                # Ending based on Jill surviving the battle.
+                self.say("You have won the day.  As you pick up the tome you came for,",
+                         "Jill speaks.")
+                yield from self._pause(2)
+                self.say("\n[Jill]: Let me come with you.  We will start the new order,",
+                         "together.")
+                yield from self._pause(2)
+                self.say("\nYou silently nod your head, and you head off into the sunset.")
+
+            else:
+                # Ending if Jill dies during the battle.
+                self.say("You have won the day, but this victory came with a price.")
+                yield from self._pause(2)
+                self.say("\nJill did not survive the battle.  You resolve to yourself that",
+                         "her sacrifice will not have been in vain.")
+                yield from self._pause(2)
+                self.say("\nAfter you lay Jill to rest, you go back out into the world,",
+                         "with new knowledge.  With it, you will start a new order of",
+                         "clerics who will bring balance to the world.")
+
+        # You chose evil: fight everyone, including Jill to win
+        else:
+
+            self.say("\n[Old Man]: You chose poorly.  Time to die.")
+            yield from self._pause(2)
+            self.say("\n[Jill]: I didn't sign up for this.  I'm inclined to agree with",
+                     "Old Man River.  I can't allow you to do this.")
+            yield from self._press_to_continue("Press ENTER to begin the battle.")
+
+            # Jill is now an enemy
+            jill.in_party = False
+            enemies += [jill]
+            party.remove(jill)
+
+            self._new_screen()
+            outcome = yield from self._fight(party, enemies, False)
+            self._new_screen()
+
+            # The evil ending.
+            self.say("[{0}]: How pathetic.".format(player.name))
+            yield from self._pause(2)
+            self.say("\nArmed with new knowledge to twist for your own evil ends,",
+                     "you set off to do the same thing you do everyday...")
+
+        yield from self._press_to_continue()
+        yield from self._game_over("won")
+
+    ###########################################################################
+    ####                        Core Game Logic                            ####
+    ###########################################################################
+
+    # NOTE: Each command is a method taking the rest of what the player
+    # typed (e.g. "jill" for "talk jill").  Commands that ask the player
+    # something are generators.  The room's party, neutral and enemies
+    # lists are read at the start of each turn, in _turns() below.
+
+    def _add_commands(self):
+        """ Registers every valid command.  Any unambiguous start of one
+            also works.
+        """
+        commands = self.commands
+        for direction in ("north", "south", "east", "west"):
+            commands.add(direction, self._move, aliases=[direction[0]])
+        commands.add("gift", self._do_gift)
+        commands.add("fight", self._do_fight)
+        commands.add("goto", self._do_goto)
+        commands.add("help", self._do_help)
+        commands.add("inspect", self._do_inspect)
+        commands.add("quit", self._do_quit)
+        commands.add("search", self._do_search)
+        commands.add("steal", self._do_steal)
+        commands.add("talk", self._do_talk)
+        commands.add("alias", self._do_alias)
+        commands.add("save", self._do_save)
+
+    def _pick_character(self, characters, name):
+        """ Input: characters (list), name typed by player (string) or ""
+            Return: character named, else the one player picks, or None
+        """
+        if name == "":
+            return (yield from self._pick_char(characters))
+        for character in characters:
+            if character.name.lower() == name.lower():
+                return character
+        self.say("There's no one called {0} here.".format(name))
+        return None
+
+    def _move(self, direction):
+        # Attempt to move in given direction, see room.move() for more
+        self.current_room = self.current_room.move(direction, self.party, self._screen)
+        self.router.visit(self.current_room)
+
+    def _do_goto(self, arguments):
+        # Walk the shortest route through rooms visited to one of them,
+        # e.g. "goto kitchen"
+        destination = self.router.find(arguments)
+        route = None if destination is None else self.router.route(self.current_room,
+                                                                     destination)
+        if destination is None or route is None:
+            self.say("You don't know the way there.")
+        elif route == []:
+            self.say("You're already here.")
+        else:
+            for direction in route:
+                self._move(direction)
+
+                # Stop early if enemies block the way
+                if (self.current_room is not destination and
+                        self.current_room.characters.enemies):
+                    self.say("\nSomething blocks your way.")
+                    break
+
+    def _do_fight(self, arguments):
+        # Check to see if enemy in room; if so, fight
+        player = self.player
+        if self.enemies == []:
+            self.say("There is no one to fight.")
+            return
+
+        # Player chooses weapon for this fight, unless they named one
+        # ("fight with hunter's bow"); cancel fight if player typed "cancel"
+        player_weapon = None
+        if arguments != "":
+            player_weapon = next((item for item in player.items.of_type("weapon")
+                                  if item.name.lower() == arguments.lower()), None)
+        if player_weapon is None:
+            player_weapon = yield from self._pick_item("Choose your weapon for this encounter: ",
+                                                       "weapon")
+        if player_weapon is None:
+            self.say("Perhaps some other time.")
+            return
+        self.say()
+        player.weapon = player_weapon
+
+        # Fight and remove characters who were killed from room
+        outcome = yield from self._fight(self.party, self.enemies)
+        self.current_room.characters.discard_all(outcome[0] + outcome[1])
+
+        # Print message re: fight outcome
+        self.say("\n" * 2)
+        if outcome[2]:
+            self.say("You live to fight another day, but you're still a quitter.")
+        else:
+            self.say("You have vanquished your enemies!")
+
+        # Everyone killed drops their loot, rolled in one batch
+        loot = drop_loot(outcome[1])
+        if loot != []:
+            player.items += loot
+            self.say("\n[Loot added to your inventory]: {0}".format(
+                     ", ".join(item.name for item in loot)))
+
+        if outcome[0] != []:
+
+            # Print message regarding party members deaths
+            self.say("Unfortunately, some of your party did not survive. {0} died during the \
+                     battle.".format(", ".join(str(character) for character in outcome[0])))
+
+    def _do_search(self, arguments):
+        # If there is something to find, make call to generator
+        room = self.current_room
+        if room.search_gen is not None:
+            search_result = next(room.search_gen)
+            self.say(search_result[0])
+            # Moving the search cursor along doesn't go through a setter
+            if _trackers:
+                mark(room)
+
+            # Add item to inventory, inform player when conditions met
+            if room.item is not None and search_result[1] == True:
+                self.say("\n" + room.item.description)
+                self.player.items += [room.item]
+                self.say("\n[Item added to your inventory]: {0}".format(room.item.name))
+                room.item = None
+
+            # Some responses set off a scripted event, see _turns()
+            if len(search_result) > 2:
+                self._trigger_id = search_result[2]
+        else:
+            self.say("You find nothing of note.")
+
+    def _do_talk(self, arguments):
+        # If someone else in room, player chooses with whom to talk
+        if self.party != [] or self.neutral != [] or self.enemies != []:
+            talk_to = yield from self._pick_character(self.party + self.neutral + self.enemies,
+                                                      arguments)
+            if talk_to is not None:
+                self.say(next(talk_to.conversation))
+                if _trackers:
+                    mark(talk_to)
+        else:
+            self.say("There's no one here to talk to but yourself.")
+
+    def _do_steal(self, arguments):
+        # If enemy in room, choose who to steal from
+        if self.enemies != []:
+            target = yield from self._pick_character(self.enemies, arguments)
+            if target is not None:
+                result = target.steal(self.player.roll_dice())
+
+                # Add stolen item to inventory, if player successful
+                if result[0] is not None:
+                    self.player.items += [result[0],]
+
+                # Print message regarding attempt to steal
+                self.say(result[1])
+        else:
+            self.say("There is no one to steal from in this room.")
+
+    def _do_inspect(self, arguments):
+        # Player chooses item (unless named), info prints, unless cancelled
+        inspection = None
+        if arguments != "":
+            inspection = next((item for item in self.player.items
+                               if item.name.lower() == arguments.lower()), None)
+        if inspection is None:
+            inspection = yield from self._pick_item("Here are the items that you may inspect:")
+        if inspection is not None:
+            self.say("\n" + str(inspection))
+
+    def _do_gift(self, arguments):
+        # Make sure inhabitant is a friend, then give gift
+        if self.party != [] or self.neutral != []:
+            recipient = yield from self._pick_character(self.party + self.neutral, arguments)
+            if recipient is not None:
+                gift = yield from self._pick_item("Here are the items in your inventory:")
+                if gift is not None:
+                    self.player.items.remove(gift)
+                recipient.receive_gift(gift, self._screen)
+        else:
+            self.say("There is no one for you to give an item to at this time.")
+
+    def _do_alias(self, arguments):
+        # Player adds their own shortcut, e.g. "alias atk fight"
+        words = arguments.split()
+        try:
+            name = self.commands.resolve(words[1]).name
+            self.commands.alias(words[0], name)
+            self.say("\"{0}\" now means {1}.".format(words[0], name))
+        except (IndexError, AttributeError, KeyError, ValueError):
+            self.say("Type alias, the shortcut, then the command, e.g. alias atk fight")
+
+    def _do_save(self, arguments):
+        # Save the game, e.g. "save" or "save manor.save"
+        path = arguments or "game.save"
+        try:
+            self.save(path)
+        except (OSError, ValueError) as error:
+            self.say("The game could not be saved: {0}".format(error))
+        else:
+            self.say("Game saved to {0}.  To carry on later: python main.py {0}".format(path))
+
+    def _do_help(self, arguments):
+        # Print list of valid commands
+        self.say("\nThe following is a complete list of valid commands in this game: {0}"
+                 .format(", ".join(self.commands.names)))
+        self.say("\nYou can repeat your previous command, just press Enter at the prompt.")
+        self.say("Commands can be shortened (e.g. n, insp) and some take a name: talk jill,",
+                 "goto kitchen, fight with hunter's bow.")
+
+    def _do_quit(self, arguments):
+        yield from self._game_over("quit")
+
+    ###########################################################################
+    ####                Player Creation/Game Introduction                  ####
+    ###########################################################################
+
+    def _introduction(self, player_name, player_description):
+        # Create player character w/ input from player
+        if player_name is None:
+            player_name = yield from self._choose("Enter a name for your character", 1, 24)
+        if player_description is None:
+            player_description = yield from self._choose(
+                "Enter a description for your character", 1, 48)
+        player = self.player = self.world.player(player_name, player_description)
+        player.conversation = "Can I help you?"
+
+        self._new_screen()
+        self.say("Character created successfully.")
+        self.say(player)
+        yield from self._press_to_continue()
+        self._new_screen()
+
+        # Print all valid commands
+        self.say("\nThe following is a complete list of valid commands in this game: {0}"
+                 .format(", ".join(self.commands.names)))
+        self.say("\nTo see these commands later, type \"help\" at the prompt.")
+
+        yield from self._press_to_continue()
+        self._new_screen()
+
+        # Introduction begins
+        self.say("<insert something inspiring>...You are {0}, a {1}.".format(
+                 player.name, player.description)
+                 + "Your hero's quest has brought you to Smith Manor.  A polite knock at the"
+                 + " front door went unanswered. The manor seems to be deserted. You walk around"
+                 + " to the back, peering into the windows along the way.  The back door is"
+                 + " unlocked.")
+
+        yield from self._press_to_continue("Press Enter to...enter.")
+        self._new_screen()
+
+    ###########################################################################
+    ####                            Game Loop                              ####
+    ###########################################################################
+
+    def _turns(self):
+        while True:
+            room = self.current_room
+
+            # Tell player current location, describe it and denote exits
+            self.say(room)
+            self.say()
+
+            # Check for characters in the room, print name(s)/description(s).
+            # The room keeps its characters filed by faction as they come and go.
+            self.party = room.characters.party
+            if self.party != []:
+                self.say("Party: {0}".format(room.characters.describe("party")))
+                self.say()
+
+            self.neutral = room.characters.neutral
+            if self.neutral != []:
+                self.say("Neutral: {0}".format(room.characters.describe("neutral")))
+                self.say()
+
+            self.enemies = room.characters.enemies
+            if self.enemies != []:
+                self.say("Enemies: {0}".format(room.characters.describe("enemies")))
+
+                self.say("\n" * 2)
+
+            # Print previous command, get new command.  Only the command
+            # word is case-insensitive; arguments such as a save's file
+            # name are passed on as typed.
+            self.say("Previous command: {0}".format(self.previous_command))
+            command = (yield from self._ask("> ")).strip()
+
+            # If player types nothing repeat previous command
+            if command == "":
+                command = self.previous_command
+
+            yield from self._command(command)
+            if self._journal is not None:
+                self._journal.autosave(self.player, self.current_room, self._state())
+            # A WorldStore keeps itself up to date as the game goes
+            if isinstance(self.world, WorldStore):
+                self.world.autosave(self.player, self.current_room, self._state())
+
+            # Wait for player input to move on and clear screen
+            yield from self._press_to_continue()
+            self._new_screen()
+
+    def _command(self, command):
+        """ Runs one command and the scripted events it sets off """
+        # Remember where the command was given, for scripted events
+        command_room = self.current_room
+        self._trigger_id = None
+
+        # Look the command up and run it
+        try:
+            verb, arguments = self.commands.parse(command)
+        except AmbiguousCommand as error:
+            self.say("{0}.  Type a bit more of it.".format(error))
+            return
+        if verb is None:
+            self.say("Invalid Command.  Type \"help\" for a list of commands.")
+            return
+
+        self.previous_command = command
+        # Directions are passed the direction itself, e.g. "n" -> "north"
+        flow = verb.handler(verb.name if verb.handler == self._move else arguments)
+        if flow is not None:
+            yield from flow
+
+        # Run scripted events for this command, and for entering a room
+        args = (self.party, self.neutral, self.enemies, self.player)
+        self.events.fire(command_room, verb.name, self._trigger_id, *args)
+        if self.current_room is not command_room:
+            self.events.fire(self.current_room, "enter", None, *args)
+        while self._pending:
+            yield from self._pending.pop(0)
@@ -0,0 +1,446 @@
+###########################################################################
+##  This is the headless combat simulator for my text adv prototype.     ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Runs GameSession._fight() (session.py) headlessly thousands of
+    times to tune encounters.
+
+    Usage: python -m rpgclasses.simulate --fights 100000 --workers 4
+    With no --player/--party/--enemy options, the dining hall fight from
+    the manor is simulated (the player, Jill, Jack and Jack2).
+"""
+
+import argparse
+from collections import Counter
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+
+from .character import Enemy
+
+
+###########################################################################
+####                Combatant Setup                                    ####
+###########################################################################
+
+
+class Combatant():
+
+    def __init__(self, name, constitution, attack_mod=1.0, max_damage=5, weapon_name=None,
+                 weakness=None):
+        """ Input: name (string), constitution (int), attack_mod (float),
+            max_damage (int), weapon_name (string or None), weakness
+            (string, or None if the combatant is not an Enemy)
+            Return: none
+            Plain, picklable copy of the stats fight() reads from a
+            Character.  Only enemies have a weakness.
+        """
+        self.name = name
+        self.constitution = constitution
+        self.attack_mod = attack_mod
+        self.max_damage = max_damage
+        self.weapon_name = weapon_name
+        self.weakness = weakness
+
+    @classmethod
+    def from_character(cls, character):
+        """ Input: character (Character, Enemy, Friend or Player object)
+            Return: Combatant with the character's current stats
+        """
+        weapon_name = None if character.weapon is None else character.weapon.name
+        weakness = character.weakness if isinstance(character, Enemy) else None
+        return cls(character.name, character.constitution, character.attack_mod,
+                   character.max_damage, weapon_name, weakness)
+
+    @classmethod
+    def parse(cls, spec, is_enemy=False):
+        """ Input: spec (string) "name,constitution,attack_mod,max_damage
+            [,weapon[,weakness]]", is_enemy (boolean)
+            Return: Combatant
+            Enemies default to a weakness of "any", like Enemy does.
+        """
+        fields = [field.strip() for field in spec.split(",")]
+        if len(fields) < 4:
+            raise ValueError("Combatant spec needs at least name,constitution,attack_mod,"
+                             "max_damage: {0!r}".format(spec))
+        weapon_name = fields[4] if len(fields) > 4 and fields[4] else None
+        weakness = None
+        if is_enemy:
+            weakness = fields[5] if len(fields) > 5 and fields[5] else "any"
+        return cls(fields[0], int(fields[1]), float(fields[2]), int(fields[3]), weapon_name,
+                   weakness)
+
+    def __repr__(self):
+        return "Combatant({0!r}, {1}, {2}, {3}, {4!r}, {5!r})".format(
+            self.name, self.constitution, self.attack_mod, self.max_damage, self.weapon_name,
+            self.weakness)
+
+
+def _as_combatant(character):
+    """ Accepts either a Combatant or any Character object """
+    if isinstance(character, Combatant):
+        return character
+    return Combatant.from_character(character)
+
+
+###########################################################################
+####                Headless Fight                                     ####
+###########################################################################
+
+
+class Setup():
+
+    def __init__(self, party, enemies, player, can_flee=False, flee_below=5):
+        """ Input: party (list), enemies (list), player (Combatant or
+            Character objects), can_flee (boolean), flee_below (int)
+            Return: none
+            Compiles an encounter into flat stat lists so fights can be
+            run without touching Character objects.  Mirrors fight():
+            the player is appended to the party.  When can_flee is set,
+            the player always flees once below flee_below hit points
+            (fight() asks instead).  Raises ValueError if no one can
+            ever land a hit, as that fight would never end.
+        """
+        party = [_as_combatant(member) for member in party] + [_as_combatant(player)]
+        enemies = [_as_combatant(enemy) for enemy in enemies]
+        if not enemies:
+            raise ValueError("A fight needs at least one enemy.")
+        # A hit only lowers hit points, so the fight ends as long as
+        # someone can land one: the best attack (20 * attack_mod) must
+        # beat the lowest defense roll (1)
+        if not any(20 * combatant.attack_mod > 1 for combatant in party + enemies):
+            raise ValueError("No one in this fight can ever land a hit.")
+
+        combatants = party + enemies
+        self.names = [combatant.name for combatant in combatants]
+        self.constitution = [combatant.constitution for combatant in combatants]
+        self.attack_mod = [combatant.attack_mod for combatant in combatants]
+        self.max_damage = [combatant.max_damage for combatant in combatants]
+
+        # Weakness bonus precomputed for each (attacker, defender) pair
+        self.bonus = [[0] * len(combatants) for _ in combatants]
+        for defender, target in enumerate(combatants):
+            if target.weakness is None:
+                continue
+            for attacker, source in enumerate(combatants):
+                if target.weakness == "any" or target.weakness == source.weapon_name:
+                    self.bonus[attacker][defender] = 1
+
+        self.party_size = len(party)
+        self.player = len(party) - 1
+        self.can_flee = can_flee
+        self.flee_below = flee_below
+
+
+# Fight outcomes
+WIN, LOSS, FLED = "win", "loss", "fled"
+
+
+def run_fight(setup, rng):
+    """ Input: setup (Setup object), rng (random.Random object)
+        Return: tuple containing (1) outcome (WIN, LOSS or FLED),
+        (2) number of attacks made (int), (3) hit points of every
+        combatant after the fight (list of ints, 0 if killed)
+        Same rules as GameSession._fight() in session.py and
+        Character.attack/defend, but with no prompts, pauses or game
+        over.  The player picks targets like any other character
+        (highest constitution).
+    """
+    random = rng.random
+    constitution = list(setup.constitution)
+    attack_mod = setup.attack_mod
+    max_damage = setup.max_damage
+    bonus = setup.bonus
+    player = setup.player
+
+    party = list(range(setup.party_size))
+    enemies = list(range(setup.party_size, len(constitution)))
+
+    # Roll initiative; sorted() is stable, so ties keep list order
+    rolls = [int(random() * 20) + 1 for _ in constitution]
+    combatants = sorted(range(len(constitution)), key=lambda i: rolls[i], reverse=True)
+
+    index = 0
+    turns = 0
+    while True:
+        attacker = combatants[index]
+
+        if (setup.can_flee and attacker == player and
+                constitution[player] < setup.flee_below):
+            penalty = int(random() * 3) + 1
+            constitution[player] = max(constitution[player] - penalty, 0)
+            if constitution[player] < 1:
+                return (LOSS, turns, constitution)
+            return (FLED, turns, constitution)
+
+        # Choose the opponent with the highest constitution
+        opponents = party if attacker >= setup.party_size else enemies
+        defender = opponents[0]
+        for opponent in opponents:
+            if constitution[opponent] > constitution[defender]:
+                defender = opponent
+
+        attack = (int(random() * 20) + 1) * attack_mod[attacker]
+        damage = int(random() * max_damage[attacker]) + 1
+        defense = int(random() * 20) + 1
+        turns += 1
+
+        if attack > defense:
+            if attack == 20:
+                if constitution[defender] > 6:
+                    constitution[defender] //= 2
+                else:
+                    constitution[defender] = 0
+            else:
+                constitution[defender] -= damage + bonus[attacker][defender]
+
+            if constitution[defender] <= 0:
+                constitution[defender] = 0
+                if combatants.index(defender) < index:
+                    index -= 1
+                combatants.remove(defender)
+                if defender == player:
+                    return (LOSS, turns, constitution)
+                opponents.remove(defender)
+                if not enemies:
+                    return (WIN, turns, constitution)
+
+        if index >= len(combatants) - 1:
+            index = 0
+        else:
+            index += 1
+
+
+###########################################################################
+####                Monte Carlo Driver                                 ####
+###########################################################################
+
+
+class Report():
+
+    def __init__(self, names, party_size):
+        """ Input: combatant names (list of strings), party_size (int)
+            Return: none
+            Running totals for a batch of fights.  Reports from
+            separate workers are combined with merge().
+        """
+        self.names = names
+        self.party_size = party_size
+        self.outcomes = Counter()
+        self.turns = Counter()
+        self.survivor_hp = [0] * len(names)
+        self.survived = [0] * len(names)
+        self.seconds = 0.0
+
+    @property
+    def fights(self):
+        """ Return: number of fights simulated (int) """
+        return sum(self.outcomes.values())
+
+    @property
+    def win_rate(self):
+        """ Return: fraction of fights won by the party (float) """
+        return self.outcomes[WIN] / self.fights if self.fights else 0.0
+
+    def add(self, outcome, turns, constitution):
+        """ Input: one result tuple from run_fight()
+            Return: none
+        """
+        self.outcomes[outcome] += 1
+        self.turns[turns] += 1
+        for index, hp in enumerate(constitution):
+            if hp > 0:
+                self.survivor_hp[index] += hp
+                self.survived[index] += 1
+
+    def merge(self, other):
+        """ Input: another Report for the same setup
+            Return: none
+        """
+        self.outcomes.update(other.outcomes)
+        self.turns.update(other.turns)
+        for index in range(len(self.names)):
+            self.survivor_hp[index] += other.survivor_hp[index]
+            self.survived[index] += other.survived[index]
+
+    def turn_percentile(self, fraction):
+        """ Input: fraction (float between 0 and 1)
+            Return: fight length (turns) at that percentile (int)
+        """
+        target = fraction * self.fights
+        seen = 0
+        for turns in sorted(self.turns):
+            seen += self.turns[turns]
+            if seen >= target:
+                return turns
+        return 0
+
+    def __str__(self):
+        """ Return: human readable summary of the batch (string) """
+        fights = self.fights
+        if fights == 0:
+            return "No fights simulated."
+
+        mean_turns = sum(turns * count for turns, count in self.turns.items()) / fights
+        lines = ["Fights: {0}".format(fights)]
+        if self.seconds:
+            lines[0] += " in {0:.2f}s ({1:,.0f} fights/s)".format(self.seconds,
+                                                                   fights / self.seconds)
+        lines.append("Win rate: {0:.2%}  Loss: {1:.2%}  Fled: {2:.2%}".format(
+            self.win_rate, self.outcomes[LOSS] / fights, self.outcomes[FLED] / fights))
+        lines.append("Turns: mean {0:.2f}, min {1}, median {2}, p90 {3}, max {4}".format(
+            mean_turns, min(self.turns), self.turn_percentile(.5), self.turn_percentile(.9),
+            max(self.turns)))
+        lines.append("Survivors (survival rate, mean HP when alive):")
+        for index, name in enumerate(self.names):
+            side = "party" if index < self.party_size else "enemy"
+            alive = self.survived[index]
+            mean_hp = self.survivor_hp[index] / alive if alive else 0.0
+            lines.append("  {0} ({1}): {2:.2%}, {3:.2f} HP".format(name, side, alive / fights,
+                                                                  mean_hp))
+        return "\n".join(lines)
+
+
+def _run_batch(job):
+    """ Input: tuple of (setup, number of fights, seed)
+        Return: Report for the batch (runs in a worker process)
+    """
+    setup, fights, seed = job
+    rng = Random(seed)
+    report = Report(setup.names, setup.party_size)
+    add = report.add
+    for _ in range(fights):
+        add(*run_fight(setup, rng))
+    return report
+
+
+def simulate(party, enemies, player, fights=10000, workers=None, seed=None, can_flee=False,
+             batch_size=20000):
+    """ Input: party (list), enemies (list), player (Combatant or
+        Character objects), number of fights (int), worker processes
+        (int, None for one per core, 1 to stay in this process), seed
+        (int or None), can_flee (boolean), fights per batch (int)
+        Return: Report object
+        Runs independent copies of the fight across a process pool.
+        The Character objects passed in are never modified.
+    """
+    setup = Setup(party, enemies, player, can_flee)
+    base = Random(seed)
+    jobs = []
+    remaining = fights
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        jobs.append((setup, size, base.getrandbits(64)))
+        remaining -= size
+
+    start = perf_counter()
+    report = Report(setup.names, setup.party_size)
+    if workers == 1 or len(jobs) == 1:
+        for result in map(_run_batch, jobs):
+            report.merge(result)
+    else:
+        with Pool(workers) as pool:
+            for result in pool.imap_unordered(_run_batch, jobs):
+                report.merge(result)
+    report.seconds = perf_counter() - start
+    return report
+
+
+def simulate_duels(player, enemy, fights=1000000, seed=None):
+    """ Input: player, enemy (Combatant or Character objects), number
+        of fights (int), seed (int or None)
+        Return: Report object
+        Runs a 1v1 encounter through the NumPy kernel in batch.py,
+        which is far faster than run_fight() but cannot do parties.
+    """
+    from .batch import duel
+
+    player, enemy = _as_combatant(player), _as_combatant(enemy)
+    setup = Setup([], [enemy], player)
+
+    start = perf_counter()
+    result = duel(player.constitution, player.attack_mod, player.max_damage,
+                  setup.bonus[1][0], enemy.constitution, enemy.attack_mod, enemy.max_damage,
+                  setup.bonus[0][1], fights, seed)
+
+    report = Report(setup.names, setup.party_size)
+    wins = int((result.winner == 0).sum())
+    report.outcomes[WIN] = wins
+    report.outcomes[LOSS] = fights - wins
+    report.turns.update(result.turn_counts())
+    for index, hp in enumerate((result.hp_a, result.hp_b)):
+        report.survivor_hp[index] = int(hp.sum())
+        report.survived[index] = int((hp > 0).sum())
+    report.seconds = perf_counter() - start
+    return report
+
+
+###########################################################################
+####                Command Line Interface                             ####
+###########################################################################
+
+
+def _default_encounter():
+    """ Return: party, enemies and player from the manor's dining hall
+        fight (tuple of lists of Combatants and a Combatant)
+    """
+    player = Combatant("Player", 50, 1.25, 6, "Mace of Base")
+    jill = Combatant("Jill", 15, 1.0, 5, "Dagger of Backstabbing")
+    jack = Combatant("Jack", 8, .75, 3, "fists", "Mace of Base")
+    jack2 = Combatant("Jack2", 8, .75, 3, "fists", "any")
+    return ([jill], [jack, jack2], player)
+
+
+def main(argv=None):
+    """ Input: command line arguments (list of strings or None)
+        Return: none
+    """
+    parser = argparse.ArgumentParser(description="Simulate fights without pauses, prompts "
+                                     "or a game over.  Combatants are given as \"name,"
+                                     "constitution,attack_mod,max_damage[,weapon[,weakness]]\".")
+    parser.add_argument("-n", "--fights", type=int, default=100000)
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("-s", "--seed", type=int, default=None)
+    parser.add_argument("--player", help="player spec (weakness is ignored)")
+    parser.add_argument("--party", action="append", default=[], help="party member spec")
+    parser.add_argument("--enemy", action="append", default=[], help="enemy spec")
+    parser.add_argument("--flee", action="store_true",
+                        help="player flees when below 5 hit points")
+    parser.add_argument("--numpy", action="store_true",
+                        help="use the vectorized kernel (player vs. a single enemy only)")
+    args = parser.parse_args(argv)
+
+    if args.player or args.party or args.enemy:
+        player = Combatant.parse(args.player or "Player,50,1.25,6,Mace of Base")
+        party = [Combatant.parse(spec) for spec in args.party]
+        enemies = [Combatant.parse(spec, True) for spec in args.enemy]
+    else:
+        party, enemies, player = _default_encounter()
+
+    if args.numpy:
+        if party or len(enemies) != 1 or args.flee:
+            parser.error("--numpy only supports the player against one enemy, without --flee")
+        print(simulate_duels(player, enemies[0], args.fights, args.seed))
+    else:
+        print(simulate(party, enemies, player, args.fights, args.workers, args.seed,
+                       args.flee))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+###########################################################################
+##  This is the exact matchup solver for my text adventure prototype.    ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Computes exact win probabilities instead of sampling fights.
+
+    A fight is an absorbing Markov chain over (hit points of everyone,
+    whose turn it is).  Hits only ever lower hit points, so the only
+    cycles are rounds of misses; each round is solved in closed form and
+    everything else is a memoized walk down to the absorbing states.
+    Rules are those of GameSession._fight() (session.py) with
+    can_flee=False, with the player targeting like any other character
+    (highest constitution).
+"""
+
+from functools import lru_cache
+from itertools import permutations
+
+from .simulate import Combatant, Setup, _as_combatant
+
+
+# Beyond this the number of initiative orders (n!) gets out of hand
+MAX_COMBATANTS = 6
+
+
+class Odds():
+
+    def __init__(self, win, expected_turns):
+        """ Input: probability the party wins (float), expected number
+            of attacks before the fight ends (float)
+            Return: none
+        """
+        self.win = win
+        self.loss = 1.0 - win
+        self.expected_turns = expected_turns
+
+    def __repr__(self):
+        return "Odds(win={0:.6f}, loss={1:.6f}, expected_turns={2:.4f})".format(
+            self.win, self.loss, self.expected_turns)
+
+
+###########################################################################
+####                Single Attack Distribution                         ####
+###########################################################################
+
+
+def attack_chances(attack_mod):
+    """ Input: attack_mod (float)
+        Return: tuple containing (1) probability of a critical hit,
+        (2) probability of an ordinary hit (floats)
+        The attack roll is d20 * attack_mod and must beat a d20 defense
+        roll; an attack of exactly 20 is a critical hit.
+    """
+    critical = 0.0
+    hit = 0.0
+    for roll in range(1, 21):
+        attack = roll * attack_mod
+        # Number of defense rolls strictly below the attack
+        beaten = min(max(-int(-attack // 1) - 1, 0), 20)
+        if attack == 20:
+            critical += beaten / 400
+        else:
+            hit += beaten / 400
+    return (critical, hit)
+
+
+def damage_outcomes(constitution, critical, hit, max_damage, bonus):
+    """ Input: defender's constitution (int), critical and hit
+        probabilities (floats), max_damage (int), weakness bonus (int)
+        Return: list of (probability, constitution after the attack)
+        tuples for every attack that lands
+    """
+    halved = constitution // 2 if constitution > 6 else 0
+    outcomes = [(critical, halved)] if critical else []
+    if hit:
+        each = hit / max_damage
+        for damage in range(1, max_damage + 1):
+            outcomes.append((each, max(constitution - damage - bonus, 0)))
+    return outcomes
+
+
+###########################################################################
+####                Initiative Orders                                  ####
+###########################################################################
+
+
+def order_probability(order):
+    """ Input: order (tuple of combatant indexes, first to act first)
+        Return: probability fight() sorts combatants into this order
+        (float).  Everyone rolls a d20; ties keep list order.
+    """
+    # chances[value] = P(order so far is valid and last roll == value)
+    chances = [0.0] + [1 / 20] * 20
+    for previous, current in zip(order, order[1:]):
+        # The next roll must be lower, or tie while later in list order
+        tie = current > previous
+        updated = [0.0] * 21
+        above = 0.0
+        for value in range(20, 0, -1):
+            updated[value] = (above + (chances[value] if tie else 0.0)) / 20
+            above += chances[value]
+        chances = updated
+    return sum(chances)
+
+
+###########################################################################
+####                Markov Chain Solver                                ####
+###########################################################################
+
+
+def _landed_attacks(setup, chances, hp, attacker):
+    """ Input: setup (Setup object), attack_chances() for everyone
+        (list), hit points (tuple), attacker (int)
+        Return: tuple containing (1) chance the attack changes nothing
+        (float), (2) list of (probability, hit points after, defender)
+        tuples for every attack that lands
+    """
+    party_size = setup.party_size
+    if attacker < party_size:
+        opponents = range(party_size, len(hp))
+    else:
+        opponents = range(party_size)
+
+    # Highest constitution wins; the first one listed on a tie
+    defender = None
+    for opponent in opponents:
+        if hp[opponent] > 0 and (defender is None or hp[opponent] > hp[defender]):
+            defender = opponent
+
+    critical, hit = chances[attacker]
+    landed = [(probability, hp[:defender] + (left,) + hp[defender + 1:], defender)
+              for probability, left in damage_outcomes(hp[defender], critical, hit,
+                                                       setup.max_damage[attacker],
+                                                       setup.bonus[attacker][defender])]
+    return (1.0 - critical - hit, landed)
+
+
+def _solve_order(setup, order, attacks):
+    """ Input: setup (Setup object), initiative order (tuple), cache
+        of _landed_attacks() results shared between orders (dict)
+        Return: tuple of (P(party wins), expected attacks) (floats)
+    """
+    party_size = setup.party_size
+    player = setup.player
+    chances = [attack_chances(mod) for mod in setup.attack_mod]
+    memo = {}
+
+    def value(hp):
+        """ Returns [(P(win), E[attacks])] for every turn position with
+            these hit points, solving the round of misses in closed form
+        """
+        if hp in memo:
+            return memo[hp]
+
+        alive = [index for index in order if hp[index] > 0]
+        count = len(alive)
+        constants = []
+        misses = []
+        for position, attacker in enumerate(alive):
+            key = (hp, attacker)
+            if key not in attacks:
+                attacks[key] = _landed_attacks(setup, chances, hp, attacker)
+            miss, landed = attacks[key]
+
+            win, turns = 0.0, 1.0
+            for probability, after, defender in landed:
+                if after[defender] > 0:
+                    following = position + 1 if position < count - 1 else 0
+                elif defender == player:
+                    continue
+                elif not any(after[party_size:]):
+                    win += probability
+                    continue
+                else:
+                    # Same index bookkeeping as fight() when someone dies
+                    index = position - 1 if alive.index(defender) < position else position
+                    following = 0 if index >= count - 2 else index + 1
+                next_win, next_turns = value(after)[following]
+                win += probability * next_win
+                turns += probability * next_turns
+            constants.append((win, turns))
+            misses.append(miss)
+
+        # V[i] = c[i] + q[i] * V[i + 1], wrapping around the round
+        loop = 1.0
+        for miss in misses:
+            loop *= miss
+        if loop >= 1.0:
+            raise ValueError("No one in this fight can ever land a hit.")
+
+        solved = [None] * count
+        for start in range(count):
+            win, turns, carry = 0.0, 0.0, 1.0
+            for step in range(count):
+                position = (start + step) % count
+                win += carry * constants[position][0]
+                turns += carry * constants[position][1]
+                carry *= misses[position]
+            solved[start] = (win / (1 - loop), turns / (1 - loop))
+        memo[hp] = solved
+        return solved
+
+    return value(tuple(setup.constitution))[0]
+
+
+def _stats(combatant):
+    """ Returns the hashable stat tuple used as a cache key (names do
+        not change the odds, so they are left out)
+    """
+    return (combatant.constitution, combatant.attack_mod, combatant.max_damage,
+            combatant.weapon_name, combatant.weakness)
+
+
+@lru_cache(maxsize=4096)
+def _solve(party, enemies, player):
+    """ Cached solver keyed by stat tuples (see solve()) """
+    setup = Setup([Combatant("", *stats) for stats in party],
+                  [Combatant("", *stats) for stats in enemies], Combatant("", *player))
+    attacks = {}
+    win, turns = 0.0, 0.0
+    for order in permutations(range(len(setup.constitution))):
+        probability = order_probability(order)
+        if probability == 0:
+            continue
+        order_win, order_turns = _solve_order(setup, order, attacks)
+        win += probability * order_win
+        turns += probability * order_turns
+    return Odds(win, turns)
+
+
+def solve(party, enemies, player):
+    """ Input: party (list), enemies (list), player (Combatant or
+        Character objects)
+        Return: Odds object with the exact chance the party wins and
+        the expected number of attacks
+        Results are cached by the combatants' stats, so asking again
+        for the same matchup is a dictionary lookup.
+    """
+    party = tuple(_stats(_as_combatant(member)) for member in party)
+    enemies = tuple(_stats(_as_combatant(enemy)) for enemy in enemies)
+    player = _stats(_as_combatant(player))
+    if len(party) + len(enemies) + 1 > MAX_COMBATANTS:
+        raise ValueError("The exact solver handles at most {0} combatants; use simulate() for "
+                         "bigger fights.".format(MAX_COMBATANTS))
+    if not enemies:
+        raise ValueError("A fight needs at least one enemy.")
+    return _solve(party, enemies, player)
+
+
+def solve_duel(player, enemy):
+    """ Input: player, enemy (Combatant or Character objects)
+        Return: Odds object for a 1v1 fight
+    """
+    return solve([], [enemy], player)
@@ -0,0 +1,371 @@
+###########################################################################
+##  This is the world store for my text adventure prototype.             ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Keeps a persistent world in an SQLite database, for worlds too big
+    (or too long lived) to keep in memory.
+
+    A WorldStore is used like any other World: room(key) and
+    character(key) give the same object every time while anything still
+    refers to it.  Behind them, the most recently used rooms and
+    characters are kept in memory and the rest are dropped, to be built
+    again from the database (or, if they never changed, from the .world
+    file) when next asked for.  Links between rooms are kept as keys,
+    so Room.move() finds the next room the same way whether it's in
+    memory or not.
+
+    Records are stored as in a save file (see save.py).  Changes are
+    tracked through the property setters (see dirty.py); each
+    autosave() hands what changed to a background thread, which writes
+    it in one transaction.  Until then, reads are answered from the
+    records waiting to be written.
+
+        store = WorldStore("castle.db", "castle.world")
+        session = GameSession.load(store)
+"""
+
+import marshal
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+
+from .dirty import paused, track, untrack
+from .room import LinkMap
+from .save import SavedWorld, _Encoder, _changed_records
+from .strings import pack
+from .world import World
+
+
+_TABLES = ("meta", "prototypes", "scripts", "rooms", "characters")
+
+
+###########################################################################
+####                Cache                                              ####
+###########################################################################
+
+
+class _Cache():
+
+    def __init__(self, size):
+        """ Rooms or characters by key.  The size most recently used are
+            kept; the rest only for as long as something else refers to
+            them, so there's never two of the same one.
+        """
+        self._size = size
+        self._recent = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+
+    def get(self, key, default=None):
+        thing = self._recent.get(key)
+        if thing is None:
+            thing = self._live.get(key)
+            if thing is None:
+                return default
+            self._recent[key] = thing
+        self._recent.move_to_end(key)
+        if len(self._recent) > self._size:
+            self._recent.popitem(last=False)
+        return thing
+
+    def __contains__(self, key):
+        return key in self._recent or key in self._live
+
+    def __getitem__(self, key):
+        thing = self.get(key)
+        if thing is None:
+            raise KeyError(key)
+        return thing
+
+    def __setitem__(self, key, thing):
+        self._live[key] = thing
+        self._recent[key] = thing
+        self._recent.move_to_end(key)
+        if len(self._recent) > self._size:
+            self._recent.popitem(last=False)
+
+    def keys(self):
+        return list(self._live.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._live)
+
+
+class _Records():
+
+    def __init__(self, store, table):
+        """ A table of marshal'd records, read like the dicts of record
+            offsets in a SavedWorld.  Records waiting to be written are
+            read from pending.
+        """
+        self._store = store
+        self._table = table
+        self.pending = {}
+
+    def get(self, key):
+        """ Input: key (string)
+            Return: the record (marshal'd bytes), or None if there's no
+            such record; one SELECT at most
+        """
+        with self._store._lock:
+            record = self.pending.get(key)
+        if record is not None:
+            return record
+        return self._store._select(self._table, key)
+
+    def __iter__(self):
+        with self._store._lock:
+            keys = dict.fromkeys(self.pending)
+        for (key,) in self._store._connection.execute(
+                "SELECT key FROM {0}".format(self._table)):
+            keys[key] = None
+        return iter(keys)
+
+
+###########################################################################
+####                Store                                              ####
+###########################################################################
+
+
+class WorldStore(SavedWorld):
+
+    def __init__(self, path, world_path=None, rooms=1024, characters=4096):
+        """ Input: path to the database (string), world_path (path to
+            the .world file it starts from; only needed the first time),
+            rooms and characters (int: how many of each to keep in
+            memory at least)
+            Return: none
+            Opens (or creates) the store and starts its writer thread.
+            Call close() when done with it.
+        """
+        self._store_path = os.path.abspath(path)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            for table in _TABLES:
+                self._connection.execute("CREATE TABLE IF NOT EXISTS {0} "
+                                         "(key PRIMARY KEY, record BLOB)".format(table))
+        # Nothing is autosaved until someone plays
+        meta = {"start": None, "player": None, "state": {}}
+        meta.update((key, marshal.loads(record)) for key, record in
+                    self._connection.execute("SELECT key, record FROM meta"))
+        if "world" not in meta:
+            if world_path is None:
+                self._connection.close()
+                raise ValueError("A new world store needs a .world file: {0}".format(path))
+            meta["world"] = os.path.abspath(world_path)
+            with self._connection:
+                self._connection.execute("INSERT INTO meta VALUES (?, ?)",
+                                         ("world", marshal.dumps(meta["world"])))
+
+        self._lock = threading.Lock()
+        self._saved_rooms = _Records(self, "rooms")
+        self._saved_characters = _Records(self, "characters")
+        World.__init__(self, meta["world"])
+        self._saved_prototypes = [self._text(marshal.loads(record)) for (record,) in
+                                  self._connection.execute(
+                                      "SELECT record FROM prototypes ORDER BY key")]
+        self._saved_scripts = [self._text(marshal.loads(record)) for (record,) in
+                               self._connection.execute("SELECT record FROM scripts ORDER BY key")]
+        self._saved_meta = meta
+        self._item_kinds = [None] * len(self._saved_prototypes)
+        self._saved_loot = {}
+        self._saved_player = None
+
+        # Only the most recently used rooms and characters are kept
+        self._rooms = _Cache(rooms)
+        self._characters = _Cache(characters)
+        self._changed = track(self._watchers)
+        self._encoder = _Encoder(self, self._saved_prototypes, self._saved_scripts)
+
+        self._writes = queue.Queue()
+        self._error = None
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def _select(self, table, key):
+        row = self._connection.execute("SELECT record FROM {0} WHERE key = ?".format(table),
+                                       (key,)).fetchone()
+        return None if row is None else row[0]
+
+    @property
+    def store_path(self):
+        """ Return: absolute path of the database (string) """
+        return self._store_path
+
+    @property
+    def start(self):
+        """ Return: room the player was in at the last autosave, or the
+            world's start room
+        """
+        if self._saved_meta["start"] is None:
+            return World.start.fget(self)
+        return self.room(self._saved_meta["start"])
+
+    @property
+    def saved_player(self):
+        """ Return: the Player object as last autosaved (the same one
+            every time), or None if nobody has played yet
+        """
+        if self._saved_meta["player"] is None:
+            return None
+        return super().saved_player
+
+    def _link_map(self, links):
+        """ Links resolve through the cache every time they're read """
+        return LinkMap(links, self.room, keep=False)
+
+    def _forget_key(self, thing):
+        """ Drops thing's key once it's gone, before its id() is reused """
+        weakref.finalize(thing, self._keys.pop, id(thing), None)
+
+    def character(self, key):
+        """ Input: character key (string)
+            Return: Character object; the same one while anything still
+            refers to it
+        """
+        character = self._characters.get(key)
+        if character is None:
+            # Building it from its record isn't a change to save
+            with paused(self._changed):
+                character = super().character(key)
+            self._forget_key(character)
+        return character
+
+    def room(self, key):
+        """ Input: room key (string)
+            Return: Room object; the same one while anything still
+            refers to it
+        """
+        room = self._rooms.get(key)
+        if room is None:
+            with paused(self._changed):
+                room = super().room(key)
+            self._forget_key(room)
+        return room
+
+    ###########################################################################
+    ####                    Writing                                        ####
+    ###########################################################################
+
+    def autosave(self, player=None, current_room=None, state=None):
+        """ Input: player (Player object), current_room (Room object),
+            state (as save_game()); all optional, to write just the
+            rooms and characters
+            Return: none
+            Hands every room and character changed since the last
+            autosave to the writer thread.  Raises whatever stopped the
+            writer thread, if it has stopped.
+        """
+        if self._error is not None:
+            raise self._error
+
+        rooms, characters = _changed_records(self, self._changed)
+        self._changed.clear()
+        encoder = self._encoder
+        prototypes_from = len(self._saved_prototypes)
+        scripts_from = len(self._saved_scripts)
+        writes = {"rooms": {key: marshal.dumps(encoder.room(room))
+                            for key, room in rooms.items()},
+                  "characters": {key: marshal.dumps(encoder.character(character))
+                                 for key, character in characters.items()},
+                  "meta": {}}
+        if player is not None:
+            meta = {"start": encoder.room_key(current_room), "player": encoder.character(player),
+                    "state": state or {}}
+            self._saved_meta.update(meta)
+            writes["meta"] = {key: marshal.dumps(value) for key, value in meta.items()}
+            self._saved_player = player
+
+        # Item kinds and scripts new to the encoder, for reading back
+        writes["prototypes"] = {number: marshal.dumps(pack(encoder.prototypes[number]))
+                                for number in range(prototypes_from, len(encoder.prototypes))}
+        writes["scripts"] = {number: marshal.dumps(pack(encoder.scripts[number]))
+                             for number in range(scripts_from, len(encoder.scripts))}
+        self._saved_prototypes += encoder.prototypes[prototypes_from:]
+        self._saved_scripts += encoder.scripts[scripts_from:]
+        self._item_kinds += [None] * (len(self._saved_prototypes) - len(self._item_kinds))
+
+        if any(writes.values()):
+            with self._lock:
+                self._saved_rooms.pending.update(writes["rooms"])
+                self._saved_characters.pending.update(writes["characters"])
+            self._writes.put(writes)
+
+    def _write(self):
+        """ Writer thread: writes everything queued, in one transaction
+            per batch, until close() queues None
+        """
+        connection = sqlite3.connect(self._store_path)
+        try:
+            done = False
+            while not done:
+                batch = [self._writes.get()]
+                while not self._writes.empty():
+                    batch.append(self._writes.get())
+                if batch[-1] is None:
+                    done = True
+                    batch.pop()
+                if not batch:
+                    continue
+
+                try:
+                    with connection:
+                        for writes in batch:
+                            for table, records in writes.items():
+                                connection.executemany(
+                                    "INSERT OR REPLACE INTO {0} VALUES (?, ?)".format(table),
+                                    records.items())
+                except sqlite3.Error as error:
+                    self._error = error
+                    return
+
+                # Read them from the database from now on, unless
+                # they've changed again since
+                with self._lock:
+                    for writes in batch:
+                        for table, records in (("rooms", self._saved_rooms),
+                                               ("characters", self._saved_characters)):
+                            for key, record in writes[table].items():
+                                if records.pending.get(key) is record:
+                                    del records.pending[key]
+        finally:
+            connection.close()
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Writes any changes made since the last autosave, waits for
+            the writer thread and closes the store.
+        """
+        if self._writer.is_alive():
+            try:
+                self.autosave()
+            finally:
+                self._writes.put(None)
+                self._writer.join()
+                untrack(self._changed)
+                self._connection.close()
+                World.close(self)
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,224 @@
+###########################################################################
+##  This is the string table for my text adventure prototype.            ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Keeps a world's text (room, item and character descriptions,
+    conversations and search responses) out of memory until it's shown.
+
+    compile_strings() moves the text of a .world file into a string
+    table beside it, castle.world.strings: every piece of text once, as
+    UTF-8, one after another.  In the .world the text is replaced by its
+    [offset, length] in the table.  World memory-maps the table and
+    gives rooms, items and scripts a TextRef for each piece of text,
+    which is only decoded when a getter (Room.description, a Cursor's
+    next line, ...) is asked for it.
+
+    Saves store TextRefs as [offset, length] too, so a world's string
+    table mustn't be compiled again while there are saves of it.
+"""
+
+import json
+import mmap
+import os
+import re
+from weakref import WeakValueDictionary
+
+
+###########################################################################
+####                Text References                                    ####
+###########################################################################
+
+
+class TextRef():
+
+    __slots__ = ("_table", "_offset", "_length")
+
+    def __init__(self, table, offset, length):
+        """ Input: table (StringTable object), offset and length (ints,
+            in bytes)
+            Return: none
+            A piece of text in a string table.  str() decodes it; it
+            isn't kept decoded.
+        """
+        self._table = table
+        self._offset = offset
+        self._length = length
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @property
+    def length(self):
+        return self._length
+
+    def __str__(self):
+        return self._table.text(self._offset, self._length)
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __repr__(self):
+        return "TextRef({0}, {1})".format(self._offset, self._length)
+
+    def __eq__(self, other):
+        return (isinstance(other, TextRef) and self._table is other._table and
+                self._offset == other._offset and self._length == other._length)
+
+    def __hash__(self):
+        return hash((self._offset, self._length))
+
+
+def text(value):
+    """ Input: string, TextRef object or None
+        Return: value as a string (or None)
+    """
+    return str(value) if isinstance(value, TextRef) else value
+
+
+def pack(value):
+    """ Input: text (string or TextRef), or a tuple of them (e.g. a
+        script or search response)
+        Return: value with every TextRef as [offset, length], for
+        saving
+    """
+    if isinstance(value, TextRef):
+        return [value.offset, value.length]
+    if isinstance(value, tuple):
+        return tuple(pack(part) for part in value)
+    return value
+
+
+class StringTable():
+
+    def __init__(self, path):
+        """ Input: path to a string table (string)
+            Return: none
+        """
+        self._path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    def __reduce__(self):
+        # TextRefs pickle with the path of their table, which is opened
+        # again (once per process) when they're loaded
+        return (open_table, (os.path.abspath(self._path),))
+
+    @property
+    def path(self):
+        """ Return: path of the string table (string) """
+        return self._path
+
+    def text(self, offset, length):
+        """ Input: offset and length (ints, in bytes)
+            Return: the text there, decoded (string)
+        """
+        return self._data[offset:offset + length].decode("utf-8")
+
+    def unpack(self, value):
+        """ Input: value from pack(), a .world record or a save
+            Return: value with every [offset, length] as a TextRef
+        """
+        if isinstance(value, list):
+            return TextRef(self, *value)
+        if isinstance(value, tuple):
+            return tuple(self.unpack(part) for part in value)
+        return value
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Closes the table.  Text not yet decoded can't be read after.
+        """
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+# Tables opened to load pickled TextRefs, by path
+_open_tables = WeakValueDictionary()
+
+
+def open_table(path):
+    """ Input: absolute path to a string table (string)
+        Return: StringTable object, shared by everything loaded from a
+        pickle while it's open
+    """
+    table = _open_tables.get(path)
+    if table is None or table._file.closed:
+        table = _open_tables[path] = StringTable(path)
+    return table
+
+
+###########################################################################
+####                Compiling                                          ####
+###########################################################################
+
+
+# kind<TAB>key<TAB>json, as in world.py
+_RECORD = re.compile(r"([a-z]+)\t([^\t\n]*)\t([^\n]*)\n?")
+
+
+def compile_strings(world_path):
+    """ Input: path to a .world file (string)
+        Return: none
+        Moves the world's text into world_path + ".strings" and puts
+        [offset, length] in its place.  A world that was compiled before
+        is compiled again from its old table.
+    """
+    strings_path = world_path + ".strings"
+    old = StringTable(strings_path) if os.path.exists(strings_path) else None
+    places = {}
+
+    with open(world_path + ".tmp", "w", encoding="utf-8") as world_file, \
+            open(strings_path + ".tmp", "wb") as strings_file:
+
+        def place(value):
+            # Each piece of text goes in the table once, wherever it's used
+            if isinstance(value, list):
+                value = old.text(*value)
+            if value not in places:
+                data = value.encode("utf-8")
+                places[value] = [strings_file.tell(), len(data)]
+                strings_file.write(data)
+            return places[value]
+
+        with open(world_path, encoding="utf-8") as source:
+            for line in source:
+                match = _RECORD.match(line)
+                if match is None:
+                    world_file.write(line)
+                    continue
+                kind, key, record = match.group(1), match.group(2), json.loads(match.group(3))
+                if kind in ("item", "character", "room") and record.get("description"):
+                    record["description"] = place(record["description"])
+                if kind == "character" and "conversation" in record:
+                    record["conversation"] = [place(spoken) for spoken in record["conversation"]]
+                if kind == "room" and "search" in record:
+                    record["search"] = [[place(response[0])] + response[1:]
+                                        for response in record["search"]]
+                world_file.write("{0}\t{1}\t{2}\n".format(kind, key, json.dumps(
+                    record, ensure_ascii=False)))
+
+    if old is not None:
+        old.close()
+    os.replace(strings_path + ".tmp", strings_path)
+    os.replace(world_path + ".tmp", world_path)
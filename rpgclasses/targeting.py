@@ -0,0 +1,254 @@
+###########################################################################
+##  This is the target selection index for my text adventure prototype.  ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+
+from heapq import heappop, heappush
+from itertools import islice
+from random import randrange
+
+
+###########################################################################
+####                Targeting Policies                                 ####
+###########################################################################
+
+# Each heap policy maps a character to a sort key; the smallest key is
+# attacked.  Ties go to whoever was added to the index first, which is
+# what Character.attack's scan of the opponents list did.
+POLICIES = {
+    "highest": lambda character: -character.constitution,
+    "lowest": lambda character: character.constitution,
+    "threat": lambda character: -(character.attack_mod * character.max_damage),
+}
+
+# Picks uniformly at random instead of using a heap
+RANDOM = "random"
+
+
+def add_policy(name, key):
+    """ Input: name (string), key (function taking a character object
+        and returning a sortable value, lowest is attacked first)
+        Return: none
+        Registers a new targeting policy for Character.targeting.
+    """
+    if name == RANDOM:
+        raise ValueError("'{0}' is reserved".format(RANDOM))
+    POLICIES[name] = key
+
+
+def select(characters, policy="highest"):
+    """ Input: characters (list of character objects), policy name
+        (string), see POLICIES and RANDOM
+        Return: character object to attack, or None if empty
+        One scan of the list, for a single attack.  A fight, where the
+        same sides are attacked over and over, should build one
+        TargetIndex for each side instead.
+    """
+    if not characters:
+        return None
+    if policy == RANDOM:
+        return characters[randrange(len(characters))]
+    if policy not in POLICIES:
+        raise ValueError("Unknown targeting policy: {0}".format(policy))
+    # min() keeps the first of equal keys, as the heaps do
+    return min(characters, key=POLICIES[policy])
+
+
+###########################################################################
+####                Policy Indexes                                     ####
+###########################################################################
+
+
+class _HeapIndex():
+
+    def __init__(self, key, members):
+        """ Input: key (function), members (dict of character -> order
+            added)
+            Return: none
+            Binary heap with lazy deletion: an updated or removed
+            character's old entry is marked dead and skipped when it
+            reaches the top.
+        """
+        self._key = key
+        self._heap = []
+        self._entries = {}
+        self._pushes = 0
+        for character, order in members.items():
+            self.push(character, order)
+
+    def push(self, character, order):
+        """ (Re)inserts a character with its current key, O(log n) """
+        old = self._entries.get(character)
+        if old is not None:
+            old[3] = None
+        # The push count breaks ties between old and new entries
+        self._pushes += 1
+        entry = [self._key(character), order, self._pushes, character]
+        self._entries[character] = entry
+        heappush(self._heap, entry)
+
+    def discard(self, character):
+        """ Marks a character's entry as dead, O(1) """
+        entry = self._entries.pop(character, None)
+        if entry is not None:
+            entry[3] = None
+
+    def top(self):
+        """ Returns the best target, or None if the index is empty """
+        heap = self._heap
+        while heap:
+            key, order, _, character = heap[0]
+            if character is None:
+                heappop(heap)
+            elif key != self._key(character):
+                # Changed without update() being called; requeue it
+                heappop(heap)
+                self.push(character, order)
+            else:
+                return character
+        return None
+
+
+class _RandomIndex():
+
+    def __init__(self, members):
+        """ Input: members (dict of character -> order added)
+            Return: none
+            Array plus position map; removal swaps the last element into
+            the hole, so add, remove and a random pick are all O(1).
+        """
+        self._characters = []
+        self._positions = {}
+        for character, order in members.items():
+            self.push(character, order)
+
+    def push(self, character, order):
+        if character not in self._positions:
+            self._positions[character] = len(self._characters)
+            self._characters.append(character)
+
+    def discard(self, character):
+        position = self._positions.pop(character, None)
+        if position is None:
+            return
+        last = self._characters.pop()
+        if last is not character:
+            self._characters[position] = last
+            self._positions[last] = position
+
+    def top(self):
+        if not self._characters:
+            return None
+        return self._characters[randrange(len(self._characters))]
+
+
+###########################################################################
+####                Target Index                                       ####
+###########################################################################
+
+
+class TargetIndex():
+
+    def __init__(self, characters=()):
+        """ Input: characters (list of character objects) that can be
+            attacked
+            Return: none
+            One side of a fight.  Pass it to Character.attack in place
+            of a list of opponents and the target is found in
+            O(log n) instead of by scanning every opponent.  Call
+            update() after a character's hit points change and remove()
+            when they die; indexes for each policy are built the first
+            time that policy is asked for and then kept up to date.
+        """
+        self._members = {}
+        self._counter = 0
+        self._indexes = {}
+        for character in characters:
+            self.add(character)
+
+    def add(self, character):
+        """ Input: character object
+            Return: none
+        """
+        if character in self._members:
+            return
+        self._members[character] = self._counter
+        self._counter += 1
+        for index in self._indexes.values():
+            index.push(character, self._members[character])
+
+    def remove(self, character):
+        """ Input: character object
+            Return: none
+            Removes a character (e.g. when killed) in O(1).
+        """
+        del self._members[character]
+        for index in self._indexes.values():
+            index.discard(character)
+
+    def update(self, character):
+        """ Input: character object whose stats changed
+            Return: none
+        """
+        if character not in self._members:
+            return
+        for index in self._indexes.values():
+            if isinstance(index, _HeapIndex):
+                index.push(character, self._members[character])
+
+    def select(self, policy="highest"):
+        """ Input: policy name (string), see POLICIES and RANDOM
+            Return: character object to attack, or None if empty
+        """
+        index = self._indexes.get(policy)
+        if index is None:
+            if policy == RANDOM:
+                index = _RandomIndex(self._members)
+            elif policy in POLICIES:
+                index = _HeapIndex(POLICIES[policy], self._members)
+            else:
+                raise ValueError("Unknown targeting policy: {0}".format(policy))
+            self._indexes[policy] = index
+        return index.top()
+
+    def __contains__(self, character):
+        return character in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        """ Yields characters in the order they were added.  Don't add
+            or remove characters while iterating; iterate over a list()
+            of them instead.
+        """
+        return iter(self._members)
+
+    def __getitem__(self, position):
+        """ Positional access, for code written against lists.  The
+            first and last characters are O(1), others O(position).
+        """
+        if isinstance(position, slice):
+            return list(self._members)[position]
+        if position < 0:
+            members, position = reversed(self._members), -position - 1
+        else:
+            members = iter(self._members)
+        for character in islice(members, position, None):
+            return character
+        raise IndexError("TargetIndex index out of range")
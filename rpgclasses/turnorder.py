@@ -0,0 +1,103 @@
+###########################################################################
+##  This is the turn order class for my text adventure prototype.        ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+
+class TurnOrder():
+
+    def __init__(self, combatants):
+        """ Input: combatants (list of character objects) in the order
+            they will attack
+            Return: none
+            A ring of combatants linked in both directions, so removing
+            a dead combatant and moving to the next attacker are both
+            O(1), however many characters are in the battle.
+        """
+        combatants = list(combatants)
+        self._next = {}
+        self._prev = {}
+        for position, combatant in enumerate(combatants):
+            self._next[combatant] = combatants[(position + 1) % len(combatants)]
+            self._prev[combatant] = combatants[position - 1]
+
+        # First combatant in a round, and whose turn it is now
+        self._head = combatants[0] if combatants else None
+        self._current = self._head
+
+    @classmethod
+    def from_initiative(cls, combatants, num_sides=20):
+        """ Input: combatants (list of character objects), number of
+            sides on the initiative die (int)
+            Return: TurnOrder, highest initiative roll first
+            Initiative is a single die roll, so combatants are dropped
+            into one bucket per possible roll instead of being sorted.
+            Ties keep the order of the combatants list.
+        """
+        buckets = [[] for _ in range(num_sides + 1)]
+        for combatant in combatants:
+            buckets[combatant.roll_dice(1, num_sides)].append(combatant)
+        return cls(combatant for bucket in reversed(buckets) for combatant in bucket)
+
+    @property
+    def current(self):
+        """ Return: character whose turn it is (character object) """
+        return self._current
+
+    def advance(self):
+        """ Input: none
+            Return: True if a new round has started (boolean)
+            Moves to the next combatant in the turn order.
+        """
+        self._current = self._next[self._current]
+        return self._current is self._head
+
+    def remove(self, combatant):
+        """ Input: combatant (character object)
+            Return: none
+            Takes a combatant out of the turn order.  If it was their
+            turn, the turn passes back to whoever went before them, so
+            advance() still moves on to the right character.
+        """
+        following = self._next.pop(combatant)
+        preceding = self._prev.pop(combatant)
+
+        if following is combatant:
+            # Last combatant standing was removed
+            self._head = None
+            self._current = None
+            return
+
+        self._next[preceding] = following
+        self._prev[following] = preceding
+        if combatant is self._head:
+            self._head = following
+        if combatant is self._current:
+            self._current = preceding
+
+    def __contains__(self, combatant):
+        return combatant in self._next
+
+    def __len__(self):
+        return len(self._next)
+
+    def __iter__(self):
+        """ Yields combatants in turn order, starting with the round """
+        combatant = self._head
+        for _ in range(len(self._next)):
+            yield combatant
+            combatant = self._next[combatant]
@@ -0,0 +1,345 @@
+###########################################################################
+##  This is the world loader for my text adventure prototype.            ##
+##  Copyright (C) 2018  Chris Bickhaus                                   ##
+##                                                                       ##
+## This program is free software: you can redistribute it and/or modify  ##
+## it under the terms of the GNU General Public License as published by  ##
+## the Free Software Foundation, either version 3 of the License, or     ##
+## (at your option) any later version.                                   ##
+##                                                                       ##
+## This program is distributed in the hope that it will be useful,       ##
+## but WITHOUT ANY WARRANTY; without even the implied warranty of        ##
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         ##
+## GNU General Public License for more details.                          ##
+##                                                                       ##
+## You should have received a copy of the GNU General Public License     ##
+## along with this program.                                              ##
+## If not, see https://www.gnu.org/licenses/gpl-3.0.html.                ##
+###########################################################################
+
+""" Loads game worlds from .world files, one room at a time.
+
+    A .world file has one record per line: kind, key and a JSON object,
+    separated by tabs.  Kinds are "world" (key "meta": start room and
+    player stats), "item", "character" and "room":
+
+        item	fists	{"name": "fists", "type": "weapon", "description": "..."}
+        character	jack	{"class": "Enemy", "name": "Jack", "constitution": 8, ...}
+        room	kitchen	{"name": "Kitchen", "description": "...", "links": {...}}
+
+    An Enemy record may have a weighted loot table, where null means
+    nothing drops: "loot": [[null, 3], ["sack of gold", 1]]
+
+    Opening a world only records where each line starts.  A Room, with
+    its characters and items, is built from its line the first time it
+    is asked for, which is when it is entered or linked to.
+
+    If the world's text has been moved into a string table (see
+    strings.py), descriptions, conversation lines and search responses
+    are [offset, length] in the table instead.
+"""
+
+import json
+import mmap
+import os
+import re
+
+from .character import Character, Enemy, Friend, Player
+from .dirty import Watchers
+from .item import Item
+from .loot import LootTable
+from .room import LinkMap, Room, register_world, unregister_world
+from .strings import StringTable
+
+
+# kind<TAB>key<TAB>json, matched a whole line at a time
+_RECORD = re.compile(rb"([a-z]+)\t([^\t\n]*)\t([^\n]*)\n?")
+
+_CLASSES = {"Character": Character, "Enemy": Enemy, "Friend": Friend}
+
+# Worlds that ship with the game
+WORLDS_DIR = os.path.join(os.path.dirname(__file__), "worlds")
+
+
+class World():
+
+    def __init__(self, path):
+        """ Input: path to a .world file (string)
+            Return: none
+            Indexes the file.  Nothing is built until it's asked for.
+        """
+        self._path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+        # Offsets of each record's JSON, by kind and key
+        self._index = {"world": {}, "item": {}, "character": {}, "room": {}}
+        for match in _RECORD.finditer(self._data):
+            kind = match.group(1).decode()
+            if kind in self._index:
+                self._index[kind][match.group(2).decode()] = match.start(3)
+
+        # The world's text, if it's been compiled into a string table
+        strings_path = path + ".strings"
+        self._strings = StringTable(strings_path) if os.path.exists(strings_path) else None
+
+        self._meta = self._record("world", "meta") if "meta" in self._index["world"] else {}
+        self._rooms = {}
+        self._characters = {}
+        self._prototypes = {}
+        self._loot_tables = {}
+        self._scripts = {}
+        # Key of every room and character built, by id()
+        self._keys = {}
+        # Change sets and link listeners for this world's rooms and
+        # characters only, see dirty.py
+        self._watchers = Watchers()
+        # So pickled rooms can link to this world's rooms again
+        self._token = register_world(self)
+
+    @classmethod
+    def named(cls, name):
+        """ Input: name of a world that ships with the game (string)
+            Return: World, e.g. World.named("manor")
+        """
+        return cls(os.path.join(WORLDS_DIR, name + ".world"))
+
+    def _record(self, kind, key):
+        """ Parses one record's JSON """
+        start = self._index[kind][key]
+        end = self._data.find(b"\n", start)
+        return json.loads(self._data[start:end if end != -1 else len(self._data)])
+
+    @property
+    def path(self):
+        """ Return: path of the .world file (string) """
+        return self._path
+
+    @property
+    def start(self):
+        """ Return: room the player starts in (Room object) """
+        return self.room(self._meta["start"])
+
+    @property
+    def room_keys(self):
+        """ Return: keys of every room in the world (list of strings) """
+        return list(self._index["room"])
+
+    @property
+    def rooms_loaded(self):
+        """ Return: number of rooms built so far (int) """
+        return len(self._rooms)
+
+    def built(self):
+        """ Input: none
+            Return: (rooms, characters) built so far, as dicts of key ->
+            Room/Character object
+        """
+        return (dict(self._rooms), dict(self._characters))
+
+    @property
+    def watchers(self):
+        """ Return: Watchers object of the world's rooms and characters
+            (see dirty.py)
+        """
+        return self._watchers
+
+    def key_of(self, thing):
+        """ Input: Room or Character object
+            Return: its key (string), or None if this world didn't build
+            it
+        """
+        return self._keys.get(id(thing))
+
+    def __len__(self):
+        return len(self._index["room"])
+
+    def __contains__(self, key):
+        return key in self._index["room"]
+
+    def _text(self, value):
+        """ Turns text from a record (or a save) into what's kept: strings
+            stay strings, [offset, length] becomes a TextRef
+        """
+        if self._strings is None:
+            if isinstance(value, list):
+                raise ValueError("{0} has no string table for its text".format(self._path))
+            return value
+        return self._strings.unpack(value)
+
+    def item(self, key):
+        """ Input: item key (string)
+            Return: a new Item object of that kind
+            Items of one kind share a single prototype.
+        """
+        return self._prototype(key).create()
+
+    def _prototype(self, key):
+        """ Returns the ItemPrototype for an item key """
+        if key not in self._prototypes:
+            record = self._record("item", key)
+            self._prototypes[key] = Item(record["name"], record["type"],
+                                         self._text(record.get("description"))).prototype
+        return self._prototypes[key]
+
+    def _loot_table(self, entries):
+        """ Builds a LootTable from [[item key or null, weight], ...].
+            Enemies with the same entries share one table.
+        """
+        spec = tuple((key, weight) for key, weight in entries)
+        if spec not in self._loot_tables:
+            self._loot_tables[spec] = LootTable([(None if key is None else self._prototype(key),
+                                                  weight) for key, weight in spec])
+        return self._loot_tables[spec]
+
+    def _inventory(self, record):
+        """ Builds a character's items and weapon.  If the weapon is also
+            in the character's items, both are the same Item object.
+        """
+        items = [self.item(key) for key in record.get("items", ())]
+        weapon = None
+        if record.get("weapon") is not None:
+            keys = record.get("items", [])
+            if record["weapon"] in keys:
+                weapon = items[keys.index(record["weapon"])]
+            else:
+                weapon = self.item(record["weapon"])
+        return (items, weapon)
+
+    def _script(self, lines):
+        """ Returns lines as a tuple, the same tuple for every character
+            or room with the same script
+        """
+        script = tuple(lines)
+        return self._scripts.setdefault(script, script)
+
+    def character(self, key):
+        """ Input: character key (string)
+            Return: Character, Enemy or Friend object; the same one
+            every time it's asked for
+        """
+        character = self._characters.get(key)
+        if character is not None:
+            return character
+
+        record = self._record("character", key)
+        items, weapon = self._inventory(record)
+        cls = _CLASSES[record.get("class", "Character")]
+        arguments = [record["name"], self._text(record.get("description", "")),
+                     record["constitution"],
+                     weapon, record.get("attack_mod", 1.0), record.get("max_damage", 5), items]
+        if cls is Enemy:
+            arguments.append(record.get("weakness", "any"))
+        elif cls is Friend:
+            arguments.append(record.get("in_party", False))
+        character = cls(*arguments)
+        character._watchers = self._watchers
+        if "conversation" in record:
+            character.conversation = self._script(self._text(line)
+                                                  for line in record["conversation"])
+        if cls is Enemy and record.get("loot"):
+            character.loot = self._loot_table(record["loot"])
+
+        self._characters[key] = character
+        self._keys[id(character)] = key
+        return character
+
+    def room(self, key):
+        """ Input: room key (string)
+            Return: Room object; the same one every time it's asked for
+            Linked rooms are looked up lazily, when first used.
+        """
+        room = self._rooms.get(key)
+        if room is not None:
+            return room
+
+        record = self._record("room", key)
+        room = Room(record["name"], self._text(record.get("description", "")))
+        room._watchers = self._watchers
+        # Registered before building anything else, in case of cycles
+        self._rooms[key] = room
+        self._keys[id(room)] = key
+
+        if "search" in record:
+            room.search_gen = self._script(self._text(tuple(response))
+                                           for response in record["search"])
+        if record.get("item") is not None:
+            room.item = self.item(record["item"])
+        if record.get("characters"):
+            room.characters += [self.character(character) for character in
+                                record["characters"]]
+        room.linked_rooms = self._link_map(record.get("links", {}))
+        return room
+
+    def _link_map(self, links):
+        """ Returns the linked_rooms of a room being built """
+        return LinkMap(links, self.room)
+
+    def outline(self, key):
+        """ Input: room key (string)
+            Return: (name, links) of the room, links as a dict of
+            direction -> room key (or Room object), without building the
+            room if it hasn't been built
+        """
+        room = self._rooms.get(key)
+        if room is not None:
+            links = room.linked_rooms
+            return (room.name, {direction: links.key(direction) for direction in links})
+        record = self._record("room", key)
+        return (record["name"], record.get("links", {}))
+
+    def player(self, char_name, char_description):
+        """ Input: char_name (string), char_description (string)
+            Return: Player object with the world's starting stats/items
+        """
+        record = self._meta.get("player", {})
+        items, weapon = self._inventory(record)
+        return Player(char_name, char_description, record.get("constitution", 50), weapon,
+                      record.get("attack_mod", 1.0), record.get("max_damage", 5), items)
+
+    def close(self):
+        """ Input: none
+            Return: none
+            Closes the world file.  Rooms already built stay usable.
+        """
+        unregister_world(self._token)
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+        if self._strings is not None:
+            self._strings.close()
+
+
+###########################################################################
+####                Writing Worlds                                     ####
+###########################################################################
+
+
+def write_world(path, meta, items, characters, rooms):
+    """ Input: path (string), meta (dict), and dicts of key -> record
+        (dict) for items, characters and rooms, or iterables of
+        (key, record) tuples
+        Return: none
+        Writes a .world file that World() can read.
+    """
+    with open(path, "w", encoding="utf-8") as world_file:
+        write_records(world_file, "world", [("meta", meta)])
+        for kind, records in (("item", items), ("character", characters), ("room", rooms)):
+            write_records(world_file, kind, records)
+
+
+def write_records(world_file, kind, records):
+    """ Input: open text file, kind (string), dict or iterable of
+        (key, record) tuples
+        Return: none
+    """
+    if isinstance(records, dict):
+        records = records.items()
+    for key, record in records:
+        if "\t" in key or "\n" in key:
+            raise ValueError("World keys cannot contain tabs or newlines: {0!r}".format(key))
+        world_file.write("{0}\t{1}\t{2}\n".format(kind, key, json.dumps(record,
+                                                                        ensure_ascii=False)))
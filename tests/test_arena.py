@@ -0,0 +1,92 @@
+import unittest
+from math import sqrt
+from random import Random
+from statistics import mean, pvariance
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from rpgclasses import Character, Enemy, Item
+from rpgclasses.arena import ANY_WEAKNESS, NO_WEAKNESS, Arena
+from rpgclasses.simulate import WIN, Setup, run_fight
+
+
+FIGHTS = 1000
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class ArenaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.club = Item("simple club", "weapon", "a branch")
+
+    def ghoul(self, weakness):
+        """ An enemy that can never land a hit, so the player's attacks
+            are all that happen, in the arena as in run_fight()
+        """
+        return Enemy("Ghoul", "", 12, None, 0, 1, None, weakness)
+
+    def assertSameAttacks(self, player, enemy):
+        """ The number of attacks the player needs to win has the same
+            distribution in the arena and in run_fight()
+        """
+        setup = Setup([], [enemy], player)
+        rng = Random(3)
+        fought = []
+        for _ in range(FIGHTS):
+            outcome, turns, _ = run_fight(setup, rng)
+            self.assertEqual(outcome, WIN)
+            # The ghoul's turns come in between, and it may go first
+            fought.append((turns + 1) // 2)
+
+        rounds = []
+        for seed in range(FIGHTS):
+            arena = Arena("highest", seed)
+            arena.add_side([player])
+            arena.add_side([enemy])
+            self.assertEqual(arena.run(), 0)
+            rounds.append(arena.rounds)
+
+        # Four standard errors of the difference between the means
+        tolerance = 4 * sqrt((pvariance(fought) + pvariance(rounds)) / FIGHTS)
+        self.assertAlmostEqual(mean(rounds), mean(fought), delta=tolerance)
+
+    def test_no_weakness(self):
+        self.assertSameAttacks(Character("Ann", "", 10, None, 1.0, 4), self.ghoul(None))
+        self.assertSameAttacks(Character("Ann", "", 10, self.club, 1.0, 4), self.ghoul("none"))
+
+    def test_weakness(self):
+        self.assertSameAttacks(Character("Ann", "", 10, None, 1.0, 4), self.ghoul("any"))
+        self.assertSameAttacks(Character("Ann", "", 10, self.club, 1.0, 4),
+                               self.ghoul("simple club"))
+
+    def test_weakness_codes(self):
+        arena = Arena()
+        arena.add_side([Character("Ann", "", 10), Character("Bob", "", 10, self.club)])
+        arena.add_side([self.ghoul(None), self.ghoul("none"), self.ghoul("any"),
+                        self.ghoul("simple club")])
+        arena.round()
+        self.assertEqual(arena.weakness.tolist()[:4], [NO_WEAKNESS] * 4)
+        self.assertEqual(arena.weakness[4], ANY_WEAKNESS)
+        self.assertEqual(arena.weakness[5], arena.weapon[1])
+        self.assertNotIn(NO_WEAKNESS, arena.weapon.tolist())
+
+    def test_write_back(self):
+        player = Character("Ann", "", 10, None, 1.0, 4)
+        enemy = self.ghoul("any")
+        arena = Arena("random", 4)
+        arena.add_side([player])
+        arena.add_side([enemy])
+        self.assertEqual(arena.run(), 0)
+        arena.write_back()
+        self.assertEqual((player.constitution, enemy.constitution), (10, 0))
+        (_, hp, _, died), (_, enemy_hp, _, enemy_died) = arena.results()
+        self.assertEqual((hp, died, enemy_hp, enemy_died), (10, 0, 0, arena.rounds))
+        with self.assertRaises(RuntimeError):
+            arena.add_side([Character("Bob", "", 10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from math import sqrt
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from rpgclasses import Character, Enemy, Item
+from rpgclasses.batch import duel, duel_characters, duel_pairs, is_weak_to
+from rpgclasses.simulate import Combatant
+from rpgclasses.solver import solve_duel
+
+
+DUELS = 200000
+
+
+class WeaknessTest(unittest.TestCase):
+
+    def test_is_weak_to(self):
+        club = Item("simple club", "weapon", "a branch")
+        player = Character("Ann", "hero", 10, club)
+        self.assertTrue(is_weak_to(Enemy("Jack", "", 8, weakness="simple club"), player))
+        self.assertTrue(is_weak_to(Enemy("Jack", "", 8), Character("Bob", "", 10)))
+        self.assertFalse(is_weak_to(Enemy("Jack", "", 8, weakness="none"), player))
+        self.assertFalse(is_weak_to(Enemy("Jack", "", 8, weakness=None), Character("Bob", "", 10)))
+        self.assertFalse(is_weak_to(player, Enemy("Jack", "", 8)))
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class DuelTest(unittest.TestCase):
+
+    def test_matches_solver(self):
+        for weakness in ("none", "any"):
+            odds = solve_duel(Combatant("Player", 12, 1.0, 4, "club"),
+                              Combatant("Ghoul", 12, .75, 5, "fists", weakness))
+            result = duel(12, 1.0, 4, False, 12, .75, 5, weakness == "any", DUELS, rng=5)
+            # Four standard errors of the sampled win rate
+            tolerance = 4 * sqrt(odds.win * odds.loss / DUELS)
+            self.assertAlmostEqual(result.win_rate, odds.win, delta=tolerance)
+            self.assertAlmostEqual(float(result.turns.mean()), odds.expected_turns,
+                                   delta=odds.expected_turns * .01)
+
+    def test_no_one_can_hit(self):
+        with self.assertRaises(ValueError):
+            duel(10, 0, 4, False, 10, .05, 4, False, 10)
+        # One duel in the batch is enough
+        with self.assertRaises(ValueError):
+            duel([10, 10], [1.0, 0], 4, False, 10, 0, 4, False)
+        # If only one side can hit, it always wins
+        result = duel(10, 0, 4, False, 10, 1.0, 4, False, 1000, rng=1)
+        self.assertTrue(bool((result.winner == 1).all()))
+        self.assertTrue(bool((result.hp_a == 0).all()))
+
+    def test_characters(self):
+        club = Item("simple club", "weapon", "a branch")
+        player = Character("Ann", "hero", 12, club, 1.0, 4)
+        jack = Enemy("Jack", "smelly zombie", 8, None, .75, 3, None, "simple club")
+        result = duel_characters(player, jack, 1000, rng=2)
+        self.assertEqual(len(result), 1000)
+        self.assertEqual(sum(result.turn_counts().values()), 1000)
+        self.assertEqual((player.constitution, jack.constitution), (12, 8))
+
+        result = duel_pairs([(player, jack), (jack, player), (player, player)], rng=3)
+        self.assertEqual(len(result), 3)
+        self.assertTrue(bool((result.winner >= 0).all()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import io
+import unittest
+from unittest import mock
+
+from rpgclasses import Character, Enemy, Item
+
+
+class EnemyTest(unittest.TestCase):
+
+    def test_no_weakness(self):
+        enemy = Enemy("Protector", "cleric of the old religion", 25, None, 1.0, 6, None, None)
+        self.assertIsNone(enemy.weakness)
+        club = Item("simple club", "weapon", "a branch")
+        # Hits never get a weakness bonus
+        with mock.patch.object(Enemy, "roll_dice", return_value=1):
+            enemy.defend(19.5, 3, club, io.StringIO())
+        self.assertEqual(enemy.constitution, 22)
+        enemy.weakness = "simple club"
+        enemy.weakness = None
+        self.assertIsNone(enemy.weakness)
+
+
+class InventoryTest(unittest.TestCase):
+
+    def test_item_names_lists_every_item(self):
+        flasks = [Item("wine flask", "food", "soured") for _ in range(2)]
+        bow = Item("hunter's bow", "weapon", "a standard hunting bow")
+        character = Character("Ann", "hero", 10, items=[flasks[0], bow, flasks[1]])
+        self.assertEqual(sorted(character.item_names), ["hunter's bow", "wine flask",
+                                                        "wine flask"])
+        self.assertEqual(sorted(character.items.names()), ["hunter's bow", "wine flask"])
+        self.assertEqual(character.items.count("wine flask"), 2)
+        character.items.remove(flasks[0])
+        self.assertEqual(sorted(character.item_names), ["hunter's bow", "wine flask"])
+        self.assertEqual(Character("Bob", "", 10).item_names, [])
+
+    def test_adding_twice_keeps_one(self):
+        flask = Item("wine flask", "food", "soured")
+        character = Character("Ann", "hero", 10, items=[flask])
+        character.items += [flask]
+        character.items.add(flask)
+        self.assertEqual(character.items.count("wine flask"), 1)
+        self.assertEqual(character.items.labels(), ["wine flask"])
+        # An equal Item is a second flask
+        character.items += [Item("wine flask", "food", "soured")]
+        self.assertEqual(character.items.labels(), ["wine flask (x2)"])
+
+    def test_steal_from_no_one(self):
+        jack = Enemy("Jack", "", 8)
+        self.assertIsNone(jack.steal(20)[0])
+        # Looking doesn't give Jack an inventory
+        self.assertIsNone(jack._items)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from rpgclasses import Character, TargetIndex
+from rpgclasses.targeting import select
+
+
+class TargetIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.characters = [Character(name, "", constitution, None, attack_mod, max_damage)
+                           for name, constitution, attack_mod, max_damage in
+                           (("a", 8, 1.0, 3), ("b", 12, .75, 5), ("c", 12, 1.25, 4),
+                            ("d", 3, 1.0, 6))]
+        self.a, self.b, self.c, self.d = self.characters
+        self.index = TargetIndex(self.characters)
+
+    def test_positions(self):
+        self.assertIs(self.index[0], self.a)
+        self.assertIs(self.index[-1], self.d)
+        self.assertIs(self.index[2], self.c)
+        self.assertEqual(self.index[1:3], [self.b, self.c])
+        with self.assertRaises(IndexError):
+            self.index[4]
+        self.index.remove(self.a)
+        self.assertIs(self.index[0], self.b)
+        self.assertEqual(list(self.index), [self.b, self.c, self.d])
+
+    def test_policies_match_a_scan(self):
+        for policy in ("highest", "lowest", "threat"):
+            self.assertIs(self.index.select(policy), select(self.characters, policy))
+        self.assertIs(self.index.select("highest"), self.b)
+        self.assertIs(self.index.select("lowest"), self.d)
+        self.assertIs(self.index.select("threat"), self.d)
+
+    def test_update_and_remove(self):
+        self.assertIs(self.index.select("highest"), self.b)
+        self.b.constitution = 2
+        self.index.update(self.b)
+        self.assertIs(self.index.select("highest"), self.c)
+        self.index.remove(self.c)
+        self.assertIs(self.index.select("highest"), self.a)
+        self.assertIn(self.index.select("random"), [self.a, self.b, self.d])
+
+    def test_attack_with_a_list(self):
+        attacker = Character("e", "", 10)
+        attacker.targeting = "lowest"
+        self.assertIs(attacker.attack(self.characters)[0], self.d)
+        attacker.targeting = "highest"
+        self.assertIs(attacker.attack(self.characters)[0], self.b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from rpgclasses.commands import AmbiguousCommand, CommandRegistry
+
+
+class CommandRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.commands = CommandRegistry()
+        for name in ("north", "inspect", "gift", "goto", "steal", "search", "save"):
+            self.commands.add(name, lambda arguments, name=name: (name, arguments))
+        self.commands.alias("n", "north")
+
+    def test_unambiguous_prefix(self):
+        self.assertEqual(self.commands.resolve("insp").name, "inspect")
+        self.assertEqual(self.commands.resolve("gi").name, "gift")
+        self.assertEqual(self.commands.resolve("st").name, "steal")
+
+    def test_exact_name_and_alias(self):
+        self.assertEqual(self.commands.resolve("save").name, "save")
+        self.assertEqual(self.commands.resolve("N").name, "north")
+
+    def test_ambiguous_prefix(self):
+        with self.assertRaises(AmbiguousCommand) as raised:
+            self.commands.resolve("g")
+        self.assertEqual(raised.exception.candidates, ["gift", "goto"])
+        with self.assertRaises(AmbiguousCommand):
+            self.commands.resolve("s")
+
+    def test_unknown(self):
+        self.assertIsNone(self.commands.resolve("dance"))
+        self.assertIsNone(self.commands.resolve("inspector"))
+
+    def test_alias_is_removed_cleanly(self):
+        self.commands.alias("se", "search")
+        self.assertEqual(self.commands.resolve("se").name, "search")
+        self.commands.alias("se", "steal")
+        self.assertEqual(self.commands.resolve("se").name, "steal")
+        # "sea" still only leads to search
+        self.assertEqual(self.commands.resolve("sea").name, "search")
+        self.assertEqual(self.commands.aliases, {"n": "north", "se": "steal"})
+
+    def test_parse_and_dispatch(self):
+        self.assertEqual(self.commands.dispatch("insp with hunter's bow"),
+                         ("inspect", "hunter's bow"))
+        command, arguments = self.commands.parse("goto  kitchen ")
+        self.assertEqual((command.name, arguments), ("goto", "kitchen"))
+
+    def test_registration_errors(self):
+        with self.assertRaises(ValueError):
+            self.commands.add("North")
+        with self.assertRaises(KeyError):
+            self.commands.alias("d", "dance")
+        with self.assertRaises(ValueError):
+            self.commands.alias("save", "search")
+        with self.assertRaises(KeyError):
+            self.commands.dispatch("dance")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses.generator import generate
+
+
+class GeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "big.world")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def count_characters(self, npc_density):
+        generate(self.path, 4000, 3, npc_density=npc_density, workers=1).close()
+        with open(self.path, encoding="utf-8") as world_file:
+            return sum(line.startswith("character\t") for line in world_file)
+
+    def test_npc_density_is_characters_per_room(self):
+        for npc_density in (.2, .5, 2.0):
+            self.assertAlmostEqual(self.count_characters(npc_density) / 4000, npc_density,
+                                   delta=.05 * npc_density + .02)
+        with self.assertRaises(ValueError):
+            generate(self.path, 10, npc_density=5)
+
+    def test_same_seed_same_manor(self):
+        generate(self.path, 500, 9, workers=1).close()
+        with open(self.path, "rb") as world_file:
+            first = world_file.read()
+        generate(self.path, 500, 9, workers=1).close()
+        with open(self.path, "rb") as world_file:
+            self.assertEqual(world_file.read(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import gc
+import unittest
+
+from rpgclasses import Item
+from rpgclasses.item import (_by_fields, _name_ids, define_prototype, name_id, prototype,
+                             prototype_by_id)
+
+
+class PrototypeTest(unittest.TestCase):
+
+    def test_shared(self):
+        flasks = [Item("wine flask", "food", "soured") for _ in range(3)]
+        self.assertIs(flasks[0].prototype, flasks[2].prototype)
+        self.assertIs(prototype_by_id(flasks[1].prototype_id), flasks[0].prototype)
+        flasks[1].name = "empty flask"
+        self.assertEqual(flasks[1].overrides, {"name": "empty flask"})
+        self.assertEqual(flasks[0].name, "wine flask")
+        flasks[1].name = "wine flask"
+        self.assertEqual(flasks[1].overrides, {})
+
+    def test_unused_are_dropped(self):
+        item = Item("cracked urn", "junk", "It rattles.")
+        prototype_id = item.prototype_id
+        urn = name_id("cracked urn")
+        self.assertIs(item.name_id, urn)
+        del item, urn
+        gc.collect()
+        self.assertNotIn(("cracked urn", "junk", "It rattles."), _by_fields)
+        self.assertNotIn("cracked urn", _name_ids)
+        with self.assertRaises(KeyError):
+            prototype_by_id(prototype_id)
+        # A new one is never given an old prototype id
+        self.assertNotEqual(Item("cracked urn", "junk", "It rattles.").prototype_id,
+                            prototype_id)
+
+    def test_defined_are_kept(self):
+        defined = define_prototype("test chalice", "chalice", "treasure", "Gold, or near enough.")
+        chalice = defined.create(description="Dented.")
+        del defined
+        gc.collect()
+        self.assertIs(prototype("test chalice"), chalice.prototype)
+        self.assertEqual(chalice.description, "Dented.")
+        with self.assertRaises(ValueError):
+            define_prototype("test chalice", "chalice", "treasure")
+
+    def test_name_ids(self):
+        club = Item("simple club", "weapon", "a branch")
+        other = Item("simple club", "weapon", "a sturdier branch")
+        self.assertIs(club.name_id, other.name_id)
+        self.assertIs(club.name_id, name_id("simple club"))
+        self.assertIsNot(club.name_id, name_id("hunter's bow"))
+        club.name = "hunter's bow"
+        self.assertIs(club.name_id, name_id("hunter's bow"))
+        self.assertIsNone(name_id(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import unittest
+
+from rpgclasses import Enemy, Item
+from rpgclasses.loot import LootTable, drop_loot
+from rpgclasses.world import WORLDS_DIR, World
+
+
+class LootTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gold = Item("sack of gold", "currency", "It's money.")
+        self.club = Item("simple club", "weapon", "a branch")
+        self.flask = Item("wine flask", "food", "soured")
+        self.table = LootTable([(None, 3), (self.gold, 2), (self.flask, 1)])
+        self.jack = Enemy("Jack", "smelly zombie", 8, None, .75, 3, [self.gold, self.club])
+        self.jack.loot = self.table
+
+    def test_steal_takes_what_enemy_carries(self):
+        item, message = self.jack.steal(20)
+        # The club isn't in the table, so the gold is always chosen
+        self.assertIs(item, self.gold)
+        self.assertEqual(self.jack.item_names, ["simple club"])
+
+        self.jack.theft_victim = False
+        self.assertIs(self.jack.steal(20)[0], self.club)
+        self.jack.theft_victim = False
+        self.assertEqual(self.jack.steal(20), (None, "Jack has nothing to steal."))
+
+    def test_pick(self):
+        for _ in range(50):
+            self.assertIs(self.table.pick([self.club, self.gold]), self.gold)
+        self.assertIs(self.table.pick([self.club]), self.club)
+
+    def test_drop_loot(self):
+        drops = drop_loot([self.jack], rng=1)
+        self.assertLessEqual(len(drops), 1)
+        self.assertEqual(self.jack.item_names, ["sack of gold", "simple club"])
+
+        drops = drop_loot([Enemy("Jack2", "", 8, items=[self.club])], carried=True)
+        self.assertEqual(drops, [self.club])
+
+    def test_steal_picker_kept_until_items_change(self):
+        picker = self.jack._steal_picker()
+        self.assertIs(self.jack._steal_picker(), picker)
+        self.jack.items += [Item("wine flask", "food", "soured")]
+        self.assertIsNot(self.jack._steal_picker(), picker)
+        picker = self.jack._steal_picker()
+        self.assertIs(self.jack._steal_picker(), picker)
+        self.jack.loot = LootTable([(self.club, 1)])
+        self.assertIsNot(self.jack._steal_picker(), picker)
+        self.assertIs(self.jack.steal(20)[0], self.club)
+
+    def test_roll_many(self):
+        drops = self.table.roll_many(600, rng=3)
+        self.assertEqual(len(set(map(id, drops))), len(drops))
+        counts = self.table.counts(600, rng=3)
+        self.assertEqual(sum(item.prototype is self.gold.prototype for item in drops), counts[1])
+        self.assertEqual(sum(item.name == "wine flask" for item in drops), counts[2])
+        self.assertEqual(drops[0].description, "It's money.")
+
+    def test_manor_loot(self):
+        world = World(os.path.join(WORLDS_DIR, "manor.world"))
+        self.addCleanup(world.close)
+        jack2 = world.character("jack2")
+        self.assertEqual([weight for _, weight in jack2.loot.entries], [3, 2, 1])
+        self.assertEqual(jack2.steal(20), (None, "Jack2 has nothing to steal."))
+
+    def test_counts(self):
+        counts = self.table.counts(60000, rng=2)
+        for count, expected in zip(counts, (30000, 20000, 10000)):
+            self.assertAlmostEqual(count, expected, delta=600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses.dirty import track, untrack
+from rpgclasses.strings import TextRef, compile_strings
+from rpgclasses.world import WORLDS_DIR, World
+
+
+class PickleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World(os.path.join(WORLDS_DIR, "manor.world"))
+        self.addCleanup(self.world.close)
+
+    def test_room(self):
+        hall = self.world.room("dining_hall")
+        kitchen = hall.linked_rooms["north"]
+        data = pickle.dumps(hall)
+        loaded = pickle.loads(data)
+        self.assertEqual(str(loaded), str(hall))
+        self.assertEqual(loaded.linked_rooms["north"].item.name, kitchen.item.name)
+        # A room not built when pickled is built by the world, still open
+        self.assertIs(loaded.linked_rooms["west"], self.world.room("ballroom"))
+        self.assertEqual([character.name for character in loaded.characters],
+                         ["Jack", "Jack2"])
+
+        # Characters are back in the loaded room, which no world watches
+        jack = loaded.characters.enemies[0]
+        self.assertIs(jack._location, loaded.characters)
+        self.assertIsNone(loaded._watchers)
+        changed = track(self.world.watchers)
+        loaded.name = "Mess Hall"
+        jack.name = "Jacques"
+        untrack(changed)
+        self.assertEqual(changed, set())
+        self.assertIn("Jacques", loaded.characters.describe("enemies"))
+
+    def test_room_after_world_closed(self):
+        data = pickle.dumps(self.world.room("dining_hall"))
+        self.world.close()
+        loaded = pickle.loads(data)
+        with self.assertRaises(KeyError):
+            loaded.linked_rooms["west"]
+        other = World(os.path.join(WORLDS_DIR, "manor.world"))
+        self.addCleanup(other.close)
+        loaded.linked_rooms.resolve = other.room
+        self.assertIn("The Ballroom is west.", str(loaded))
+
+    def test_character_and_conversation(self):
+        jill = self.world.character("jill")
+        next(jill.conversation)
+        loaded = pickle.loads(pickle.dumps(jill))
+        self.assertIsNone(loaded._location)
+        self.assertEqual(loaded.item_names, jill.item_names)
+        self.assertIs(loaded.items[0].prototype, jill.items[0].prototype)
+        self.assertEqual(next(loaded.conversation), next(jill.conversation))
+
+        # The cursor holds the speaker's name, so it pickles on its own
+        cursor = pickle.loads(pickle.dumps(jill.conversation))
+        self.assertEqual(cursor.position, 2)
+        self.assertEqual(next(cursor), "[Jill]: " + cursor.lines[2])
+        jill.name = "Jillian"
+        self.assertEqual(next(jill.conversation), "[Jillian]: " + cursor.lines[2])
+
+    def test_string_table_text(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "manor.world")
+        shutil.copy(os.path.join(WORLDS_DIR, "manor.world"), path)
+        compile_strings(path)
+        world = World(path)
+        self.addCleanup(world.close)
+        kitchen = world.room("kitchen")
+        loaded = pickle.loads(pickle.dumps(kitchen))
+        self.assertIsInstance(loaded._description, TextRef)
+        self.assertEqual(loaded.description, kitchen.description)
+        self.assertEqual(next(loaded.search_gen), next(kitchen.search_gen))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses import Enemy, Friend, Room
+from rpgclasses.strings import TextRef, compile_strings
+from rpgclasses.world import WORLDS_DIR, World
+
+
+class TransferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hall, self.yard, self.gate = [Room(name, "") for name in ("Hall", "Yard", "Gate")]
+        self.jill = Friend("Jill", "", 10, in_party=True)
+        self.bob = Friend("Bob", "", 10)
+        self.jack = Enemy("Jack", "", 8)
+        self.hall.characters += [self.jill, self.bob, self.jack]
+
+    def assertInRoom(self, character, room):
+        self.assertIn(character, room.characters)
+        self.assertIs(character._location, room.characters)
+
+    def test_transfer(self):
+        self.hall.transfer([self.jill, self.jack], self.yard)
+        self.assertEqual(list(self.hall.characters), [self.bob])
+        self.assertEqual(self.yard.characters.party, [self.jill])
+        self.assertEqual(self.yard.characters.enemies, [self.jack])
+        self.assertInRoom(self.jack, self.yard)
+
+    def test_not_in_room(self):
+        self.hall.transfer([self.jill], self.yard)
+        with self.assertRaises(ValueError):
+            self.hall.transfer([self.bob, self.jill], self.gate)
+        # No one moved
+        self.assertInRoom(self.bob, self.hall)
+        self.assertInRoom(self.jill, self.yard)
+        self.assertEqual(len(self.gate.characters), 0)
+
+    def test_transfer_many(self):
+        Room.transfer_many([(self.hall, [self.jill, self.bob], self.yard),
+                            (self.yard, [self.jill], self.gate),
+                            (self.hall, [self.jack], self.gate)])
+        self.assertInRoom(self.bob, self.yard)
+        self.assertEqual(list(self.gate.characters), [self.jill, self.jack])
+        self.assertEqual(len(self.hall.characters), 0)
+
+    def test_transfer_many_checks_first(self):
+        with self.assertRaises(ValueError):
+            Room.transfer_many([(self.hall, [self.jill], self.yard),
+                                (self.hall, [self.jill], self.gate)])
+        self.assertInRoom(self.jill, self.hall)
+        self.assertEqual(len(self.yard.characters), 0)
+
+    def test_text_redrawn(self):
+        self.assertEqual(self.hall.characters.describe("neutral"), "Bob ()")
+        self.yard.characters += [Friend("Ann", "", 10)]
+        self.assertEqual(self.yard.characters.describe("neutral"), "Ann ()")
+        self.hall.transfer([self.bob], self.yard)
+        self.assertEqual(self.hall.characters.describe("neutral"), "")
+        self.assertEqual(self.yard.characters.describe("neutral"), "Ann (), Bob ()")
+
+
+class TextTest(unittest.TestCase):
+
+    def test_rename_redraws_neighbours(self):
+        hall, yard, gate = [Room(name, "") for name in ("Hall", "Yard", "Gate")]
+        hall.link_room(yard, "north")
+        gate.link_room(Room("Road", ""), "south")
+        for room in (hall, gate):
+            str(room)
+        kept = gate._text
+        yard.name = "Garden"
+        self.assertIn("The Garden is north.", str(hall))
+        # The gate doesn't show the yard, so its text is still kept
+        self.assertIs(gate._text, kept)
+        str(gate)
+        self.assertIs(gate._text, kept)
+
+    def test_string_table_text_kept(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "manor.world")
+        shutil.copy(os.path.join(WORLDS_DIR, "manor.world"), path)
+        compile_strings(path)
+        world = World(path)
+        self.addCleanup(world.close)
+        kitchen = world.room("kitchen")
+        shown = str(kitchen)
+        self.assertIn(kitchen.description, shown)
+        # The description stays in the string table, not in the kept text
+        self.assertIn(kitchen._description, kitchen._text)
+        self.assertIsInstance(kitchen._description, TextRef)
+        self.assertEqual(str(kitchen), shown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses import GameSession, Room, Router
+from rpgclasses.clock import InstantClock
+from rpgclasses.generator import generate
+from rpgclasses.world import World
+
+
+def corridor(names):
+    """ Rooms linked east and west in a line """
+    rooms = [Room(name, "") for name in names]
+    for west, east in zip(rooms, rooms[1:]):
+        west.link_room(east, "east")
+        east.link_room(west, "west")
+    return rooms
+
+
+class RouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c, self.d = corridor(["A", "B", "C", "D"])
+        self.router = Router([self.a])
+
+    def tearDown(self):
+        self.router.close()
+
+    def test_only_visited_rooms(self):
+        self.assertIsNone(self.router.find("c"))
+        self.router.visit(self.b)
+        self.router.visit(self.c)
+        self.assertIs(self.router.find("c"), self.c)
+        self.assertEqual(self.router.route(self.a, self.c), ["east", "east"])
+        # D was never visited, so there's no way through it
+        self.assertIsNone(self.router.find("D"))
+        self.assertEqual(len(self.router), 3)
+
+    def test_route_needs_known_rooms_between(self):
+        self.router.visit(self.c)
+        self.assertIsNone(self.router.route(self.a, self.c))
+        self.router.visit(self.b)
+        self.assertEqual(self.router.distance(self.c, self.a), 2)
+
+    def test_new_link(self):
+        for room in (self.b, self.c, self.d):
+            self.router.visit(room)
+        self.assertEqual(self.router.route(self.a, self.d), ["east"] * 3)
+        self.a.link_room(self.d, "north")
+        self.assertEqual(self.router.route(self.a, self.d), ["north"])
+        # Links into rooms not yet read are picked up when they are
+        secret = Room("Secret", "")
+        self.d.link_room(secret, "down")
+        self.router.visit(secret)
+        self.assertEqual(self.router.route(self.a, secret), ["north", "down"])
+
+    def test_visit_keeps_routes(self):
+        self.router.visit(self.b)
+        self.assertEqual(self.router.route(self.a, self.b), ["east"])
+        kept = self.router._trees[self.router._ids[self.b]]
+
+        # A room that doesn't lead to B leaves the route to B alone
+        closet = Room("Closet", "")
+        self.a.link_room(closet, "north")
+        self.router.visit(closet)
+        self.assertIsNone(self.router.route(closet, self.b))
+        self.assertIs(self.router._trees[self.router._ids[self.b]], kept)
+
+        # C leads to B, so it's added to the route without a new search
+        self.router.visit(self.c)
+        self.assertEqual(self.router.route(self.c, self.b), ["west"])
+        self.assertIs(self.router._trees[self.router._ids[self.b]], kept)
+
+    def test_visit_shortens_route(self):
+        for room in (self.b, self.c, self.d):
+            self.router.visit(room)
+        self.assertEqual(self.router.route(self.a, self.d), ["east"] * 3)
+        tunnel = Room("Tunnel", "")
+        self.a.link_room(tunnel, "down")
+        tunnel.link_room(self.d, "up")
+        self.router.visit(tunnel)
+        self.assertEqual(self.router.route(self.a, self.d), ["down", "up"])
+        self.assertEqual(self.router.route(self.b, self.d), ["east", "east"])
+
+    def test_renamed(self):
+        self.router.visit(self.b)
+        self.assertIs(self.router.find("b"), self.b)
+        self.b.name = "Hall"
+        self.router.visit(self.b)
+        self.assertIsNone(self.router.find("b"))
+        self.assertIs(self.router.find("hall"), self.b)
+
+
+class LazyWorldTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        generate(os.path.join(self.directory, "big.world"), 5000, 1, workers=1).close()
+        self.world = World(os.path.join(self.directory, "big.world"))
+
+    def tearDown(self):
+        self.world.close()
+        shutil.rmtree(self.directory)
+
+    def test_session_only_builds_rooms_seen(self):
+        session = GameSession(self.world, player_name="Ann", player_description="hero",
+                              clock=InstantClock())
+        session.start()
+        for line in ("", "", ""):
+            session.step(line)
+        # The start room and the rooms it shows the names of
+        self.assertLess(self.world.rooms_loaded, 6)
+        self.assertEqual(session.router.visited, ["r0"])
+
+        session.step("east")
+        session.step("")
+        self.assertEqual(session.router.visited, ["r0", "r1"])
+        self.assertIn("You don't know the way there.", session.step("goto " + self.world.room(
+            "r2").name))
+        session.step("")
+        session.step("goto " + self.world.room("r0").name)
+        self.assertIs(session.current_room, self.world.room("r0"))
+        self.assertLess(self.world.rooms_loaded, 10)
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
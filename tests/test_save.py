@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses import GameSession
+from rpgclasses.clock import InstantClock
+from rpgclasses.save import Journal, SavedWorld, save_game
+
+
+# From the game's first screen to the kitchen's command prompt
+INTRODUCTION = ("", "", "")
+
+
+def play(session, *lines):
+    """ Sends each line to session; returns everything it printed """
+    return "".join(session.step(line) for line in lines)
+
+
+def new_session(**kwargs):
+    session = GameSession(player_name="Ann", player_description="hero", clock=InstantClock(),
+                          **kwargs)
+    session.start()
+    play(session, *INTRODUCTION)
+    return session
+
+
+class SaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "manor.save")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertPickedUp(self, session):
+        """ The letter was found in the kitchen, then the player went
+            south
+        """
+        self.assertEqual(session.player.name, "Ann")
+        self.assertIn("Cook's letter", session.player.item_names)
+        self.assertEqual(session.current_room.name, "Dining Hall")
+        self.assertEqual(session.previous_command, "south")
+        kitchen = session.world.room("kitchen")
+        self.assertIsNone(kitchen.item)
+        self.assertEqual(next(kitchen.search_gen)[0], "You find nothing new.")
+
+    def test_save_and_load(self):
+        session = new_session()
+        play(session, "search", "", "search", "", "south")
+        session.save(self.path)
+        session.close()
+
+        loaded = GameSession.load(self.path, clock=InstantClock())
+        self.assertIn("Dining Hall", loaded.start())
+        self.assertPickedUp(loaded)
+        # Rooms the player never saw still come from the .world
+        self.assertEqual(loaded.world.room("ballroom").name, "Ballroom")
+        loaded.close()
+
+    def test_journal(self):
+        session = new_session(autosave=self.path)
+        play(session, "search", "", "search", "", "south", "")
+        self.assertEqual(session._journal.entries, 2)
+        session.close()
+
+        world = SavedWorld(self.path)
+        self.assertEqual(world._journal_entries, 2)
+        world.close()
+        loaded = GameSession.load(self.path, clock=InstantClock(), autosave=True)
+        loaded.start()
+        self.assertPickedUp(loaded)
+
+        # Carrying on appends to the same journal
+        play(loaded, "north", "")
+        self.assertEqual(loaded._journal.entries, 3)
+        loaded.close()
+        loaded = GameSession.load(self.path, clock=InstantClock())
+        self.assertEqual(loaded.current_room.name, "Kitchen")
+        loaded.close()
+
+    def test_entry_cut_short(self):
+        session = new_session(autosave=self.path)
+        play(session, "search", "", "search", "", "south", "")
+        session.close()
+        # As if the game crashed while writing the last autosave
+        with open(self.path + ".journal", "r+b") as journal_file:
+            journal_file.truncate(os.path.getsize(self.path + ".journal") - 3)
+
+        world = SavedWorld(self.path)
+        self.assertEqual(world._journal_entries, 1)
+        self.assertEqual(world.start.name, "Kitchen")
+        world.close()
+
+    def test_compact(self):
+        session = new_session()
+        journal = Journal(self.path, session.world, compact_every=2)
+        entries = []
+        for _ in range(4):
+            journal.autosave(session.player, session.current_room)
+            entries.append(journal.entries)
+        # The first autosave and every third one after it write a full save
+        self.assertEqual(entries, [0, 1, 2, 0])
+        journal.close()
+        session.close()
+
+        # Saving over it leaves no journal to play back
+        world = SavedWorld(self.path)
+        save_game(self.path, world, world.saved_player, world.start)
+        self.assertFalse(os.path.exists(self.path + ".journal"))
+        world.close()
+
+    def test_rooms_load_as_needed(self):
+        session = new_session()
+        play(session, "search", "", "search", "", "south")
+        session.save(self.path)
+        session.close()
+
+        world = SavedWorld(self.path)
+        self.assertEqual(world.rooms_loaded, 0)
+        self.assertEqual(world.start.name, "Dining Hall")
+        self.assertEqual(world.rooms_loaded, 1)
+        world.close()
+
+    def test_save_again(self):
+        session = new_session()
+        play(session, "search", "", "search", "", "south")
+        session.save(self.path)
+        session.close()
+
+        # The kitchen is never built from this save, so its record is
+        # copied into the next one as it is
+        world = SavedWorld(self.path)
+        other = os.path.join(self.directory, "other.save")
+        save_game(other, world, world.saved_player, world.start, world.state)
+        self.assertNotIn("kitchen", world.built()[0])
+        world.close()
+        loaded = GameSession.load(other, clock=InstantClock())
+        loaded.start()
+        self.assertPickedUp(loaded)
+        loaded.close()
+
+    def test_not_a_save(self):
+        with open(self.path, "wb") as save_file:
+            save_file.write(b"not a save" * 10)
+        with self.assertRaises(ValueError):
+            SavedWorld(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
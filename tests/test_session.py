@@ -0,0 +1,109 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+from rpgclasses import GameSession
+from rpgclasses.clock import Clock, InstantClock
+
+
+def new_session(**kwargs):
+    """ A session at the kitchen's command prompt """
+    session = GameSession(player_name="Ann", player_description="hero", clock=InstantClock(),
+                          **kwargs)
+    session.start()
+    for line in ("", "", ""):
+        session.step(line)
+    return session
+
+
+class SessionTest(unittest.TestCase):
+
+    def test_output_stays_with_its_session(self):
+        sessions = [new_session() for _ in range(4)]
+        outputs = [[] for _ in sessions]
+
+        def play(session, output, command):
+            for _ in range(200):
+                output.append(session.step(command))
+                output.append(session.step(""))
+
+        # Even numbered sessions walk into a wall, odd ones talk to
+        # themselves
+        threads = [threading.Thread(target=play, args=(session, output,
+                                                       ("west", "talk")[number % 2]))
+                   for number, (session, output) in enumerate(zip(sessions, outputs))]
+        screen = io.StringIO()
+        with redirect_stdout(screen):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(screen.getvalue(), "")
+        for number, output in enumerate(outputs):
+            walls = "".join(output).count("You can't go that way.")
+            self.assertEqual(walls, 200 if number % 2 == 0 else 0)
+
+    def test_tracking_is_per_session(self):
+        directory = tempfile.mkdtemp()
+        try:
+            saving = new_session(autosave=os.path.join(directory, "manor.save"))
+            other = new_session()
+            other.step("search")
+            kitchen = other.world.room("kitchen")
+            self.assertNotIn(kitchen, saving._journal._changed)
+            saving.world.room("kitchen").item = None
+            self.assertIn(saving.world.room("kitchen"), saving._journal._changed)
+
+            # Each router only hears of links in its own world
+            self.assertEqual(other.world.watchers.links, [other.router._linked])
+            other.world.room("ballroom").link_room(kitchen, "north")
+            self.assertIn(kitchen, other.world.room("ballroom").linked_rooms.values())
+            saving.close()
+            other.close()
+            self.assertEqual(saving.world.watchers.changed, [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_arguments_keep_their_case(self):
+        directory = tempfile.mkdtemp()
+        try:
+            session = new_session()
+            path = os.path.join(directory, "MyGame.save")
+            self.assertIn("Game saved to " + path, session.step("SAVE " + path))
+            self.assertEqual(os.listdir(directory), ["MyGame.save"])
+            session.step("")
+            # Names are still matched whatever their case
+            self.assertIn("a standard hunting bow", session.step("inspect Hunter's Bow"))
+            session.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_astream_with_a_blocking_clock(self):
+        ticks = []
+
+        class SlowClock(Clock):
+            def sleep(self, seconds):
+                # Times out if the event loop is stuck waiting on this sleep
+                asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result(timeout=5)
+                ticks.append(seconds)
+
+        async def play():
+            nonlocal loop
+            loop = asyncio.get_running_loop()
+            session = GameSession(player_name="Ann", player_description="hero",
+                                  clock=SlowClock(1000.0))
+            return [await session.astep(line) for line in (None, "", "", "", "quit")]
+
+        loop = None
+        self.assertIn("Thanks for playing!", asyncio.run(play())[-1])
+        self.assertEqual(ticks, [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from random import Random
+
+from rpgclasses import Character, Enemy, Item
+from rpgclasses.simulate import (FLED, LOSS, WIN, Combatant, Setup, main, run_fight,
+                                 simulate)
+
+
+class SimulateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Combatant("Player", 20, 1.0, 5, "club")
+        self.enemies = [Combatant("Jack", 8, .75, 3, "fists", "club"),
+                        Combatant("Jack2", 9, 1.0, 4, "fists", "none")]
+
+    def test_report(self):
+        report = simulate([], self.enemies, self.player, 3000, workers=1, seed=3)
+        self.assertEqual(report.fights, 3000)
+        self.assertEqual(sum(report.turns.values()), 3000)
+        self.assertEqual(report.outcomes[WIN] + report.outcomes[LOSS], 3000)
+        # Whoever wins, someone is left standing after every fight
+        self.assertEqual(report.survived[0], report.outcomes[WIN])
+        self.assertLessEqual(report.survivor_hp[0], 20 * report.survived[0])
+        self.assertIn("Win rate", str(report))
+
+    def test_seed_and_workers(self):
+        first = simulate([], self.enemies, self.player, 4000, workers=1, seed=11,
+                         batch_size=1000)
+        second = simulate([], self.enemies, self.player, 4000, workers=2, seed=11,
+                          batch_size=1000)
+        self.assertEqual(first.outcomes, second.outcomes)
+        self.assertEqual(first.turns, second.turns)
+        self.assertEqual(first.survivor_hp, second.survivor_hp)
+
+    def test_characters_are_not_changed(self):
+        club = Item("simple club", "weapon", "a branch")
+        player = Character("Ann", "hero", 20, club)
+        jack = Enemy("Jack", "smelly zombie", 8, None, .75, 3, None, "simple club")
+        report = simulate([], [jack], player, 500, workers=1, seed=1)
+        self.assertEqual(report.fights, 500)
+        self.assertEqual((player.constitution, jack.constitution), (20, 8))
+
+    def test_weakness(self):
+        setup = Setup([], self.enemies, self.player)
+        # Jack is weak to the player's club, Jack2 to nothing
+        self.assertEqual(setup.bonus[0], [0, 1, 0])
+        self.assertEqual(setup.bonus[1], [0, 0, 0])
+
+    def test_flee(self):
+        setup = Setup([], [Combatant("Ogre", 40, 1.25, 8, None, "none")],
+                      Combatant("Player", 6, 1.0, 2), can_flee=True)
+        rng = Random(4)
+        outcomes = {run_fight(setup, rng)[0] for _ in range(200)}
+        self.assertIn(FLED, outcomes)
+        self.assertNotIn(WIN, outcomes)
+
+    def test_no_one_can_hit(self):
+        with self.assertRaises(ValueError):
+            simulate([], [Combatant("Ghost", 10, 0, 4)], Combatant("Player", 10, .05, 4), 10,
+                     workers=1)
+        # One combatant who can hit is enough for every fight to end
+        report = simulate([Combatant("Jill", 10, 1.0, 4)], [Combatant("Ghost", 10, 0, 4)],
+                          Combatant("Player", 10, 0, 4), 200, workers=1, seed=6)
+        self.assertEqual(report.outcomes[WIN], 200)
+
+    def test_parse(self):
+        enemy = Combatant.parse("Jack, 8, .75, 3, fists", is_enemy=True)
+        self.assertEqual((enemy.name, enemy.constitution, enemy.attack_mod, enemy.max_damage,
+                          enemy.weapon_name, enemy.weakness), ("Jack", 8, .75, 3, "fists", "any"))
+        self.assertIsNone(Combatant.parse("Jill,15,1,5").weakness)
+        with self.assertRaises(ValueError):
+            Combatant.parse("Jill,15")
+
+    def test_command_line(self):
+        screen = io.StringIO()
+        with redirect_stdout(screen):
+            main(["--fights", "200", "--workers", "1", "--seed", "2",
+                  "--enemy", "Ghoul,10,1.0,4"])
+        self.assertIn("Fights: 200", screen.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
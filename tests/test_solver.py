@@ -0,0 +1,56 @@
+import unittest
+from itertools import permutations
+from math import sqrt
+
+from rpgclasses.simulate import Combatant, simulate
+from rpgclasses.solver import MAX_COMBATANTS, order_probability, solve
+
+
+FIGHTS = 20000
+
+
+class SolverTest(unittest.TestCase):
+
+    def assertMatchesSimulation(self, party, enemies, player):
+        odds = solve(party, enemies, player)
+        report = simulate(party, enemies, player, FIGHTS, workers=1, seed=7)
+        # Four standard errors of the simulated win rate
+        tolerance = 4 * sqrt(odds.win * odds.loss / FIGHTS)
+        self.assertAlmostEqual(report.win_rate, odds.win, delta=tolerance)
+        mean_turns = sum(turns * count for turns, count in report.turns.items()) / FIGHTS
+        self.assertAlmostEqual(mean_turns, odds.expected_turns, delta=odds.expected_turns * .03)
+
+    def test_duel(self):
+        self.assertMatchesSimulation([], [Combatant("Ghoul", 12, 1.0, 4, "fists", "none")],
+                                     Combatant("Player", 12, 1.0, 4, "club"))
+
+    def test_party(self):
+        self.assertMatchesSimulation([Combatant("Jill", 8, 1.0, 4, "Dagger")],
+                                     [Combatant("Jack", 8, .75, 3, "fists", "Mace of Base"),
+                                      Combatant("Jack2", 9, 1.0, 4, "fists", "any")],
+                                     Combatant("Player", 10, 1.0, 5, "Mace of Base"))
+
+    def test_needs_an_enemy(self):
+        with self.assertRaises(ValueError):
+            solve([], [], Combatant("Player", 10))
+
+    def test_too_many_combatants(self):
+        with self.assertRaises(ValueError):
+            solve([Combatant("Jill", 8)] * (MAX_COMBATANTS - 1), [Combatant("Jack", 8)],
+                  Combatant("Player", 10))
+
+    def test_cached_by_stats(self):
+        enemy = [Combatant("Ghoul", 12, 1.0, 4, "fists", "none")]
+        # Names don't change the odds
+        self.assertIs(solve([], enemy, Combatant("Player", 12)),
+                      solve([], enemy, Combatant("Ann", 12)))
+
+    def test_initiative_orders(self):
+        total = sum(order_probability(order) for order in permutations(range(3)))
+        self.assertAlmostEqual(total, 1.0)
+        # Ties go to whoever is listed first
+        self.assertGreater(order_probability((0, 1)), order_probability((1, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
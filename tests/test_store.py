@@ -0,0 +1,114 @@
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+from unittest import mock
+
+from rpgclasses import GameSession
+from rpgclasses.clock import InstantClock
+from rpgclasses.generator import generate
+from rpgclasses.store import WorldStore
+from rpgclasses.world import WORLDS_DIR
+
+
+# From the game's first screen to the kitchen's command prompt
+INTRODUCTION = ("", "", "")
+
+
+def play(session, *lines):
+    """ Sends each line to session; returns everything it printed """
+    return "".join(session.step(line) for line in lines)
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manor = os.path.join(WORLDS_DIR, "manor.world")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertPickedUp(self, session):
+        """ The letter was found in the kitchen, then the player went
+            south
+        """
+        self.assertIn("Cook's letter", session.player.item_names)
+        self.assertEqual(session.current_room.name, "Dining Hall")
+        self.assertIsNone(session.world.room("kitchen").item)
+
+    def test_store(self):
+        path = os.path.join(self.directory, "manor.db")
+        store = WorldStore(path, self.manor, rooms=1)
+        session = GameSession.load(store, clock=InstantClock())
+        session.start()
+        play(session, "Ann", "hero", *INTRODUCTION)
+        play(session, "search", "", "search", "", "south", "")
+        session.close()
+        store.close()
+
+        store = WorldStore(path)
+        loaded = GameSession.load(store, clock=InstantClock())
+        self.assertIn("Dining Hall", loaded.start())
+        self.assertPickedUp(loaded)
+        loaded.close()
+        store.close()
+
+    def test_store_reads_rooms_as_visited(self):
+        world_path = os.path.join(self.directory, "big.world")
+        generate(world_path, 5000, 1, workers=1).close()
+        store = WorldStore(os.path.join(self.directory, "big.db"), world_path, rooms=4)
+        session = GameSession.load(store, clock=InstantClock())
+        session.start()
+        play(session, "Ann", "hero", *INTRODUCTION)
+        play(session, "east", "", "west")
+        self.assertEqual(len(session.router), 2)
+        self.assertLess(store.rooms_loaded, 10)
+        session.close()
+        store.close()
+
+    def test_rebuilt_with_changes(self):
+        store = WorldStore(os.path.join(self.directory, "manor.db"), self.manor, rooms=1,
+                           characters=1)
+        kitchen = store.room("kitchen")
+        kitchen.description = "Spotless."
+        store.autosave()
+        dropped = weakref.ref(kitchen)
+        del kitchen
+        store.room("ballroom")
+        gc.collect()
+        self.assertIsNone(dropped())
+        # Built again from the record written (or waiting to be)
+        self.assertEqual(store.room("kitchen").description, "Spotless.")
+        store.close()
+
+        store = WorldStore(os.path.join(self.directory, "manor.db"))
+        self.assertEqual(store.room("kitchen").description, "Spotless.")
+        self.assertEqual(store.room("kitchen").name, "Kitchen")
+        store.close()
+
+    def test_one_select_per_record(self):
+        path = os.path.join(self.directory, "manor.db")
+        store = WorldStore(path, self.manor)
+        store.room("kitchen").description = "Spotless."
+        store.autosave()
+        store.close()
+
+        store = WorldStore(path)
+        with mock.patch.object(store, "_select", wraps=store._select) as select:
+            self.assertEqual(store.room("kitchen").description, "Spotless.")
+            self.assertEqual(select.call_count, 1)
+            # A room never saved is looked for once, then read from the world
+            self.assertEqual(store.room("old_library").name, "Old Library")
+            self.assertEqual(select.call_count, 2)
+        store.close()
+
+    def test_needs_a_world(self):
+        with self.assertRaises(ValueError):
+            WorldStore(os.path.join(self.directory, "new.db"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from rpgclasses.strings import TextRef, compile_strings, pack, text
+from rpgclasses.world import WORLDS_DIR, World
+
+
+class CompileStringsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "manor.world")
+        shutil.copy(os.path.join(WORLDS_DIR, "manor.world"), self.path)
+        world = World(self.path)
+        self.expected = self.read(world)
+        world.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, world):
+        """ Every piece of text the kitchen, Jill and the letter show """
+        kitchen = world.room("kitchen")
+        jill = world.character("jill")
+        return (kitchen.description, [next(kitchen.search_gen)[0] for _ in range(3)],
+                [next(jill.conversation) for _ in range(4)], kitchen.item.description)
+
+    def test_text_moves_to_table(self):
+        compile_strings(self.path)
+        with open(self.path, encoding="utf-8") as world_file:
+            self.assertNotIn("buzzing with flies", world_file.read())
+        with open(self.path + ".strings", "rb") as strings_file:
+            self.assertIn(b"buzzing with flies", strings_file.read())
+
+        world = World(self.path)
+        self.assertIsInstance(world.room("kitchen")._description, TextRef)
+        self.assertEqual(self.read(world), self.expected)
+        world.close()
+
+    def test_compile_again(self):
+        compile_strings(self.path)
+        with open(self.path + ".strings", "rb") as strings_file:
+            table = strings_file.read()
+        compile_strings(self.path)
+        with open(self.path + ".strings", "rb") as strings_file:
+            self.assertEqual(strings_file.read(), table)
+
+        world = World(self.path)
+        self.assertEqual(self.read(world), self.expected)
+        world.close()
+
+    def test_text_refs(self):
+        compile_strings(self.path)
+        world = World(self.path)
+        letter = world.room("kitchen").item
+        ref = letter.prototype._description
+        self.assertIsInstance(ref, TextRef)
+        self.assertEqual(text(ref), letter.description)
+        self.assertEqual("{0}".format(ref), letter.description)
+        self.assertIsNone(text(None))
+        # Saves keep references as [offset, length]
+        self.assertEqual(pack((ref, True)), ([ref.offset, ref.length], True))
+        world.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
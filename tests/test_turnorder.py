@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+from rpgclasses import Character, TurnOrder
+
+
+class TurnOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c, self.d = [Character(name, "", 10) for name in "abcd"]
+        self.order = TurnOrder([self.a, self.b, self.c, self.d])
+
+    def test_remove_ahead_in_round(self):
+        self.order.remove(self.c)
+        self.assertFalse(self.order.advance())
+        self.assertIs(self.order.current, self.b)
+        self.assertFalse(self.order.advance())
+        self.assertIs(self.order.current, self.d)
+        self.assertTrue(self.order.advance())
+        self.assertIs(self.order.current, self.a)
+
+    def test_remove_current(self):
+        self.order.advance()
+        self.order.remove(self.b)
+        # The turn passes back, so the next attacker is the one after b
+        self.assertFalse(self.order.advance())
+        self.assertIs(self.order.current, self.c)
+        self.assertEqual(list(self.order), [self.a, self.c, self.d])
+
+    def test_remove_head_mid_round(self):
+        self.order.advance()
+        self.order.advance()
+        self.order.remove(self.a)
+        self.assertFalse(self.order.advance())
+        self.assertIs(self.order.current, self.d)
+        # b now starts the round
+        self.assertTrue(self.order.advance())
+        self.assertIs(self.order.current, self.b)
+
+    def test_remove_everyone(self):
+        for combatant in (self.a, self.b, self.c, self.d):
+            self.order.remove(combatant)
+        self.assertEqual(len(self.order), 0)
+        self.assertIsNone(self.order.current)
+
+    def test_from_initiative(self):
+        rolls = {self.a: 4, self.b: 17, self.c: 4, self.d: 20}
+        with mock.patch.object(Character, "roll_dice", lambda character, *dice: rolls[character]):
+            order = TurnOrder.from_initiative([self.a, self.b, self.c, self.d])
+        # Ties keep list order
+        self.assertEqual(list(order), [self.d, self.b, self.a, self.c])
+        self.assertIs(order.current, self.d)
+
+
+if __name__ == "__main__":
+    unittest.main()